@@ -20,6 +20,7 @@ import os
 from pathlib import Path
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 import uuid
 from typing import Optional, Tuple, List
 from dotenv import load_dotenv
@@ -48,6 +49,11 @@ class User:
 # SUPABASE CONFIGURATION
 # ============================================================================
 
+@lru_cache(maxsize=4)
+def _create_supabase_client(url: str, key: str) -> Client:
+    """One Supabase client per (url, key), reused across calls"""
+    return create_client(url, key)
+
 def get_supabase_client() -> Optional[Client]:
     """
     Get Supabase client instance.
@@ -114,7 +120,7 @@ def get_supabase_client() -> Optional[Client]:
         return None, error_msg
     
     try:
-        return create_client(url, key), None
+        return _create_supabase_client(url, key), None
     except Exception as e:
         return None, f"Error creating Supabase client: {str(e)}"
 
@@ -365,13 +371,15 @@ def create_user(email: str, password: str, name: str, language: str = "en") -> T
         return False, f"Error creating account: {str(e)}"
 
 
-def authenticate_user(email: str, password: str) -> Tuple[bool, Optional[User], str]:
+def authenticate_user(email: str, password: str, update_last_login: bool = True) -> Tuple[bool, Optional[User], str]:
     """
     Authenticate user credentials against Supabase.
     
     Args:
         email: User email
         password: Plain text password
+        update_last_login: Record the login time (callers that cache the
+            result pass False and call update_user_login themselves)
         
     Returns:
         (success: bool, user: Optional[User], message: str)
@@ -398,9 +406,10 @@ def authenticate_user(email: str, password: str) -> Tuple[bool, Optional[User],
             return False, None, "Invalid email or password"
         
         # Update last_login timestamp
-        supabase.table('users').update({
-            'last_login': datetime.now().isoformat()
-        }).eq('email', email.lower()).execute()
+        if update_last_login:
+            supabase.table('users').update({
+                'last_login': datetime.now().isoformat()
+            }).eq('email', email.lower()).execute()
         
         # Create User object
         user = User(
@@ -13,7 +13,8 @@ IMPORTANT: This chatbot is NOT a medical professional and does NOT:
 
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import List, Optional, Dict
+from functools import lru_cache
+from typing import Iterator, List, Optional, Dict
 import os
 import json
 from pathlib import Path
@@ -70,6 +71,13 @@ try:
 except ImportError:
     HAVE_OPENAI = False
 
+# orjson reads/writes chat history files several times faster (optional)
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
 from session_storage import SessionData, list_sessions
 from trend_analysis import get_trend_analysis, TrendAnalysis
 from translations import get_text
@@ -86,7 +94,8 @@ class ChatMessage:
     content: str
     timestamp: str  # ISO format
     risk_level: str = "low"  # "low", "medium", "high"
-    audio_bytes: Optional[bytes] = None  # TTS audio data
+    audio_bytes: Optional[bytes] = None  # TTS audio data (legacy; see audio_path)
+    audio_path: Optional[str] = None  # Cached TTS MP3 on disk
 
 
 @dataclass
@@ -98,6 +107,7 @@ class ChatContext:
     recent_sessions: List[SessionData]
     trend_analysis: Optional[TrendAnalysis]
     chat_history: List[ChatMessage]
+    chat_summary: str = ""  # Rolling summary of turns older than chat_history
 
 
 # ============================================================================
@@ -166,6 +176,13 @@ Remember: You are a helpful assistant, not a doctor. Your goal is to help users
 """
 
 
+# Messages quoted verbatim in the prompt; older turns are folded into a summary
+RECENT_TURNS = 4
+
+SUMMARY_PROMPT = """Summarize the conversation below between a user and a health assistant in at most 5 short bullet points.
+Keep health concerns the user raised, readings they mentioned and advice already given. Do not add anything new."""
+
+
 # ============================================================================
 # RISK DETECTION
 # ============================================================================
@@ -242,7 +259,8 @@ def build_chatbot_context(
     username: str,
     user_profile: Dict,
     latest_session: Optional[SessionData] = None,
-    chat_history: Optional[List[ChatMessage]] = None
+    chat_history: Optional[List[ChatMessage]] = None,
+    chat_summary: str = ""
 ) -> ChatContext:
     """
     Build comprehensive context for chatbot.
@@ -251,7 +269,8 @@ def build_chatbot_context(
         username: User identifier
         user_profile: User profile data
         latest_session: Current session data (if available)
-        chat_history: Previous chat messages
+        chat_history: Previous chat messages (only the last RECENT_TURNS are used)
+        chat_summary: Summary of earlier turns, see summarize_chat_history
         
     Returns:
         ChatContext object
@@ -283,7 +302,8 @@ def build_chatbot_context(
         latest_session=latest_session,
         recent_sessions=recent_sessions,
         trend_analysis=trend_analysis,
-        chat_history=chat_history
+        chat_history=chat_history[-RECENT_TURNS:],
+        chat_summary=chat_summary
     )
 
 
@@ -366,34 +386,19 @@ def format_context_for_prompt(context: ChatContext) -> str:
 # RESPONSE GENERATION
 # ============================================================================
 
-def generate_chatbot_response(
-    user_message: str,
-    context: ChatContext,
-    openai_api_key: Optional[str] = None,
-    lang: str = "en"
-) -> ChatMessage:
+def _build_user_prompt(user_message: str, context: ChatContext, lang: str) -> str:
     """
-    Generate chatbot response using OpenAI API.
+    Assemble the user-turn prompt from context, recent chat and the question.
     """
-    if not HAVE_OPENAI:
-        return ChatMessage(
-            role="assistant",
-            content=get_text("chatbot_unavailable", lang),
-            timestamp=datetime.now().isoformat(),
-            risk_level="low"
-        )
-    
-    # Analyze risk level
-    risk_level = analyze_risk_level(user_message, context)
-    
-    # Build prompt
     context_str = format_context_for_prompt(context)
     
     # Include recent chat history for context
     chat_history_str = ""
+    if context.chat_summary:
+        chat_history_str = f"\n\nEARLIER CONVERSATION (summary):\n{context.chat_summary}\n"
     if context.chat_history:
-        recent_chat = context.chat_history[-4:]  # Last 4 messages
-        chat_history_str = "\n\nRECENT CONVERSATION:\n"
+        recent_chat = context.chat_history[-RECENT_TURNS:]
+        chat_history_str += "\n\nRECENT CONVERSATION:\n"
         for msg in recent_chat:
             chat_history_str += f"{msg.role.upper()}: {msg.content}\n"
     
@@ -401,7 +406,7 @@ def generate_chatbot_response(
     from translations import LANGUAGES
     lang_name = LANGUAGES.get(lang, {}).get("name", "English")
     
-    user_prompt = f"""USER CONTEXT:
+    return f"""USER CONTEXT:
 {context_str}
 {chat_history_str}
 
@@ -410,6 +415,54 @@ USER QUESTION: {user_message}
 IMPORTANT INSTRUCTION: You must respond in {lang_name}.
 
 Please provide a helpful, informative response based on the user's data and question. Remember to follow all the rules in your system prompt."""
+
+
+@lru_cache(maxsize=4)
+def _get_openai_client(openai_api_key: str) -> "OpenAI":
+    """
+    One OpenAI client per key. The client keeps an httpx connection pool, so
+    reusing it skips the TCP/TLS handshake on every turn after the first.
+    """
+    return OpenAI(api_key=openai_api_key)
+
+
+def _create_completion(user_prompt: str, openai_api_key: str, stream: bool = False):
+    """Chat completion request shared by the blocking and streaming paths"""
+    client = _get_openai_client(openai_api_key)
+    return client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.7,
+        max_tokens=1000,
+        stream=stream
+    )
+
+
+def generate_chatbot_response(
+    user_message: str,
+    context: ChatContext,
+    openai_api_key: Optional[str] = None,
+    lang: str = "en"
+) -> ChatMessage:
+    """
+    Generate chatbot response using OpenAI API.
+    """
+    if not HAVE_OPENAI:
+        return ChatMessage(
+            role="assistant",
+            content=get_text("chatbot_unavailable", lang),
+            timestamp=datetime.now().isoformat(),
+            risk_level="low"
+        )
+    
+    # Analyze risk level
+    risk_level = analyze_risk_level(user_message, context)
+    
+    # Build prompt
+    user_prompt = _build_user_prompt(user_message, context, lang)
     
     try:
         if openai_api_key is None:
@@ -423,17 +476,7 @@ Please provide a helpful, informative response based on the user's data and ques
                 risk_level="low"
             )
 
-        client = OpenAI(api_key=openai_api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        response = _create_completion(user_prompt, openai_api_key)
         
         content = response.choices[0].message.content.strip()
         
@@ -457,6 +500,77 @@ Please provide a helpful, informative response based on the user's data and ques
         )
 
 
+def generate_chatbot_response_stream(
+    user_message: str,
+    context: ChatContext,
+    openai_api_key: Optional[str] = None,
+    lang: str = "en"
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_chatbot_response, yielding text deltas as
+    they arrive. Errors are yielded as the same user-facing messages; the
+    caller joins the pieces and applies filter_unsafe_response at the end.
+    """
+    if not HAVE_OPENAI:
+        yield get_text("chatbot_unavailable", lang)
+        return
+    
+    user_prompt = _build_user_prompt(user_message, context, lang)
+    
+    if openai_api_key is None:
+        openai_api_key = get_openai_api_key()
+    
+    if not openai_api_key:
+        yield "OpenAI API key not found. Please check your configuration."
+        return
+    
+    try:
+        for chunk in _create_completion(user_prompt, openai_api_key, stream=True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"Chatbot error: {e}")
+        yield get_text("chatbot_error", lang)
+
+
+def summarize_chat_history(
+    messages: List[ChatMessage],
+    previous_summary: str = "",
+    openai_api_key: Optional[str] = None
+) -> str:
+    """
+    Fold messages into the running conversation summary. Returns
+    previous_summary unchanged if the API is unavailable or the call fails.
+    """
+    if not HAVE_OPENAI or not messages:
+        return previous_summary
+    
+    if openai_api_key is None:
+        openai_api_key = get_openai_api_key()
+    if not openai_api_key:
+        return previous_summary
+    
+    transcript = "\n".join(f"{msg.role.upper()}: {msg.content}" for msg in messages)
+    if previous_summary:
+        transcript = f"SUMMARY SO FAR:\n{previous_summary}\n\nNEW MESSAGES:\n{transcript}"
+    
+    try:
+        client = _get_openai_client(openai_api_key)
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0.2,
+            max_tokens=200
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Chat summary error: {e}")
+        return previous_summary
+
+
 def filter_unsafe_response(response: str) -> str:
     """
     Filter out potentially unsafe language from response.
@@ -497,8 +611,11 @@ def save_chat_history(username: str, messages: List[ChatMessage]) -> bool:
             if 'audio_bytes' in msg:
                 msg['audio_bytes'] = None
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(messages_dict, f, indent=2, ensure_ascii=False)
+        if HAVE_ORJSON:
+            filepath.write_bytes(orjson.dumps(messages_dict, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(messages_dict, f, indent=2, ensure_ascii=False)
         
         return True
     except Exception as e:
@@ -514,8 +631,8 @@ def load_chat_history(username: str) -> List[ChatMessage]:
         if not filepath.exists():
             return []
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            messages_dict = json.load(f)
+        raw = filepath.read_bytes()
+        messages_dict = orjson.loads(raw) if HAVE_ORJSON else json.loads(raw.decode('utf-8'))
         
         messages = [ChatMessage(**msg) for msg in messages_dict]
         return messages
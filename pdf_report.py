@@ -20,7 +20,7 @@ import base64
 from datetime import datetime
 from typing import Optional
 
-from session_storage import SessionData
+from session_storage import SessionData, load_session
 from translations import get_text
 
 
@@ -272,8 +272,7 @@ def generate_health_report(session: SessionData, lang: str = "en") -> bytes:
         
         if session.signal_plot:
             try:
-                img_data = base64.b64decode(session.signal_plot)
-                img_buffer = BytesIO(img_data)
+                img_buffer = BytesIO(session.signal_plot)
                 img = RLImage(img_buffer, width=6*inch, height=4*inch)
                 elements.append(img)
                 elements.append(Spacer(1, 0.2*inch))
@@ -282,8 +281,7 @@ def generate_health_report(session: SessionData, lang: str = "en") -> bytes:
         
         if session.hrv_plot:
             try:
-                img_data = base64.b64decode(session.hrv_plot)
-                img_buffer = BytesIO(img_data)
+                img_buffer = BytesIO(session.hrv_plot)
                 img = RLImage(img_buffer, width=6*inch, height=3*inch)
                 elements.append(img)
                 elements.append(Spacer(1, 0.2*inch))
@@ -330,6 +328,22 @@ def generate_health_report(session: SessionData, lang: str = "en") -> bytes:
     return pdf_bytes
 
 
+def generate_session_report(username: str, session_id: str, lang: str = "en") -> Optional[bytes]:
+    """
+    PDF report for a stored session, charts included.
+    
+    Plots live in separate files next to the session JSON, so this loads
+    them too (load_session) rather than working from the metadata alone.
+    
+    Returns:
+        PDF file as bytes, or None if the session does not exist
+    """
+    session = load_session(username, session_id)
+    if session is None:
+        return None
+    return generate_health_report(session, lang)
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
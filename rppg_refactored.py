@@ -20,12 +20,36 @@ Pipeline:
 import cv2
 import numpy as np
 import os
+from array import array
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
-from scipy.signal import butter, filtfilt, welch, find_peaks
+from scipy.signal import butter, sosfiltfilt, welch, find_peaks
 from types import SimpleNamespace
 import warnings
 
+# Numba is optional: compile the numeric kernels when available,
+# otherwise run the same NumPy code uncompiled.
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# PyAV is optional: multithreaded FFmpeg decode with BGR conversion only
+# for the frames actually analysed. Falls back to cv2.VideoCapture, also on
+# PyAV releases without VideoFrame.rotation, which PyAVCapture needs to turn
+# portrait videos upright the way cv2 does.
+try:
+    import av
+    HAVE_PYAV = hasattr(av.VideoFrame, "rotation")
+except ImportError:
+    HAVE_PYAV = False
+
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 
@@ -53,22 +77,31 @@ class VitalOutput:
 # -----------------------------
 # Signal Processing Helpers
 # -----------------------------
-def _bandpass(sig, fs, low=0.7, high=4.0):
-    """Bandpass filter for heart rate band"""
-    if len(sig) < fs * 5:
+def _red_green_means(box):
+    """
+    Mean red and green intensity of a BGR patch.
+    
+    cv2.mean walks the ROI view in place (honouring the frame stride), so
+    all channels are averaged in one pass without copying the patch.
+    """
+    b, g, r, _ = cv2.mean(box)
+    return r, g
+
+
+def _bandpass(sig, fs, low=0.7, high=4.0, order=3):
+    """Bandpass filter for heart rate band (along the last axis)"""
+    n = sig.shape[-1]
+    if n < fs * 5:
         return sig
     nyq = 0.5 * fs
-    b, a = butter(3, [low / nyq, high / nyq], btype="band")
-    return filtfilt(b, a, sig)
+    sos = butter(order, [low / nyq, high / nyq], btype="band", output="sos")
+    # SciPy's default edge padding, clamped so any length that gets here filters
+    padlen = min(n - 1, 3 * (2 * order + 1))
+    return sosfiltfilt(sos, sig, axis=-1, padlen=padlen)
 
 
-def _welch_hr(sig, fs):
-    """Estimate heart rate using Welch's method"""
-    # Reduced from fs * 10 to fs * 5 to support shorter videos
-    # Minimum 5 seconds of data required for reasonable HR estimation
-    if len(sig) < fs * 5:
-        return None, 0
-    freqs, psd = welch(sig, fs=fs, nperseg=min(512, len(sig)))  # Reduced nperseg for shorter signals
+def _band_peak(freqs, psd):
+    """Dominant frequency (as BPM) and its power ratio within the HR band"""
     band = (freqs >= 0.7) & (freqs <= 4.0)
     if not np.any(band):
         return None, 0
@@ -79,6 +112,25 @@ def _welch_hr(sig, fs):
     return f_band[peak_i] * 60.0, peak_ratio
 
 
+def _welch_hr(sig, fs):
+    """Estimate heart rate using Welch's method"""
+    # Reduced from fs * 10 to fs * 5 to support shorter videos
+    # Minimum 5 seconds of data required for reasonable HR estimation
+    if len(sig) < fs * 5:
+        return None, 0
+    freqs, psd = welch(sig, fs=fs, nperseg=min(512, len(sig)))  # Reduced nperseg for shorter signals
+    return _band_peak(freqs, psd)
+
+
+def _welch_hr_rows(sigs, fs):
+    """Estimate heart rate for each row of a 2-D signal stack with one Welch pass"""
+    n = sigs.shape[-1]
+    if n < fs * 5:
+        return [(None, 0)] * sigs.shape[0]
+    freqs, psd = welch(sigs, fs=fs, nperseg=min(512, n), axis=-1)
+    return [_band_peak(freqs, row) for row in psd]
+
+
 def _rr_intervals(sig, fs, hr):
     """Extract RR intervals from signal"""
     if hr is None or hr <= 0:
@@ -95,30 +147,32 @@ def _rr_intervals(sig, fs, hr):
     return rr
 
 
-def _sdnn(rr):
-    """Standard deviation of RR intervals (HRV metric)"""
-    # Reduced from 10 to 3 for shorter videos
-    if len(rr) < 3:
-        return None
-    return np.std(rr, ddof=1) * 1000.0
+@njit(cache=True, fastmath=True)
+def _hrv_kernel(rr):
+    """SDNN, RMSSD (ms) and pNN50 (%) of an RR series in one pass (len(rr) >= 3)"""
+    n = rr.shape[0]
+    mean = np.sum(rr) / n
+    sdnn = np.sqrt(np.sum((rr - mean) ** 2) / (n - 1)) * 1000.0
+    diff = rr[1:] - rr[:-1]
+    rmssd = np.sqrt(np.mean(diff ** 2)) * 1000.0
+    nn50 = np.sum(np.abs(diff) * 1000.0 > 50.0)
+    pnn50 = nn50 / diff.shape[0] * 100.0
+    return sdnn, rmssd, pnn50
 
 
-def _rmssd(rr):
-    """Root mean square of successive differences (HRV metric)"""
+def _hrv_metrics(rr):
+    """
+    HRV metrics from RR intervals.
+    
+    Returns (sdnn, rmssd, pnn50): standard deviation of RR intervals and
+    root mean square of successive differences in ms (None if fewer than 3
+    intervals), and percentage of successive differences > 50ms (0.0 then).
+    """
     # Reduced from 10 to 3 for shorter videos
     if len(rr) < 3:
-        return None
-    diff = np.diff(rr)
-    return np.sqrt(np.mean(diff ** 2)) * 1000.0
-
-
-def _pnn50(rr):
-    """Percentage of successive RR intervals > 50ms"""
-    if len(rr) < 3:
-        return 0.0
-    diff = np.abs(np.diff(rr)) * 1000.0  # ms
-    nn50 = np.sum(diff > 50)
-    return float(nn50 / len(diff)) * 100.0
+        return None, None, 0.0
+    sdnn, rmssd, pnn50 = _hrv_kernel(np.ascontiguousarray(rr, dtype=np.float64))
+    return float(sdnn), float(rmssd), float(pnn50)
 
 
 def _stress_from_hrv(sdnn, rmssd):
@@ -263,6 +317,161 @@ def _estimate_bp(hr, sdnn, rmssd):
     return round(systolic, 1), round(diastolic, 1)
 
 
+# -----------------------------
+# Frame Streaming
+# -----------------------------
+# Display-matrix rotation (degrees counter-clockwise, mod 360) -> cv2.rotate code
+_DISPLAY_ROTATIONS = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+
+
+class PyAVCapture:
+    """
+    Minimal cv2.VideoCapture stand-in backed by PyAV, covering the calls the
+    pipeline makes (isOpened, get, grab, retrieve, release). grab() decodes
+    the next frame; retrieve() does the BGR conversion, so skipped frames
+    never pay for it. Like cv2, retrieve() applies the stream's rotation
+    metadata, so portrait phone videos reach the face detector upright.
+    """
+
+    def __init__(self, video_path: str):
+        self._container = av.open(video_path)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"  # frame + slice threading in FFmpeg
+        self._frames = self._container.decode(self._stream)
+        self._frame = None
+
+    def isOpened(self) -> bool:
+        return self._container is not None
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self._stream.average_rate or 0)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self._stream.frames or 0)
+        return 0.0
+
+    def grab(self) -> bool:
+        try:
+            self._frame = next(self._frames)
+        except (StopIteration, av.error.FFmpegError):
+            self._frame = None
+        return self._frame is not None
+
+    def retrieve(self):
+        if self._frame is None:
+            return False, None
+        img = self._frame.to_ndarray(format="bgr24")
+        rotate = _DISPLAY_ROTATIONS.get(self._frame.rotation % 360)
+        return True, img if rotate is None else cv2.rotate(img, rotate)
+
+    def release(self):
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+
+def open_video(video_path: str):
+    """PyAVCapture when PyAV is installed and can open the file, else cv2.VideoCapture"""
+    if HAVE_PYAV:
+        try:
+            return PyAVCapture(video_path)
+        except Exception as e:
+            print(f"[DEBUG] PyAV could not open {video_path} ({e}); using OpenCV")
+    return cv2.VideoCapture(video_path)
+
+
+# Face detection rate cap: on faster captures (e.g. 60 fps phones) the Haar
+# cascade runs on every n-th frame and the frames in between reuse its box.
+# ROI means are still taken from every frame, so RR timing keeps full resolution.
+MAX_DETECT_FS = 30.0
+
+
+def iter_roi_means(cap, face_cascade, detect_stride=1):
+    """
+    Stream per-frame ROI colour means from an open video capture.
+    
+    Every frame is decoded, but the face detector only runs on every
+    `detect_stride`-th one; the frames in between reuse the last face box.
+    
+    Yields (frame_idx, roi_means) for every frame, where frame_idx is the
+    1-based frame count and roi_means is None when no face was found,
+    otherwise a tuple (forehead, left_cheek, right_cheek) of (red, green)
+    means, each entry None if that ROI fell outside the frame.
+    """
+    frame_idx = 0
+    face_rect = None
+
+    while True:
+        if not cap.grab():
+            break
+        ok, frame = cap.retrieve()
+        if not ok:
+            break
+
+        frame_idx += 1
+        h, w = frame.shape[:2]
+        
+        if (frame_idx - 1) % detect_stride == 0:
+            # Detect faces using Haar Cascade with more lenient parameters
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            # Improved parameters for better detection:
+            # - scaleFactor=1.05 (was 1.1) - more thorough search
+            # - minNeighbors=3 (was 5) - less strict
+            # - minSize=(50,50) (was 100,100) - detect smaller faces
+            faces = face_cascade.detectMultiScale(
+                gray, 
+                scaleFactor=1.05, 
+                minNeighbors=3, 
+                minSize=(50, 50),
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+            
+            # Use largest face - detectMultiScale returns numpy array
+            # Each face is [x, y, w, h]
+            if len(faces) == 0:
+                face_rect = None
+            else:
+                face_rect = faces[np.argmax([rect[2] * rect[3] for rect in faces])]
+        
+        if face_rect is None:
+            yield frame_idx, None
+            continue
+
+        x, y, fw, fh = int(face_rect[0]), int(face_rect[1]), int(face_rect[2]), int(face_rect[3])
+        
+        # Define ROIs based on face box
+        # Forehead: top 20-35% of face height
+        forehead_y1 = max(0, y + int(fh * 0.20))
+        forehead_y2 = min(h, y + int(fh * 0.35))
+        forehead_x1 = max(0, x + int(fw * 0.25))
+        forehead_x2 = min(w, x + int(fw * 0.75))
+        forehead_box = frame[forehead_y1:forehead_y2, forehead_x1:forehead_x2]
+        
+        # Left cheek: left side, middle vertical region
+        lc_y1 = max(0, y + int(fh * 0.50))
+        lc_y2 = min(h, y + int(fh * 0.75))
+        lc_x1 = max(0, x + int(fw * 0.10))
+        lc_x2 = min(w, x + int(fw * 0.40))
+        left_cheek_box = frame[lc_y1:lc_y2, lc_x1:lc_x2]
+        
+        # Right cheek: right side, middle vertical region
+        rc_y1 = max(0, y + int(fh * 0.50))
+        rc_y2 = min(h, y + int(fh * 0.75))
+        rc_x1 = max(0, x + int(fw * 0.60))
+        rc_x2 = min(w, x + int(fw * 0.90))
+        right_cheek_box = frame[rc_y1:rc_y2, rc_x1:rc_x2]
+        
+        # Extract mean red/green from boxes (single pass over BGR pixels)
+        yield frame_idx, tuple(
+            _red_green_means(box) if box.size > 0 else None
+            for box in (forehead_box, left_cheek_box, right_cheek_box)
+        )
+
+
 # -----------------------------
 # MAIN PROCESSING FUNCTION
 # -----------------------------
@@ -278,7 +487,7 @@ def process_rppg_video(video_path: str, progress_callback=None) -> VitalOutput:
         VitalOutput with estimated vitals
     """
 
-    cap = cv2.VideoCapture(video_path)
+    cap = open_video(video_path)
     if not cap.isOpened():
         raise RuntimeError(f"Cannot open video: {video_path}")
 
@@ -286,6 +495,9 @@ def process_rppg_video(video_path: str, progress_callback=None) -> VitalOutput:
     if fs <= 1 or fs > 120:
         fs = 30.0
 
+    # Run face detection at ~MAX_DETECT_FS on high-frame-rate captures
+    detect_stride = max(1, round(fs / MAX_DETECT_FS))
+
     # Handle unreliable total_frames (common with browser-recorded .webm)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
@@ -307,87 +519,29 @@ def process_rppg_video(video_path: str, progress_callback=None) -> VitalOutput:
     if face_cascade.empty():
         raise RuntimeError(f"Could not load Haar Cascade classifier from {cascade_path}")
 
-    # Signal storage for 3 ROIs
-    r_fore, g_fore = [], []
-    r_lc, g_lc = [], []
-    r_rc, g_rc = [], []
+    # Signal storage for 3 ROIs (compact float32 buffers, filled as frames stream in)
+    r_fore, g_fore = array("f"), array("f")
+    r_lc, g_lc = array("f"), array("f")
+    r_rc, g_rc = array("f"), array("f")
+    buffers = ((r_fore, g_fore), (r_lc, g_lc), (r_rc, g_rc))
     
     frame_idx = 0
     detected_frames = 0
 
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-
-        h, w = frame.shape[:2]
-        
-        # Detect faces using Haar Cascade with more lenient parameters
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        # Improved parameters for better detection:
-        # - scaleFactor=1.05 (was 1.1) - more thorough search
-        # - minNeighbors=3 (was 5) - less strict
-        # - minSize=(50,50) (was 100,100) - detect smaller faces
-        faces = face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.05, 
-            minNeighbors=3, 
-            minSize=(50, 50),
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        
-        if len(faces) > 0:
-            # Use largest face - detectMultiScale returns numpy array
-            # Each face is [x, y, w, h]
-            largest_idx = np.argmax([rect[2] * rect[3] for rect in faces])
-            face_rect = faces[largest_idx]
-            x, y, fw, fh = int(face_rect[0]), int(face_rect[1]), int(face_rect[2]), int(face_rect[3])
-            
-            # Define ROIs based on face box
-            # Forehead: top 20-35% of face height
-            forehead_y1 = max(0, y + int(fh * 0.20))
-            forehead_y2 = min(h, y + int(fh * 0.35))
-            forehead_x1 = max(0, x + int(fw * 0.25))
-            forehead_x2 = min(w, x + int(fw * 0.75))
-            forehead_box = frame[forehead_y1:forehead_y2, forehead_x1:forehead_x2]
-            
-            # Left cheek: left side, middle vertical region
-            lc_y1 = max(0, y + int(fh * 0.50))
-            lc_y2 = min(h, y + int(fh * 0.75))
-            lc_x1 = max(0, x + int(fw * 0.10))
-            lc_x2 = min(w, x + int(fw * 0.40))
-            left_cheek_box = frame[lc_y1:lc_y2, lc_x1:lc_x2]
-            
-            # Right cheek: right side, middle vertical region
-            rc_y1 = max(0, y + int(fh * 0.50))
-            rc_y2 = min(h, y + int(fh * 0.75))
-            rc_x1 = max(0, x + int(fw * 0.60))
-            rc_x2 = min(w, x + int(fw * 0.90))
-            right_cheek_box = frame[rc_y1:rc_y2, rc_x1:rc_x2]
-            
-            # Extract mean RGB from boxes
-            if forehead_box.size > 0:
-                rgb_f = cv2.cvtColor(forehead_box, cv2.COLOR_BGR2RGB)
-                r_fore.append(np.mean(rgb_f[:,:,0]))
-                g_fore.append(np.mean(rgb_f[:,:,1]))
-            
-            if left_cheek_box.size > 0:
-                rgb_l = cv2.cvtColor(left_cheek_box, cv2.COLOR_BGR2RGB)
-                r_lc.append(np.mean(rgb_l[:,:,0]))
-                g_lc.append(np.mean(rgb_l[:,:,1]))
-            
-            if right_cheek_box.size > 0:
-                rgb_r = cv2.cvtColor(right_cheek_box, cv2.COLOR_BGR2RGB)
-                r_rc.append(np.mean(rgb_r[:,:,0]))
-                g_rc.append(np.mean(rgb_r[:,:,1]))
-            
+    for frame_idx, roi_means in iter_roi_means(cap, face_cascade, detect_stride):
+        if roi_means is not None:
+            for means, (r_buf, g_buf) in zip(roi_means, buffers):
+                if means is not None:
+                    r_buf.append(means[0])
+                    g_buf.append(means[1])
             detected_frames += 1
 
-        frame_idx += 1
         if progress_callback and total_frames:
             progress_callback(frame_idx, total_frames)
 
     cap.release()
+    if progress_callback and total_frames:
+        progress_callback(total_frames, total_frames)
 
     # Debug output
     print(f"[DEBUG] Total frames processed: {frame_idx}")
@@ -408,49 +562,40 @@ def process_rppg_video(video_path: str, progress_callback=None) -> VitalOutput:
             f"({100*detection_ratio:.1f}%). Try better lighting or adjust camera position."
         )
 
-    # Convert to arrays
-    g_fore = np.array(g_fore)
-    g_lc = np.array(g_lc)
-    g_rc = np.array(g_rc)
-
-    r_fore = np.array(r_fore)
-    r_lc = np.array(r_lc)
-    r_rc = np.array(r_rc)
+    # Stack the float32 ROI buffers row-wise so normalization, filtering
+    # and the PSD run once over all three
+    n = min(len(g_fore), len(g_lc), len(g_rc))
+    g_rois = np.stack([np.frombuffer(buf, dtype=np.float32)[:n] for buf in (g_fore, g_lc, g_rc)])
+    r_rois = np.stack([np.frombuffer(buf, dtype=np.float32)[:n] for buf in (r_fore, r_lc, r_rc)])
 
     # Normalize each ROI signal
-    def norm(x):
-        return (x - np.mean(x)) / (np.std(x) + 1e-9)
+    g_mean = g_rois.mean(axis=1, keepdims=True)
+    g_norm = (g_rois - g_mean) / (g_rois.std(axis=1, keepdims=True) + 1e-9)
 
-    # Bandpass filter each ROI
-    f_fore = _bandpass(norm(g_fore), fs)
-    f_lc = _bandpass(norm(g_lc), fs)
-    f_rc = _bandpass(norm(g_rc), fs)
+    # Bandpass filter all ROIs in one pass
+    f_rois = _bandpass(g_norm, fs)
 
     # Estimate HR and quality for each ROI
-    hr_f, qf = _welch_hr(f_fore, fs)
-    hr_l, ql = _welch_hr(f_lc, fs)
-    hr_r, qr = _welch_hr(f_rc, fs)
+    (hr_f, qf), (hr_l, ql), (hr_r, qr) = _welch_hr_rows(f_rois, fs)
 
     # Quality-weighted fusion
     q = np.array([qf, ql, qr])
     weights = q / np.sum(q) if np.sum(q) > 0 else np.array([1/3, 1/3, 1/3])
 
     # Fuse signals
-    fused = weights[0] * f_fore + weights[1] * f_lc + weights[2] * f_rc
+    fused = weights @ f_rois
     
     # Final HR from fused signal
     hr, peak_ratio = _welch_hr(fused, fs)
 
     # RR intervals → HRV → Stress
     rr = _rr_intervals(fused, fs, hr)
-    sdnn = _sdnn(rr)
-    rmssd = _rmssd(rr)
-    pnn50 = _pnn50(rr)
+    sdnn, rmssd, pnn50 = _hrv_metrics(rr)
     stress = _stress_from_hrv(sdnn, rmssd)
 
     # SpO2 using fused red/green with proper safety gating
-    fused_r = weights[0] * r_fore + weights[1] * r_lc + weights[2] * r_rc
-    fused_g = weights[0] * g_fore + weights[1] * g_lc + weights[2] * g_rc
+    fused_r = weights @ r_rois
+    fused_g = weights @ g_rois
     spo2 = _estimate_spo2(fused_r, fused_g, fs, hr)
 
     # Blood Pressure estimation
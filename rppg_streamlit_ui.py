@@ -10,15 +10,28 @@ import streamlit as st
 import tempfile
 import os
 from pathlib import Path
+import matplotlib
+matplotlib.use("Agg")  # Headless server: never probe for a GUI backend
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
 import uuid
 from datetime import datetime
-import base64
+import hashlib
+import hmac
+import secrets
+from dataclasses import replace
 from io import BytesIO
 import shutil
-from typing import Optional
+from typing import Optional, Tuple
 import sys
+import math
+import re
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html import escape
 import time
 import pytz
 
@@ -26,9 +39,9 @@ import pytz
 IST = pytz.timezone('Asia/Kolkata')
 
 def to_ist_display(iso_str):
-    """Convert ISO timestamp string to IST formatted string"""
+    """Convert ISO timestamp string (or an already parsed datetime) to IST"""
     try:
-        dt = datetime.fromisoformat(iso_str)
+        dt = iso_str if isinstance(iso_str, datetime) else datetime.fromisoformat(iso_str)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=pytz.UTC)
         dt_ist = dt.astimezone(IST)
@@ -38,7 +51,13 @@ def to_ist_display(iso_str):
 
 
 # Import translations module
-from translations import get_text, get_available_languages, translate_dynamic, LANGUAGES
+from translations import get_text, get_available_languages, translate_dynamic, LANGUAGES, TRANSLATIONS
+from vital_ranges import vital_band
+
+# Static language selector data (LANGUAGES never changes at runtime)
+_LANG_CODES = tuple(LANGUAGES.keys())
+_LANG_LABELS = {code: f"{info['flag']} {info['name']}" for code, info in LANGUAGES.items()}
+_LANG_INDEX = {code: i for i, code in enumerate(_LANG_CODES)}
 from camera_component import camera_component, save_camera_video
 from streamlit_mic_recorder import speech_to_text
 from dotenv import load_dotenv
@@ -53,7 +72,8 @@ load_dotenv(dotenv_path=env_path, override=True)
 
 from rppg_refactored import (
     estimate_vitals_from_video,
-    HAVE_MEDIAPIPE
+    HAVE_MEDIAPIPE,
+    njit
 )
 try:
     from health_insights import get_health_insights
@@ -64,13 +84,15 @@ except ImportError as e:
 
 try:
     from session_storage import (
-        SessionData, save_session, load_session, 
-        list_sessions, get_session_count
+        SessionData, save_session, load_session_meta, load_session_plots,
+        list_sessions, get_session_count, get_history_version
     )
-    from pdf_report import generate_health_report
-    from trend_analysis import get_trend_analysis, TrendAnalysis
+    from pdf_report import generate_health_report, generate_session_report
+    from trend_analysis import get_trend_analysis, TrendAnalysis, linfit_uniform
     from chatbot import (
         build_chatbot_context, generate_chatbot_response,
+        generate_chatbot_response_stream, analyze_risk_level, filter_unsafe_response,
+        summarize_chat_history, RECENT_TURNS,
         ChatMessage,
         load_chat_history, save_chat_history, clear_chat_history
     )
@@ -87,18 +109,29 @@ try:
         create_user, authenticate_user, validate_email,
         validate_password, get_password_strength, User,
         update_user_language, update_user_name, get_google_auth_url, exchange_code_for_session,
-        get_supabase_client, create_session, logout_session
+        get_supabase_client, create_session, logout_session, update_user_login
     )
-    from s3_utils import generate_presigned_url, get_s3_client
-    HAVE_AUTH = True
-    HAVE_S3 = True
-    from s3_utils import generate_presigned_url, get_s3_client
+    from s3_utils import generate_presigned_url, get_s3_client, upload_bytes
     HAVE_AUTH = True
     HAVE_S3 = True
 except ImportError:
     HAVE_AUTH = False
     HAVE_S3 = False
 
+# Supabase client (for the OAuth/session lookups below)
+try:
+    from supabase import create_client
+    HAVE_SUPABASE = True
+except ImportError:
+    HAVE_SUPABASE = False
+
+# Opus re-encoding of chatbot TTS clips (pydub shells out to ffmpeg)
+try:
+    from pydub import AudioSegment
+    HAVE_PYDUB = shutil.which("ffmpeg") is not None
+except ImportError:
+    HAVE_PYDUB = False
+
 # Session Manager
 try:
     from session_manager import get_session_manager, SessionManager
@@ -107,6 +140,10 @@ except ImportError:
     HAVE_SESSION_MANAGER = False
 
 
+# st.fragment graduated from st.experimental_fragment in Streamlit 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
 # ============================================================================
 # PAGE CONFIG
 # ============================================================================
@@ -284,6 +321,23 @@ footer {visibility: hidden;}
 header[data-testid="stHeader"] {
     background-color: #F5F5F0; /* Blend header with background */
 }
+
+/* Chatbot history rendered as one HTML block */
+.chat-msg {
+    padding: 10px 14px;
+    margin: 6px 0;
+    border-radius: 12px;
+    line-height: 1.5;
+}
+.chat-msg.user {
+    background-color: #E8EDE6;
+    margin-left: 15%;
+}
+.chat-msg.assistant {
+    background-color: #FFFFFF;
+    border: 1px solid #E0E4DC;
+    margin-right: 15%;
+}
 </style>
 """, unsafe_allow_html=True)
 
@@ -292,52 +346,70 @@ header[data-testid="stHeader"] {
 # ============================================================================
 
 @st.cache_resource
-def get_singleton_supabase_client(url, key):
+def _supabase_singleton(_url, _key):
     """
-    Get a singleton Supabase client instance based on url/key.
+    Get a singleton Supabase client instance.
     Required for PKCE flow to maintain the code verifier.
+    
+    url/key are process-wide env vars, so they are underscore-prefixed to
+    keep Streamlit from hashing them on every lookup. Errors propagate, so
+    a failed creation is retried on the next call instead of cached.
     """
-    if not url or not key:
+    return create_client(_url, _key)
+
+def get_persistent_supabase_client():
+    """Wrapper to get the singleton client with current environment vars; None if unavailable"""
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_KEY")
+    if not HAVE_SUPABASE or not url or not key:
         return None
     try:
-        from supabase import create_client
-        return create_client(url, key)
+        return _supabase_singleton(url, key)
     except Exception as e:
         print(f"Error creating Supabase client: {e}")
         return None
 
-def get_persistent_supabase_client():
-    """Wrapper to get the singleton client with current environment vars"""
-    # Try to get from environment first
-    url = os.environ.get("SUPABASE_URL")
-    key = os.environ.get("SUPABASE_KEY")
+@st.cache_data(ttl=60, max_entries=32)
+def _fetch_session_info(_client, token: str):
+    """
+    Look up the current Supabase auth session.
     
-    if not url:
-        pass # Rely on get_singleton_supabase_client's checks or downstream errors
-    if not key:
-        pass
-        
-    return get_singleton_supabase_client(url, key)
+    Cached per browser-session token for a minute so reruns don't hit
+    Supabase every time. Returns (email, name) or None if not signed in.
+    """
+    session = _client.auth.get_session()
+    if not session:
+        return None
+    user = session.user
+    # Try to get existing user info from DB or metadata
+    name = user.user_metadata.get('full_name', user.email.split('@')[0])
+    return user.email, name
 
 def handle_oauth_callback():
     """Check for OAuth code in query params and exchange for session"""
     if not HAVE_AUTH:
         return
 
+    # Snapshot the URL params once for this rerun
+    query_params = dict(st.query_params)
+    code = query_params.get("code")
+
+    # Nothing to do for an already logged-in user without an OAuth code;
+    # skip the Supabase session check entirely
+    if not code and st.session_state.get("logged_in", False):
+        return
+
     # 1. Check if we already have a session (e.g. from cookie)
     # This avoids re-triggering auth flow if we are already logged in
     try:
         client = get_persistent_supabase_client()
         if client:
-            session = client.auth.get_session()
-            if session:
+            token = st.session_state.setdefault("_sess_token", uuid.uuid4().hex)
+            session_info = _fetch_session_info(client, token)
+            if session_info:
                 # We have a valid session, ensure state is set
                 st.session_state["logged_in"] = True
-                user = session.user
-                st.session_state["user_email"] = user.email
-                # Try to get existing user info from DB or metadata
-                name = user.user_metadata.get('full_name', user.email.split('@')[0])
-                st.session_state["user_name"] = name
+                st.session_state["user_email"], st.session_state["user_name"] = session_info
                 # Stop processing code if we are already logged in
                 return
     except Exception as e:
@@ -345,9 +417,6 @@ def handle_oauth_callback():
 
     # 2. Check query params for 'code'
     try:
-        query_params = st.query_params
-        code = query_params.get("code")
-        
         if code:
             st.toast("🔄 Processing Google Sign-In...", icon="🔄")
             
@@ -361,8 +430,11 @@ def handle_oauth_callback():
                 st.session_state["logged_in"] = True
                 st.session_state["user_email"] = user.email
                 st.session_state["user_name"] = user.name
-                # Set user's language preference
+                # Set user's language preference; it is already stored for this user
                 st.session_state["user_language"] = user.language
+                st.session_state["_last_persisted_lang"] = user.language
+                # Fresh token so the cached session lookup starts clean
+                st.session_state["_sess_token"] = uuid.uuid4().hex
                 
                 # DO NOT Clear query params - we need them for session persistence!
                 # st.query_params.clear()
@@ -396,12 +468,63 @@ if HAVE_AUTH:
 # SESSION & AUTHENTICATION STATE
 # ============================================================================
 
-if "logged_in" not in st.session_state:
-    st.session_state["logged_in"] = False
-if "user_email" not in st.session_state:
-    st.session_state["user_email"] = None
-if "user_name" not in st.session_state:
-    st.session_state["user_name"] = None
+# Profile form choices (translation keys)
+_GENDER_OPTIONS = ("prefer_not_say", "female", "male", "other")
+_DIET_OPTIONS = ("non_vegetarian", "vegetarian", "vegan", "other")
+_EXERCISE_OPTIONS = ("never", "exercise_1_2", "exercise_3_4", "daily")
+_SMOKING_OPTIONS = ("never", "occasional", "regular", "former")
+_DRINKING_OPTIONS = ("never", "occasional", "regular", "former")
+_DIABETES_OPTIONS = ("habit_no", "habit_yes")
+_ACTIVITY_OPTIONS = ("activity_active", "activity_sedentary")
+
+# One all-history row: date/time, vitals preview and the risk badge
+_HISTORY_ROW_HTML = (
+    "<div style='display:flex;align-items:center;gap:24px;padding:12px 0;border-bottom:1px solid #e5e7eb'>"
+    "<div style='min-width:140px'><div style='font-weight:700;font-size:18px'>📅 {date}</div>"
+    "<div style='color:#6b7280;font-size:13px'>🕐 {time}</div></div>"
+    "<div><div><b>❤️ HR:</b> {hr} | <b>😰 Stress:</b> {stress}</div>{bp}"
+    "<div style='margin-top:6px'>{badge}</div></div>"
+    "</div>"
+)
+
+# Sessions fetched per "Load more" click in the all-history view
+_HISTORY_PAGE_SIZE = 25
+
+# Risk score (0-10, rounded up) -> (translation key, badge color)
+_RISK_TABLE = (
+    (("low_risk", "#6B8F71"),) * 4          # Muted Sage Green
+    + (("moderate_risk", "#D4A373"),) * 3   # Muted Earthy Orange
+    + (("high_risk", "#B85C5C"),) * 4       # Muted Terra Cotta Red
+)
+
+_RISK_BADGE_HTML = (
+    "<span style='padding:4px 12px;border-radius:8px;background:{color};color:white;font-weight:600;font-size:12px'>"
+    "Risk: {score}/10 - {label}</span>"
+)
+
+def _risk_style(score: float):
+    """(translation key, color) for a stored risk score, same bands as <=3 / <=6 / else"""
+    return _RISK_TABLE[min(max(math.ceil(score), 0), 10)]
+
+# Session-state keys holding the saved user profile
+_PROFILE_KEYS = (
+    "profile_age", "profile_gender", "profile_height", "profile_weight",
+    "profile_diet", "profile_exercise", "profile_sleep", "profile_smoking",
+    "profile_drinking", "profile_diabetes", "profile_activity",
+)
+
+# Starting values for the profile gate, where nothing has been saved yet
+_PROFILE_DEFAULTS = {
+    "profile_age": 30, "profile_gender": "prefer_not_say", "profile_height": 170,
+    "profile_weight": 70, "profile_diet": "non_vegetarian", "profile_exercise": "exercise_3_4",
+    "profile_sleep": 7.0, "profile_smoking": "never", "profile_drinking": "never",
+    "profile_diabetes": "habit_no", "profile_activity": "activity_active",
+}
+
+_SESSION_DEFAULTS = {"logged_in": False, "user_email": None, "user_name": None}
+
+for _key, _value in _SESSION_DEFAULTS.items():
+    st.session_state.setdefault(_key, _value)
 
 def check_authentication():
     """Check if user is authenticated"""
@@ -425,6 +548,12 @@ def logout():
     except Exception as e:
         print(f"Error signing out from Supabase: {e}")
 
+    # Drop cached auth session lookups
+    _fetch_session_info.clear()
+    st.session_state.pop("_sess_token", None)
+    if HAVE_HISTORY:
+        _clear_history_caches()
+
     # Clear session via manager
     if HAVE_SESSION_MANAGER:
         mgr = get_session_manager()
@@ -440,6 +569,8 @@ def logout():
     st.session_state["logged_in"] = False
     st.session_state["user_email"] = None
     st.session_state["user_name"] = None
+    # The next user's language choice must be written to their own row
+    st.session_state.pop("_last_persisted_lang", None)
     # Clear other session data
     st.session_state.pop("chat_messages", None)
     st.session_state.pop("viewing_history", None)
@@ -447,13 +578,13 @@ def logout():
     
     # Clear profile data
     st.session_state.pop("profile_completed", None)
-    for key in list(st.session_state.keys()):
-        if key.startswith("profile_"):
-            st.session_state.pop(key, None)
+    for key in _PROFILE_KEYS:
+        st.session_state.pop(key, None)
             
     # Clear query params (session_id and page)
     # This is correct for logout - we WANT to clear them here
-    st.query_params.clear()
+    if len(st.query_params) > 0:
+        st.query_params.clear()
     st.rerun()
 
 # ============================================================================
@@ -468,30 +599,101 @@ def set_language(lang: str):
     """Set language and persist to database if user is logged in"""
     st.session_state["user_language"] = lang
     
-    # Persist to database if user is authenticated
+    # Skip the write if this language is already persisted
+    if lang == st.session_state.get("_last_persisted_lang"):
+        return
+    
+    # Persist to database if user is authenticated (in the background so
+    # the rerun doesn't wait on Supabase)
     if check_authentication() and HAVE_AUTH:
         email = get_current_user_email()
         if email:
-            update_user_language(email, lang)
+            threading.Thread(target=update_user_language, args=(email, lang), daemon=True).start()
+            st.session_state["_last_persisted_lang"] = lang
+
+def _on_language_change(widget_key: str):
+    """Selectbox on_change callback: apply the new language before the rerun"""
+    set_language(st.session_state[widget_key])
+
+@st.cache_resource
+def _lang_table(lang: str) -> dict:
+    """Full resolved translation table for a language (built once per language)"""
+    all_keys = set().union(*(TRANSLATIONS[code] for code in TRANSLATIONS))
+    return {key: get_text(key, lang) for key in all_keys}
+
+@st.cache_resource
+def _profile_option_labels(lang: str) -> dict:
+    """Translated display labels for every profile selectbox, per language"""
+    option_sets = {
+        "gender": _GENDER_OPTIONS,
+        "diet": _DIET_OPTIONS,
+        "exercise": _EXERCISE_OPTIONS,
+        "smoking": _SMOKING_OPTIONS,
+        "drinking": _DRINKING_OPTIONS,
+        "diabetes": _DIABETES_OPTIONS,
+        "activity": _ACTIVITY_OPTIONS,
+    }
+    return {
+        field: {opt: get_text(opt, lang) for opt in options}
+        for field, options in option_sets.items()
+    }
+
+@lru_cache(maxsize=2048)
+def _t_cached(lang: str, key: str) -> str:
+    """Plain-dict memo in front of _lang_table, skipping st.cache hashing per call"""
+    return _lang_table(lang).get(key, key)
+
+_UPLOAD_INSTRUCTIONS_TMPL = """
+- {requirement_lighting}
+- {requirement_position}
+- {requirement_duration}
+"""
+
+@st.cache_resource
+def _upload_instructions_md(lang: str) -> str:
+    """Upload requirements list, formatted once per language"""
+    return _UPLOAD_INSTRUCTIONS_TMPL.format(**_lang_table(lang))
 
 def t(key: str) -> str:
     """Translation helper - get text for current language"""
-    return get_text(key, get_current_language())
+    return _t_cached(get_current_language(), key)
+
+class _AuthFailed(Exception):
+    """Raised out of _cached_auth so failed logins are never cached"""
+
+@st.cache_resource
+def _auth_cache_key() -> bytes:
+    """Random per-process HMAC key for the login cache (never leaves memory)"""
+    return secrets.token_bytes(32)
+
+def _auth_digest(email: str, password: str) -> str:
+    """Keyed digest of the credentials, used as _cached_auth's cache key"""
+    return hmac.new(_auth_cache_key(), f"{email}\0{password}".encode(), "sha256").hexdigest()
+
+@st.cache_data(ttl=30, max_entries=16, show_spinner=False)
+def _cached_auth(email: str, cred_digest: str, _password: str):
+    """
+    authenticate_user keyed on a keyed credential digest so retries skip
+    bcrypt. Only successful logins are cached (exceptions never are), without
+    the password hash; last_login is recorded by the caller on every login.
+    """
+    success, user, message = authenticate_user(email, _password, update_last_login=False)
+    if not success:
+        raise _AuthFailed(message)
+    return replace(user, password_hash="")
 
 def show_login_page():
     """Display login page"""
     # Language selector at top
-    lang_options = {code: f"{info['flag']} {info['name']}" for code, info in LANGUAGES.items()}
-    selected_lang = st.selectbox(
+    st.selectbox(
         t("language_label"),
-        options=list(lang_options.keys()),
-        format_func=lambda x: lang_options[x],
-        index=list(lang_options.keys()).index(get_current_language()),
-        key="login_lang_selector"
+        options=_LANG_CODES,
+        format_func=_LANG_LABELS.__getitem__,
+        index=_LANG_INDEX[get_current_language()],
+        key="login_lang_selector",
+        on_change=_on_language_change,
+        args=("login_lang_selector",)
     )
-    if selected_lang != get_current_language():
-        set_language(selected_lang)
-        st.rerun()
     
     st.title(f"🩺 {t('login_title')}")
     st.caption(t("login_subtitle"))
@@ -515,14 +717,22 @@ def show_login_page():
                 st.error(t("enter_email_password"))
             else:
                 with st.spinner(f"{t('loading')}..."):
-                    success, user, message = authenticate_user(email, password)
+                    try:
+                        user = _cached_auth(email.lower(), _auth_digest(email.lower(), password), password)
+                        success = True
+                        update_user_login(user.email)
+                    except _AuthFailed as e:
+                        success, user, message = False, None, str(e)
                     
                     if success:
                         st.session_state["logged_in"] = True
                         st.session_state["user_email"] = user.email
                         st.session_state["user_name"] = user.name
-                        # Set user's language preference
+                        # Set user's language preference; it is already stored for this user
                         st.session_state["user_language"] = user.language
+                        st.session_state["_last_persisted_lang"] = user.language
+                        # Fresh token so the cached session lookup starts clean
+                        st.session_state["_sess_token"] = uuid.uuid4().hex
                         st.success(f"✅ {t('login_success')}")
                         
                         # Set session token cookie
@@ -614,19 +824,852 @@ def show_signup_page():
 # HELPER FUNCTIONS
 # ============================================================================
 
-def fig_to_base64(fig) -> str:
-    """Convert matplotlib figure to base64 string for storage"""
+@st.cache_data(ttl=3600, max_entries=32)
+def _encode_fig(cache_key: str, _fig) -> bytes:
+    """PNG-encode a figure once per cache_key (the figure itself is not hashed)"""
     buf = BytesIO()
-    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    return img_base64
+    _fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
+
+def fig_to_png(fig, cache_key: str) -> bytes:
+    """
+    Convert matplotlib figure to PNG bytes for storage on SessionData.
+    cache_key should identify the plotted data (e.g. f"{session_id}:signal_plot").
+    """
+    return _encode_fig(cache_key, fig)
+
+_TTS_CACHE_DIR = Path.home() / ".wellio" / "tts_cache"
+
+# Sentence boundaries used to split long TTS requests into parallel pieces
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+@st.cache_resource
+def _tts_executor():
+    """Worker pool for gTTS requests, shared across reruns"""
+    return ThreadPoolExecutor(max_workers=4)
+
+def _prime_tts():
+    """Import gTTS and resolve its host so the first synthesis skips both"""
+    _evict_tts_cache()
+    try:
+        import gtts  # noqa: F401
+        socket.getaddrinfo("translate.google.com", 443)
+    except Exception as e:
+        print(f"TTS warm-up failed: {e}")
+
+@st.cache_resource
+def _start_tts_warmup():
+    """Kick off _prime_tts once per server process"""
+    threading.Thread(target=_prime_tts, daemon=True).start()
+
+def _gtts_mp3(text: str, lang: str) -> bytes:
+    """Single gTTS request; safe to run on a worker thread"""
+    from gtts import gTTS
+    mp3_fp = BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(mp3_fp)
+    return mp3_fp.getvalue()
+
+def _synthesize_mp3(text: str, lang: str) -> bytes:
+    """
+    gTTS synthesis with the sentences requested in parallel. MP3 frames are
+    self-contained, so the pieces are simply concatenated in order.
+    """
+    parts = [p for p in _SENTENCE_END.split(text.strip()) if p.strip()]
+    if len(parts) <= 1:
+        return _gtts_mp3(text, lang)
+    return b"".join(_tts_executor().map(lambda part: _gtts_mp3(part, lang), parts))
+
+# Flush a TTS piece at a sentence end, or after this many streamed tokens
+_TTS_FLUSH_RE = re.compile(r"[.?!।]\s*$")
+_TTS_FLUSH_TOKENS = 80
+
+def _tee_sentences_to_tts(tokens, lang: str, futures: list):
+    """
+    Pass streamed tokens through unchanged while submitting each completed
+    sentence to the TTS pool, so audio is synthesized alongside the text.
+    """
+    buf, count = "", 0
+    for token in tokens:
+        yield token
+        buf += token
+        count += 1
+        if _TTS_FLUSH_RE.search(buf) or count >= _TTS_FLUSH_TOKENS:
+            if buf.strip():
+                futures.append(_tts_executor().submit(_gtts_mp3, buf.strip(), lang))
+            buf, count = "", 0
+    if buf.strip():
+        futures.append(_tts_executor().submit(_gtts_mp3, buf.strip(), lang))
+
+def _tts_cache_path(text: str, lang: str, ext: str = "mp3") -> Path:
+    """On-disk location of the clip for (text, lang)"""
+    key = hashlib.sha1((lang + "\0" + text).encode("utf-8")).hexdigest()
+    return _TTS_CACHE_DIR / f"{key}.{ext}"
+
+def _mp3_to_opus(mp3: bytes) -> Optional[bytes]:
+    """Re-encode gTTS MP3 as 24 kbps Opus/Ogg (speech stays clear); None on failure"""
+    try:
+        out = BytesIO()
+        AudioSegment.from_file(BytesIO(mp3), format="mp3").export(
+            out, format="ogg", codec="libopus", bitrate="24k"
+        )
+        return out.getvalue()
+    except Exception as e:
+        print(f"Opus encode failed: {e}")
+        return None
+
+def _audio_mime(audio) -> str:
+    """st.audio format for a cached clip path or raw MP3 bytes"""
+    return "audio/ogg" if isinstance(audio, str) and audio.endswith(".ogg") else "audio/mp3"
+
+def _store_tts(cache_path: Path, audio: bytes) -> bool:
+    """Atomically write audio into the TTS cache; False if the disk refused"""
+    # Write to a temp file first so a concurrent reader never sees a partial MP3
+    try:
+        _TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(audio)
+        os.replace(tmp_path, cache_path)
+        return True
+    except OSError as e:
+        print(f"Could not cache TTS audio: {e}")
+        return False
+
+def _tts_file(text: str, lang: str, audio: Optional[bytes] = None) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    (path, audio) for (text, lang): the cached clip's path, synthesizing it
+    (or storing the given audio) on a miss. Chat messages keep the path
+    instead of the bytes. path is None if the cache directory isn't
+    writable; audio is then the MP3 that was synthesized, so callers fall
+    back to it without calling gTTS again. audio is None on a cache hit.
+    """
+    for ext in (("ogg", "mp3") if HAVE_PYDUB else ("mp3",)):
+        cache_path = _tts_cache_path(text, lang, ext)
+        if cache_path.exists():
+            os.utime(cache_path)
+            return str(cache_path), None
+    if audio is None:
+        audio = _synthesize_mp3(text, lang)
+    
+    # Opus when ffmpeg is around: the clip is encoded once, then served smaller every play
+    if HAVE_PYDUB:
+        opus = _mp3_to_opus(audio)
+        if opus is not None:
+            cache_path = _tts_cache_path(text, lang, "ogg")
+            return (str(cache_path) if _store_tts(cache_path, opus) else None), audio
+    cache_path = _tts_cache_path(text, lang)
+    return (str(cache_path) if _store_tts(cache_path, audio) else None), audio
+
+# Least-recently-used TTS files are evicted beyond this total size
+_TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+def _evict_tts_cache():
+    """Trim the TTS cache to _TTS_CACHE_MAX_BYTES, oldest mtime first"""
+    files = []
+    for f in _TTS_CACHE_DIR.glob("*.*"):
+        if f.suffix not in (".mp3", ".ogg"):
+            continue
+        try:
+            stat = f.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, f))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    for _, size, f in files:
+        if total <= _TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            f.unlink()
+            total -= size
+        except OSError:
+            pass
+
+_start_tts_warmup()
 
-def base64_to_image(img_base64: str):
-    """Convert base64 string back to displayable image"""
-    img_data = base64.b64decode(img_base64)
-    return BytesIO(img_data)
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def _history_label(dt) -> str:
+    """Same as dt.strftime("%d %b %Y · %I:%M %p"), without the format parsing"""
+    return (f"{dt.day:02d} {_MONTHS[dt.month - 1]} {dt.year} · "
+            f"{(dt.hour - 1) % 12 + 1:02d}:{dt.minute:02d} {'AM' if dt.hour < 12 else 'PM'}")
+
+@st.cache_data(ttl=300, max_entries=64)
+def _load_history(user_email: str, version: int):
+    """
+    Session count, 10 most recent sessions and their display timestamps for
+    the history sidebar. `version` (get_history_version) moves on when the
+    user's sessions change on disk; cleared on save or logout as well.
+    """
+    sessions = list_sessions(user_email, limit=10)
+    labels = []
+    for session in sessions:
+        dt_ist = to_ist_display(session.timestamp_dt)
+        labels.append(_history_label(dt_ist) if dt_ist else "Unknown date")
+    return get_session_count(user_email), sessions, labels
+
+# Trend classification -> status badge color
+_STATUS_COLORS = {
+    "Improving": "#16a34a",
+    "Stable": "#3b82f6",
+    "Worsening": "#f59e0b",
+    "Concerning": "#dc2626"
+}
+
+_BADGE_TMPL = (
+    "<div style='padding:8px 16px;border-radius:8px;background:{color};color:white;font-weight:600;display:inline-block;margin-bottom:16px'>"
+    "{label}: {value}</div>"
+)
+
+# One entry per trends-view metric block, in display order. heading=None uses
+# the metric's own name; rise/fall_color are st.metric delta colors.
+_TREND_CHARTS = (
+    dict(attr="heart_rate", icon="❤️", heading=None, fmt="{:.1f} BPM",
+         rise_color="inverse", fall_color="normal",
+         label="Heart Rate", color="#ef4444", trend_color="#991b1b",
+         ylabel="heart_rate_bpm", title="heart_rate_trend", target=None, target_label=None),
+    dict(attr="stress_level", icon="😰", heading=None, fmt="{:.1f}/10",
+         rise_color="inverse", fall_color="normal",
+         label="Stress Level", color="#f59e0b", trend_color="#92400e",
+         ylabel="stress_level_scale", title="stress_level_trend", target=None, target_label=None),
+    dict(attr="bp_systolic", icon="🩺", heading="Blood Pressure (Systolic)", fmt="{:.0f} mmHg",
+         rise_color="inverse", fall_color="normal",
+         label="Systolic BP", color="#3b82f6", trend_color="#1e40af",
+         ylabel="systolic_bp_mmhg", title="bp_trend", target=120, target_label="Target (120)"),
+    dict(attr="spo2", icon="🫁", heading=None, fmt="{:.1f}%",
+         rise_color="normal", fall_color="inverse",
+         label="SpO₂", color="#10b981", trend_color="#047857",
+         ylabel="spo2_percent", title="spo2_trend", target=95, target_label="Normal Threshold (95%)"),
+)
+
+@st.cache_resource
+def _trend_figure():
+    """
+    One reusable (figure, axes, lock) for trend charts. Built outside pyplot so
+    it is never registered globally; the lock serializes concurrent sessions.
+    """
+    fig = Figure(figsize=(10, 4))
+    return fig, fig.subplots(), threading.Lock()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _render_trend_png(timestamps: tuple, values: tuple, label: str, color: str, trend_color: str,
+                      xlabel: str, ylabel: str, title: str,
+                      target: Optional[float] = None, target_label: Optional[str] = None) -> bytes:
+    """Render one trends-view chart to PNG bytes, cached on the plotted data and labels"""
+    fig, ax, lock = _trend_figure()
+    with lock:
+        ax.cla()
+        ax.plot(timestamps, values, marker='o', linewidth=2, markersize=8, color=color, label=label)
+        if target is not None:
+            ax.axhline(y=target, color='green', linestyle='--', alpha=0.5, label=target_label)
+
+        # Trend line
+        if len(values) >= 2:
+            slope, intercept = linfit_uniform(np.asarray(values, dtype=float))
+            ax.plot(timestamps, intercept + slope * np.arange(len(values)), "--", alpha=0.5, color=trend_color, label='Trend')
+
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
+        buf = BytesIO()
+        # Fast zlib level: these PNGs go straight to the browser, not to disk
+        fig.savefig(buf, format='png', dpi=90, pil_kwargs={'compress_level': 1})
+    return buf.getvalue()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _cached_load_session(username: str, session_id: str):
+    """Session metadata (no plots) memoized per (user, session) for the history replay view"""
+    return load_session_meta(username, session_id)
+
+@st.cache_data(ttl=600, max_entries=16, show_spinner=False)
+def _cached_session_plots(username: str, session_id: str) -> dict:
+    """A session's plot PNGs, loaded only when the visualizations section renders"""
+    return load_session_plots(username, session_id)
+
+@st.cache_resource
+def _pdf_executor():
+    """Worker pool for PDF reports, shared across reruns"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource
+def _insights_executor():
+    """Worker pool for AI insight requests, shared across reruns"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource(ttl=3600, max_entries=32)
+def _pdf_slot(username: str, session_id: str) -> dict:
+    """
+    Per-session holder for the history PDF job. A finished job keeps its
+    PDF for the hour on purpose: the download button needs the bytes on
+    every rerun, and text-only reports are a few KB each.
+    """
+    return {"lock": threading.Lock()}
+
+def _pdf_job(username: str, session_id: str):
+    """
+    Future for a stored session's PDF report. Generation runs on the worker
+    pool and is started once per session, so reruns (or a second click)
+    pick up the same job instead of rebuilding the report.
+    """
+    slot = _pdf_slot(username, session_id)
+    with slot["lock"]:
+        if "job" not in slot:
+            slot["job"] = _pdf_executor().submit(generate_session_report, username, session_id)
+        return slot["job"]
+
+def _drop_pdf_job(username: str, session_id: str):
+    """Forget this session's PDF job (after it failed) so the next click retries"""
+    _pdf_slot(username, session_id).pop("job", None)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_list_sessions(username: str, version: int, limit: int = 50, offset: int = 0):
+    """list_sessions memoized per (user, history version, page) for the all-history view"""
+    return list_sessions(username, limit=limit, offset=offset)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_session_count(username: str, version: int) -> int:
+    """get_session_count memoized per (user, history version) for the all-history view"""
+    return get_session_count(username)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_trend_analysis(username: str, period: int, user_age: int):
+    """get_trend_analysis memoized per (user, period, age) for the trends view"""
+    return get_trend_analysis(username, days=period, user_age=user_age)
+
+def _clear_history_caches():
+    """Drop every cached view of stored sessions (after a save or logout)"""
+    _load_history.clear()
+    _cached_load_session.clear()
+    _cached_session_plots.clear()
+    _cached_list_sessions.clear()
+    _cached_session_count.clear()
+    _cached_trend_analysis.clear()
+
+def render_profile_form(key_prefix: str, defaults: Optional[dict] = None) -> bool:
+    """
+    Profile form shared by the profile gate and the sidebar. Widgets start
+    from the saved profile, falling back to `defaults` (blank if None).
+    Returns True once a complete profile has been saved to session state.
+    """
+    option_labels = _profile_option_labels(get_current_language())
+    defaults = defaults or {}
+
+    def saved(key):
+        return st.session_state.get(f"profile_{key}", defaults.get(f"profile_{key}"))
+
+    def number(key, label, placeholder, **kwargs):
+        return st.number_input(t(label), key=f"{key_prefix}_profile_{key}",
+                               value=saved(key), placeholder=placeholder, **kwargs)
+
+    def choice(key, label, options, placeholder=None):
+        value = saved(key)
+        return st.selectbox(
+            t(label),
+            options=options,
+            format_func=option_labels[key].__getitem__,
+            key=f"{key_prefix}_profile_{key}",
+            index=options.index(value) if value in options else None,
+            placeholder=placeholder or "Choose an option"
+        )
+
+    with st.form(f"{key_prefix}_profile_form", clear_on_submit=False):
+        age = number("age", "age_label", "Ex: 30", min_value=0, max_value=120)
+        gender = choice("gender", "gender_label", _GENDER_OPTIONS, "Select Gender")
+        height = number("height", "height_label", "Ex: 170", min_value=50, max_value=250)
+        weight = number("weight", "weight_label", "Ex: 70", min_value=20, max_value=300)
+        diet = choice("diet", "diet_label", _DIET_OPTIONS, "Select Diet")
+        exercise = choice("exercise", "exercise_label", _EXERCISE_OPTIONS, "Select Exercise Level")
+        sleep = number("sleep", "sleep_label", "Ex: 7.0", min_value=0.0, max_value=24.0, step=0.5)
+        smoking = choice("smoking", "smoking_label", _SMOKING_OPTIONS, "Select Smoking Status")
+        diabetes = choice("diabetes", "diabetes_label", _DIABETES_OPTIONS)
+        activity = choice("activity", "physical_activity_label", _ACTIVITY_OPTIONS)
+        drinking = choice("drinking", "drinking_label", _DRINKING_OPTIONS, "Select Drinking Status")
+
+        submitted = st.form_submit_button(t("save_profile_button"), type="primary", use_container_width=True)
+
+    if not submitted:
+        return False
+
+    values = (age, gender, height, weight, diet, exercise, sleep, smoking, drinking, diabetes, activity)
+    if any(x is None for x in values):
+        st.error("Please fill in all fields to save your profile.")
+        return False
+
+    # Map form values to main session state keys expected by the app
+    st.session_state.update(zip(_PROFILE_KEYS, values))
+    st.session_state["profile_completed"] = True
+    st.success(f"✅ {t('profile_saved')}")
+    return True
+
+_VITAL_BADGE_HTML = (
+    "<div><div style='display:inline-block;padding:6px 12px;border-radius:8px;background:{color};"
+    "color:white;font-weight:600;font-size:14px'>{label}</div></div>"
+)
+_VITAL_BADGE_ROW_HTML = "<div style='display:grid;grid-template-columns:repeat(4,1fr);gap:1rem'>{cells}</div>"
+
+def _vital_badge(metric: str, value):
+    """(translated label, color) for a vital reading; N/A when missing or NaN"""
+    key, color = vital_band(metric, value)
+    return t(key), color
+
+def _vital_badge_row(readings) -> str:
+    """One grid row of range badges for (metric, value) pairs"""
+    cells = []
+    for metric, value in readings:
+        label, color = _vital_badge(metric, value)
+        cells.append(_VITAL_BADGE_HTML.format(color=color, label=label))
+    return _VITAL_BADGE_ROW_HTML.format(cells="".join(cells))
+
+# Bytes hashed from each end of a video to fingerprint it
+_FINGERPRINT_WINDOW = 64 * 1024
+
+def _video_fingerprint(path: str) -> str:
+    """
+    Cheap content key for a video: file size plus its first and last 64 KiB.
+    Container headers and trailers differ between recordings, so this
+    separates real-world videos without reading the whole file.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(_FINGERPRINT_WINDOW))
+        if size > _FINGERPRINT_WINDOW:
+            f.seek(max(_FINGERPRINT_WINDOW, size - _FINGERPRINT_WINDOW))
+            h.update(f.read(_FINGERPRINT_WINDOW))
+    return h.hexdigest()
+
+def _buffer_fingerprint(buf) -> str:
+    """_video_fingerprint of an in-memory upload, without writing it to disk"""
+    buf = memoryview(buf)
+    size = len(buf)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    h.update(buf[:_FINGERPRINT_WINDOW])
+    if size > _FINGERPRINT_WINDOW:
+        h.update(buf[max(_FINGERPRINT_WINDOW, size - _FINGERPRINT_WINDOW):])
+    return h.hexdigest()
+
+def _write_upload(uploaded_file, path: str) -> str:
+    """Spill an upload to disk for the decoder; returns the path"""
+    with open(path, "wb") as f:
+        f.write(uploaded_file.getbuffer())
+    return path
+
+@st.cache_resource(ttl=24 * 60 * 60, max_entries=32, show_spinner=False)
+def _estimate_slot(video_hash: str, use_mediapipe) -> dict:
+    """
+    Per-video holder for (vitals, risk), filled by _cached_estimate. The
+    estimate runs outside any cached function: Streamlit would record the
+    progress-bar updates and fail replaying them on a hit.
+    """
+    return {"lock": threading.Lock()}
+
+def _cached_estimate(video_hash: str, get_video_path, use_mediapipe, progress_callback):
+    """
+    estimate_vitals_from_video keyed on the video fingerprint, so re-uploads
+    are instant. get_video_path and progress_callback are only called on a
+    miss, so a cached upload is never written to disk. Returns (vitals, risk):
+    the filtered signal isn't displayed, so it isn't kept. A failed estimate
+    leaves the slot empty and is retried on the next run.
+    """
+    slot = _estimate_slot(video_hash, use_mediapipe)
+    with slot["lock"]:
+        if "result" not in slot:
+            vitals, _filtered_signal, risk = estimate_vitals_from_video(
+                get_video_path(),
+                use_mediapipe=use_mediapipe,
+                progress_callback=progress_callback
+            )
+            slot["result"] = (vitals, risk)
+    return slot["result"]
+
+# Profile-risk factor bits, in display order: (is risk factor, template,
+# label translation key). Templates see the label and the raw inputs.
+_PROFILE_FACTORS = (
+    (False, "✅ {label}: {age} (<30)", "risk_factor_age"),
+    (True, "⚠️ {label}: {age} (30-40)", "risk_factor_age"),
+    (True, "⚠️ {label}: {age} (41-50)", "risk_factor_age"),
+    (True, "⚠️ {label}: {age} (51-60)", "risk_factor_age"),
+    (True, "⚠️ {label}: {age} (>60)", "risk_factor_age"),
+    (False, "✅ {label}: {bmi:.1f} (Normal)", "risk_factor_bmi"),
+    (True, "⚠️ {label}: {bmi:.1f} (Overweight)", "risk_factor_bmi"),
+    (True, "⚠️ {label}: {bmi:.1f} (Obese)", "risk_factor_bmi"),
+    (False, "✅ {label}: {hr:.0f} BPM", "risk_factor_hr"),
+    (True, "⚠️ {label}: {hr:.0f} BPM (Elevated)", "risk_factor_hr"),
+    (True, "⚠️ {label}: {hr:.0f} BPM (High)", "risk_factor_hr"),
+    (True, "⚠️ {label}: {hr:.0f} BPM (Tachycardia)", "risk_factor_hr"),
+    (True, "⚠️ {label}: {hr:.0f} BPM (Bradycardia)", "risk_factor_hr"),
+    (False, "✅ HRV (RMSSD): {hrv:.1f}ms (Good)", "risk_factor_hrv"),
+    (True, "⚠️ {label}: {hrv:.1f}ms (Moderate)", "risk_factor_hrv"),
+    (True, "⚠️ {label}: {hrv:.1f}ms (Low)", "risk_factor_hrv"),
+    (True, "⚠️ {label}: {hrv:.1f}ms (Very Low)", "risk_factor_hrv"),
+    (False, "✅ {label}: {bp:.0f} mmHg (Optimal)", "risk_factor_bp"),
+    (True, "⚠️ {label}: {bp:.0f} mmHg (Elevated)", "risk_factor_bp"),
+    (True, "⚠️ {label}: {bp:.0f} mmHg (Stage 1)", "risk_factor_bp"),
+    (True, "⚠️ {label}: {bp:.0f} mmHg (Stage 2)", "risk_factor_bp"),
+    (False, "✅ {label}: {spo2:.0f}% (Normal)", "risk_factor_spo2"),
+    (True, "⚠️ {label}: {spo2:.0f}% (Mildly Low)", "risk_factor_spo2"),
+    (True, "⚠️ {label}: {spo2:.0f}% (Low)", "risk_factor_spo2"),
+    (False, "✅ {label}: Never", "risk_factor_smoking"),
+    (True, "⚠️ {label}: Occasional/Former", "risk_factor_smoking"),
+    (True, "⚠️ {label}: Regular", "risk_factor_smoking"),
+    (True, "⚠️ {label}: Yes", "risk_factor_diabetes"),
+    (False, "✅ {label}: No", "risk_factor_diabetes"),
+    (False, "✅ {label}: Active", "risk_factor_activity"),
+    (True, "⚠️ {label}: Sedentary", "risk_factor_activity"),
+)
+
+def _smoking_code(smoking) -> int:
+    """0 never, 1 occasional/former, 2 regular, 3 unrecognised"""
+    sm = str(smoking).lower()
+    if "never" in sm:
+        return 0
+    if "occasional" in sm or "occ" in sm or "former" in sm:
+        return 1
+    if "regular" in sm:
+        return 2
+    return 3
+
+@njit(cache=True)
+def _profile_risk_kernel(age, bmi, hr, hrv_rmssd, bp_sys, spo2, smoke_c, diabetic, active):
+    """
+    Scores for the three risk groups plus a bitmask of _PROFILE_FACTORS.
+    Missing vitals are passed as NaN and skipped.
+    """
+    mask = 0
+
+    # 1) Demographic & Profile Risk (Max = 3)
+    demo = 0.0
+    if age < 30:
+        mask |= 1 << 0
+    elif 30 <= age <= 40:
+        demo += 0.5
+        mask |= 1 << 1
+    elif 41 <= age <= 50:
+        demo += 1.0
+        mask |= 1 << 2
+    elif 51 <= age <= 60:
+        demo += 1.5
+        mask |= 1 << 3
+    else:
+        demo += 2.0
+        mask |= 1 << 4
+
+    if 18.5 <= bmi <= 24.9:
+        mask |= 1 << 5
+    elif 25 <= bmi <= 29.9:
+        demo += 0.5
+        mask |= 1 << 6
+    elif bmi >= 30:
+        demo += 1.0
+        mask |= 1 << 7
+    demo = min(demo, 3.0)
+
+    # 2) Vital Sign Risk (Max = 5)
+    vital = 0.0
+    # HEART RATE: 60-80=0, 81-90=0.5, 91-100=1, >100=1.5, <50=1
+    if not math.isnan(hr):
+        if 60 <= hr <= 80:
+            mask |= 1 << 8
+        elif 81 <= hr <= 90:
+            vital += 0.5
+            mask |= 1 << 9
+        elif 91 <= hr <= 100:
+            vital += 1.0
+            mask |= 1 << 10
+        elif hr > 100:
+            vital += 1.5
+            mask |= 1 << 11
+        elif hr < 50:
+            vital += 1.0
+            mask |= 1 << 12
+    # HRV (RMSSD): >50=0, 30-50=0.5, 20-30=1, <20=1.5
+    if not math.isnan(hrv_rmssd):
+        if hrv_rmssd > 50:
+            mask |= 1 << 13
+        elif 30 <= hrv_rmssd <= 50:
+            vital += 0.5
+            mask |= 1 << 14
+        elif 20 <= hrv_rmssd < 30:
+            vital += 1.0
+            mask |= 1 << 15
+        elif hrv_rmssd < 20:
+            vital += 1.5
+            mask |= 1 << 16
+    # BLOOD PRESSURE (Systolic): <120=0, 120-129=0.5, 130-139=1, >=140=1.5
+    if not math.isnan(bp_sys):
+        if bp_sys < 120:
+            mask |= 1 << 17
+        elif 120 <= bp_sys <= 129:
+            vital += 0.5
+            mask |= 1 << 18
+        elif 130 <= bp_sys <= 139:
+            vital += 1.0
+            mask |= 1 << 19
+        elif bp_sys >= 140:
+            vital += 1.5
+            mask |= 1 << 20
+    # SpO2: >=97%=0, 94-96%=0.5, <94%=1
+    if not math.isnan(spo2):
+        if spo2 >= 97:
+            mask |= 1 << 21
+        elif 94 <= spo2 <= 96:
+            vital += 0.5
+            mask |= 1 << 22
+        elif spo2 < 94:
+            vital += 1.0
+            mask |= 1 << 23
+    vital = min(vital, 5.0)
+
+    # 3) Lifestyle & Medical History Risk (Max = 2)
+    lifestyle = 0.0
+    # SMOKING: No=0, Occasional=0.5, Regular=1
+    if smoke_c == 0:
+        mask |= 1 << 24
+    elif smoke_c == 1:
+        lifestyle += 0.5
+        mask |= 1 << 25
+    elif smoke_c == 2:
+        lifestyle += 1.0
+        mask |= 1 << 26
+    # DIABETES: No=0, Yes=1
+    if diabetic:
+        lifestyle += 1.0
+        mask |= 1 << 27
+    else:
+        mask |= 1 << 28
+    # PHYSICAL ACTIVITY: Active=0, Sedentary=0.5
+    if active:
+        mask |= 1 << 29
+    else:
+        lifestyle += 0.5
+        mask |= 1 << 30
+    lifestyle = min(lifestyle, 2.0)
+
+    return demo, vital, lifestyle, mask
+
+def _nan_if_none(x) -> float:
+    return math.nan if x is None else float(x)
+
+def _or_default(x, default: float) -> float:
+    """x as a float, or default when it is None, NaN or not numeric"""
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        return default
+    return default if math.isnan(x) else x
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def compute_profile_risk(age, height, weight, smoking, diabetes, activity,
+                         hr, hrv_rmssd, bp_sys, spo2, lang: str) -> dict:
+    """
+    Profile + vitals risk score (0-10) with its contributing factors, labelled
+    in `lang`. Pure in its arguments, so reruns of the results page hit the cache.
+    The scoring runs in _profile_risk_kernel; this decodes its factor bits.
+    """
+    try:
+        bmi_val = weight / ((height/100.0)**2)
+    except Exception:
+        bmi_val = 22.0
+
+    demo_score, vital_score, lifestyle_score, mask = _profile_risk_kernel(
+        float(age), float(bmi_val),
+        _nan_if_none(hr), _nan_if_none(hrv_rmssd), _nan_if_none(bp_sys), _nan_if_none(spo2),
+        _smoking_code(smoking),
+        "yes" in str(diabetes).lower(),
+        "active" in str(activity).lower(),
+    )
+
+    values = {"age": age, "bmi": bmi_val, "hr": hr, "hrv": hrv_rmssd, "bp": bp_sys, "spo2": spo2}
+    risk_factors = []
+    protective_factors = []
+    for bit, (is_risk, template, label_key) in enumerate(_PROFILE_FACTORS):
+        if mask >> bit & 1:
+            text = template.format(label=_t_cached(lang, label_key), **values)
+            (risk_factors if is_risk else protective_factors).append(text)
+
+    # FINAL SCORE
+    total_score = demo_score + vital_score + lifestyle_score
+    total_score = float(round(min(10.0, total_score), 1))
+
+    if total_score <= 3.0:
+        level = "Low"
+    elif total_score <= 6.0:
+        level = "Moderate"
+    else:
+        level = "High"
+
+    return {
+        "score": total_score, 
+        "level": level, 
+        "risk_factors": risk_factors,
+        "protective_factors": protective_factors,
+        "breakdown": {
+            "demographic": demo_score,
+            "vitals": vital_score,
+            "lifestyle": lifestyle_score
+        }
+    }
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def build_audio_text(hr, stress, bp_sys, bp_dia, spo2, risk_score, risk_level,
+                     recommendations, symptoms, lang: str) -> str:
+    """
+    Spoken summary for the audio player, in `lang`. recommendations and
+    symptoms are None when AI insights are unavailable.
+    """
+    parts = [_t_cached(lang, "audio_intro"), " "]
+    parts += [_t_cached(lang, "audio_hr").format(value=f"{hr:.0f}"), " "]
+    
+    # Check if stress is valid
+    if stress is not None:
+        parts += [_t_cached(lang, "audio_stress").format(value=f"{stress:.1f}"), " "]
+    
+    if bp_sys is not None and bp_dia is not None:
+        parts += [_t_cached(lang, "audio_bp").format(systolic=f"{bp_sys:.0f}", diastolic=f"{bp_dia:.0f}"), " "]
+    
+    if spo2 is not None:
+        parts += [_t_cached(lang, "audio_spo2").format(value=f"{spo2:.1f}"), " "]
+    
+    # Risk Assessment
+    # Map risk_level to translated string
+    translated_level = _t_cached(lang, f"{risk_level.lower()}_risk")
+    parts += [_t_cached(lang, "audio_risk").format(score=risk_score, level=translated_level), " "]
+    
+    if recommendations is not None:
+        parts += [_t_cached(lang, "audio_insights_intro"), " "]
+        if recommendations:
+            # Clean up markdown bullets if present
+            clean_recs = [r.replace("*", "").strip() for r in recommendations]
+            parts += [_t_cached(lang, "audio_recs"), ". ".join(clean_recs[:3]), ". "]
+        if symptoms:
+            clean_sym = [s.replace("*", "").strip() for s in symptoms]
+            parts += [_t_cached(lang, "audio_symptoms"), ". ".join(clean_sym[:3]), ". "]
+    
+    return "".join(parts)
+
+@_fragment
+def _audio_summary_section(vitals, risk_score, risk_level, insights):
+    """
+    Audio summary button and player. A fragment, so generating or downloading
+    the clip reruns only this section, not the whole results page.
+    insights is None when AI insights are unavailable.
+    """
+    st.divider()
+    st.subheader(f"🔊 {t('audio_summary_title') if 'audio_summary_title' in locals() else 'Audio Summary'}")
+
+    # Layout: Button on left, Player on right
+    audio_col1, audio_col2 = st.columns([1, 2])
+
+    with audio_col1:
+        # Check for language change to trigger auto-regeneration
+        current_lang = get_current_language()
+        stored_lang = st.session_state.get("audio_generated_lang")
+        auto_regenerate = False
+
+        # If audio exists but language doesn't match, regenerate
+        if stored_lang and stored_lang != current_lang and "audio_summary" in st.session_state:
+            auto_regenerate = True
+
+        if st.button(t("generate_audio_summary") if 'generate_audio_summary' in locals() else "Generate Audio Summary", use_container_width=True) or auto_regenerate:
+            with st.spinner(t("generating_audio") if 'generating_audio' in locals() else "Generating audio..."):
+                try:
+                    # Construct text using translations
+                    have_insights = insights is not None and not insights.error
+                    summary_text = build_audio_text(
+                        vitals.heart_rate_bpm, vitals.stress_level,
+                        vitals.bp_systolic, vitals.bp_diastolic, vitals.spo2,
+                        risk_score, risk_level,
+                        tuple(insights.recommendations or ()) if have_insights else None,
+                        tuple(insights.symptoms_to_watch or ()) if have_insights else None,
+                        current_lang,
+                    )
+
+                    # Generate Audio (cached per text + language)
+                    # Keep the cached clip's path in session state; bytes
+                    # only if the TTS cache directory isn't writable
+                    audio_path, audio = _tts_file(summary_text, current_lang)
+                    st.session_state["audio_summary"] = audio_path or audio
+                    st.session_state["audio_generated_lang"] = current_lang
+                    # No rerun needed: the player column below renders
+                    # later in this same fragment run
+
+                except Exception as e:
+                    st.error(f"Error generating audio: {e}")
+
+    with audio_col2:
+        # Display audio if available in session state
+        audio_summary = st.session_state.get("audio_summary")
+        if isinstance(audio_summary, str) and not os.path.exists(audio_summary):
+            # Evicted from the TTS cache since it was generated
+            st.session_state.pop("audio_summary", None)
+            audio_summary = None
+        if audio_summary is not None:
+            audio_mime = _audio_mime(audio_summary)
+            st.audio(audio_summary, format=audio_mime)
+
+            st.download_button(
+                label="💾 " + (t("download_audio") if 'download_audio' in locals() else "Download Audio"),
+                data=Path(audio_summary).read_bytes() if isinstance(audio_summary, str) else audio_summary,
+                file_name=f"Health_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{audio_mime.split('/')[1]}",
+                mime=audio_mime,
+                use_container_width=True
+            )
+
+@lru_cache(maxsize=1)
+def _s3_bucket() -> str:
+    """Report bucket, read from the environment once per process"""
+    return os.environ.get("AWS_S3_BUCKET", "wellio-uploads")
+
+def _upload_report_pdf(user_email: str, pdf_bytes: bytes, timestamp: str):
+    """
+    Copy a generated report to S3 (runs on the PDF pool; failures are logged,
+    not shown). timestamp is the one used in the download's file name.
+    """
+    try:
+        s3_key = f"reports/{user_email}/{timestamp}_health_report.pdf"
+        upload_bytes(pdf_bytes, _s3_bucket(), s3_key, content_type='application/pdf')
+    except Exception as e:
+        print(f"Report upload to S3 failed: {e}")
+
+@_fragment
+def _pdf_report_section(session_data):
+    """
+    Generate/download controls for the current session's PDF. A fragment, so
+    the button only reruns this section; the report is built in place and
+    only the S3 copy runs in the background.
+    """
+    # PDF Download button
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if st.button("📄 Generate PDF Report", type="secondary"):
+            st.session_state["generate_pdf"] = True
+    
+    # Show download button if PDF generation was requested
+    if st.session_state.get("generate_pdf", False):
+        with col2:
+            with st.spinner("Generating PDF..."):
+                try:
+                    pdf_bytes = generate_health_report(session_data)
+                    # One stamp for the download name and the S3 key
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    st.download_button(
+                        label="💾 Download PDF",
+                        data=pdf_bytes,
+                        file_name=f"Health_Report_{timestamp}.pdf",
+                        mime="application/pdf",
+                        type="primary"
+                    )
+                    st.session_state["generate_pdf"] = False
+                    
+                    # AUTO UPLOAD TO S3
+                    if HAVE_S3 and HAVE_AUTH and check_authentication():
+                        _pdf_executor().submit(_upload_report_pdf, get_current_user_email(), pdf_bytes, timestamp)
+                except Exception as e:
+                    st.error(f"Error generating PDF: {str(e)}")
+                    st.session_state["generate_pdf"] = False
 
 # ============================================================================
 # AUTHENTICATION CHECK
@@ -650,398 +1693,174 @@ if not st.session_state.get("profile_completed", False):
     st.title(f"👤 {t('user_profile_title')}")
     st.info(f"ℹ️ {t('profile_required_info')}")
     
-    with st.form("main_profile_form"):
-        age = st.number_input(t("age_label"), min_value=0, max_value=120, value=30, key="main_profile_age")
-        
-        # Gender options
-        gender_options = ["prefer_not_say", "female", "male", "other"]
-        gender_display = {opt: t(opt) for opt in gender_options}
-        gender = st.selectbox(
-            t("gender_label"), 
-            options=gender_options,
-            format_func=lambda x: gender_display[x],
-            index=0, 
-            key="main_profile_gender"
-        )
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            height = st.number_input(t("height_label"), min_value=50, max_value=250, value=170, key="main_profile_height")
-        with col2:
-            weight = st.number_input(t("weight_label"), min_value=20, max_value=300, value=70, key="main_profile_weight")
-        
-        # Diet options
-        diet_options = ["non_vegetarian", "vegetarian", "vegan", "other"]
-        diet_display = {opt: t(opt) for opt in diet_options}
-        diet = st.selectbox(
-            t("diet_label"),
-            options=diet_options,
-            format_func=lambda x: diet_display[x],
-            index=0,
-            key="main_profile_diet"
-        )
-        
-        # Exercise options
-        exercise_options = ["never", "exercise_1_2", "exercise_3_4", "daily"]
-        exercise_display = {opt: t(opt) for opt in exercise_options}
-        exercise = st.selectbox(
-            t("exercise_label"),
-            options=exercise_options,
-            format_func=lambda x: exercise_display[x],
-            index=2,
-            key="main_profile_exercise"
-        )
-        
-        sleep = st.number_input(t("sleep_label"), min_value=0.0, max_value=24.0, value=7.0, step=0.5, key="main_profile_sleep")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            # Smoking options
-            smoking_options = ["never", "occasional", "regular", "former"]
-            smoking_display = {opt: t(opt) for opt in smoking_options}
-            smoking = st.selectbox(
-                t("smoking_label"),
-                options=smoking_options,
-                format_func=lambda x: smoking_display[x],
-                index=0,
-                key="main_profile_smoking"
-            )
-        with col2:
-            # Drinking options
-            drinking_options = ["never", "occasional", "regular", "former"]
-            drinking_display = {opt: t(opt) for opt in drinking_options}
-            drinking = st.selectbox(
-                t("drinking_label"),
-                options=drinking_options,
-                format_func=lambda x: drinking_display[x],
-                index=0,
-                key="main_profile_drinking"
-            )
-        
-        st.markdown("---")
-        submitted = st.form_submit_button(t("save_profile_button"), type="primary", use_container_width=True)
-        
-        if submitted:
-            # Sync to sidebar keys to ensure consistency if sidebar is rendered later
-            st.session_state["profile_age"] = age
-            st.session_state["profile_gender"] = gender
-            st.session_state["profile_height"] = height
-            st.session_state["profile_weight"] = weight
-            st.session_state["profile_diet"] = diet
-            st.session_state["profile_exercise"] = exercise
-            st.session_state["profile_sleep"] = sleep
-            st.session_state["profile_smoking"] = smoking
-            st.session_state["profile_drinking"] = drinking
-            
-            st.session_state["profile_completed"] = True
-            st.success(f"✅ {t('profile_saved')}")
-            st.rerun()
-            
+    if render_profile_form("main", _PROFILE_DEFAULTS):
+        st.rerun()
+
     # Logout option in case they want to switch user
     if st.button(t("logout_button"), type="secondary"):
         logout()
         
     st.stop() # BLOCK REST OF APP UNLESS PROFILE IS SAVED
 
+# st.sidebar.title(f"⚙️ {t('settings_title')}") - REMOVED per user request
+use_mediapipe = False  # Using Haar Cascade for better compatibility
+
+show_advanced = True # st.sidebar.checkbox(t("show_advanced_plots"), value=True) - REMOVED per user request
+
 # ============================================================================
-# SIDEBAR CONFIG
+# SIDEBAR (USER INFO, PROFILE, HISTORY)
 # ============================================================================
 
-# Show user info if authenticated
-if HAVE_AUTH and check_authentication():
-    st.sidebar.title("🩺 Wellio")
-    st.sidebar.caption("rPPG Vitals Estimation")
-    
-    # Language selector at the top
-    st.sidebar.divider()
-    lang_options = {code: f"{info['flag']} {info['name']}" for code, info in LANGUAGES.items()}
-    selected_lang = st.sidebar.selectbox(
-        t("language_label"),
-        options=list(lang_options.keys()),
-        format_func=lambda x: lang_options[x],
-        index=list(lang_options.keys()).index(get_current_language()),
-        key="sidebar_lang_selector"
-    )
-    if selected_lang != get_current_language():
-        set_language(selected_lang)
-        st.rerun()
-    
-    # User info
-    st.sidebar.divider()
-    user_name = get_current_user_name()
-    user_email = get_current_user_email()
-    
-    # User editing state
-    if "is_editing_name" not in st.session_state:
-        st.session_state["is_editing_name"] = False
-        
-    col1, col2 = st.sidebar.columns([4, 1])
-    
-    with col1:
-        if st.session_state["is_editing_name"]:
-            new_name = st.text_input("Edit Name", value=user_name, label_visibility="collapsed")
-            col_save, col_cancel = st.columns(2)
-            with col_save:
-                if st.button("Save", key="save_name_btn", use_container_width=True):
-                    if new_name and len(new_name.strip()) >= 2:
-                        success, msg = update_user_name(user_email, new_name)
-                        if success:
-                            st.session_state["user_name"] = new_name.strip()
-                            st.session_state["is_editing_name"] = False
-                            st.success("Name updated!")
-                            st.rerun()
+@_fragment
+def _render_sidebar():
+    """
+    Render the sidebar as a fragment: interacting with sidebar widgets reruns
+    only this function instead of the whole app (explicit st.rerun() calls
+    still rerun everything).
+    """
+    # Show user info if authenticated
+    if HAVE_AUTH and check_authentication():
+        # User info
+        st.divider()
+        user_name = get_current_user_name()
+        user_email = get_current_user_email()
+
+        # User editing state
+        st.session_state.setdefault("is_editing_name", False)
+
+        col1, col2 = st.columns([4, 1])
+
+        with col1:
+            if st.session_state["is_editing_name"]:
+                new_name = st.text_input("Edit Name", value=user_name, label_visibility="collapsed")
+                col_save, col_cancel = st.columns(2)
+                with col_save:
+                    if st.button("Save", key="save_name_btn", use_container_width=True):
+                        if new_name and len(new_name.strip()) >= 2:
+                            success, msg = update_user_name(user_email, new_name)
+                            if success:
+                                st.session_state["user_name"] = new_name.strip()
+                                st.session_state["is_editing_name"] = False
+                                st.success("Name updated!")
+                                st.rerun()
+                            else:
+                                st.error(msg)
                         else:
-                            st.error(msg)
-                    else:
-                        st.error("Invalid name")
-            with col_cancel:
-                if st.button("Cancel", key="cancel_edit_btn", use_container_width=True):
-                    st.session_state["is_editing_name"] = False
+                            st.error("Invalid name")
+                with col_cancel:
+                    if st.button("Cancel", key="cancel_edit_btn", use_container_width=True):
+                        st.session_state["is_editing_name"] = False
+                        st.rerun()
+            else:
+                st.write(f"👤 **{user_name}**")
+
+        with col2:
+            if not st.session_state["is_editing_name"]:
+                if st.button("✏️", key="edit_name_btn", help="Edit Name"):
+                    st.session_state["is_editing_name"] = True
                     st.rerun()
-        else:
-            st.write(f"👤 **{user_name}**")
-            
-    with col2:
-        if not st.session_state["is_editing_name"]:
-            if st.button("✏️", key="edit_name_btn", help="Edit Name"):
-                st.session_state["is_editing_name"] = True
-                st.rerun()
-                
-    st.sidebar.caption(user_email)
-    
-    # Logout button
-    if st.sidebar.button(t("logout_button"), type="secondary", use_container_width=True):
-        logout()
-    
-    st.sidebar.divider()
 
-# st.sidebar.title(f"⚙️ {t('settings_title')}") - REMOVED per user request
-use_mediapipe = False  # Using Haar Cascade for better compatibility
+        st.caption(user_email)
 
-show_advanced = True # st.sidebar.checkbox(t("show_advanced_plots"), value=True) - REMOVED per user request
+        # Logout button
+        if st.button(t("logout_button"), type="secondary", use_container_width=True):
+            logout()
 
-# USER PROFILE (SIDEBAR)
-# ============================================================================
+        st.divider()
 
-# Display Summary if Profile is Completed - REMOVED per user request
-# if st.session_state.get("profile_completed"):
-#     p_age = st.session_state.get("profile_age")
-#     p_gender = t(st.session_state.get("profile_gender", ""))
-#     p_height = st.session_state.get("profile_height")
-#     p_weight = st.session_state.get("profile_weight")
-#    
-#     st.sidebar.markdown(f"**{t('age_label')}**: {p_age} | **{t('gender_label')}**: {p_gender}")
-#     st.sidebar.markdown(f"**{t('height_label')}**: {p_height}cm | **{t('weight_label')}**: {p_weight}kg")
-#     st.sidebar.divider()
-        
-with st.sidebar.expander(t("user_profile_title"), expanded=not st.session_state.get("profile_completed", False)):
-    with st.form("user_profile", clear_on_submit=False):
-        # Retrieve saved values to ensure persistence
-        saved_age = st.session_state.get("profile_age")
-        age = st.number_input(t("age_label"), min_value=0, max_value=120, key="form_profile_age", value=saved_age, placeholder="Ex: 30")
-        
-        # Gender options
-        gender_options = ["prefer_not_say", "female", "male", "other"]
-        gender_display = {opt: t(opt) for opt in gender_options}
-        saved_gender = st.session_state.get("profile_gender")
-        gender_index = gender_options.index(saved_gender) if saved_gender in gender_options else None
-        
-        gender = st.selectbox(
-            t("gender_label"), 
-            options=gender_options,
-            format_func=lambda x: gender_display[x],
-            key="form_profile_gender",
-            index=gender_index,
-            placeholder="Select Gender"
-        )
-        
-        saved_height = st.session_state.get("profile_height")
-        height = st.number_input(t("height_label"), min_value=50, max_value=250, key="form_profile_height", value=saved_height, placeholder="Ex: 170")
-        
-        saved_weight = st.session_state.get("profile_weight")
-        weight = st.number_input(t("weight_label"), min_value=20, max_value=300, key="form_profile_weight", value=saved_weight, placeholder="Ex: 70")
-        
-        # Diet options
-        diet_options = ["non_vegetarian", "vegetarian", "vegan", "other"]
-        diet_display = {opt: t(opt) for opt in diet_options}
-        saved_diet = st.session_state.get("profile_diet")
-        diet_index = diet_options.index(saved_diet) if saved_diet in diet_options else None
-        
-        diet = st.selectbox(
-            t("diet_label"),
-            options=diet_options,
-            format_func=lambda x: diet_display[x],
-            key="form_profile_diet",
-            index=diet_index,
-            placeholder="Select Diet"
-        )
-        
-        # Exercise options
-        exercise_options = ["never", "exercise_1_2", "exercise_3_4", "daily"]
-        exercise_display = {opt: t(opt) for opt in exercise_options}
-        saved_exercise = st.session_state.get("profile_exercise")
-        exercise_index = exercise_options.index(saved_exercise) if saved_exercise in exercise_options else None
-        
-        exercise = st.selectbox(
-            t("exercise_label"),
-            options=exercise_options,
-            format_func=lambda x: exercise_display[x],
-            key="form_profile_exercise",
-            index=exercise_index,
-            placeholder="Select Exercise Level"
-        )
-        
-        saved_sleep = st.session_state.get("profile_sleep")
-        sleep = st.number_input(t("sleep_label"), min_value=0.0, max_value=24.0, step=0.5, key="form_profile_sleep", value=saved_sleep, placeholder="Ex: 7.0")
-        
-        # Smoking options
-        smoking_options = ["never", "occasional", "regular", "former"]
-        smoking_display = {opt: t(opt) for opt in smoking_options}
-        saved_smoking = st.session_state.get("profile_smoking")
-        smoking_index = smoking_options.index(saved_smoking) if saved_smoking in smoking_options else None
-        
-        smoking = st.selectbox(
-            t("smoking_label"),
-            options=smoking_options,
-            format_func=lambda x: smoking_display[x],
-            key="form_profile_smoking",
-            index=smoking_index,
-            placeholder="Select Smoking Status"
-        )
+    # USER PROFILE (SIDEBAR)
+    # ============================================================================
+
+    # Display Summary if Profile is Completed - REMOVED per user request
+    # if st.session_state.get("profile_completed"):
+    #     p_age = st.session_state.get("profile_age")
+    #     p_gender = t(st.session_state.get("profile_gender", ""))
+    #     p_height = st.session_state.get("profile_height")
+    #     p_weight = st.session_state.get("profile_weight")
+    #    
+    #     st.markdown(f"**{t('age_label')}**: {p_age} | **{t('gender_label')}**: {p_gender}")
+    #     st.markdown(f"**{t('height_label')}**: {p_height}cm | **{t('weight_label')}**: {p_weight}kg")
+    #     st.divider()
+
+    with st.expander(t("user_profile_title"), expanded=not st.session_state.get("profile_completed", False)):
+        if render_profile_form("sidebar"):
+            st.rerun()  # Rerun to update the summary view immediately
+
+    # ============================================================================
+    # USAGE HISTORY (SIDEBAR)
+    # ============================================================================
+
+    if HAVE_HISTORY:
+        st.divider()
+        st.subheader(f"📜 {t('history_sidebar_title')}")
 
-        # Diabetes options
-        diabetes_options = ["habit_no", "habit_yes"]
-        diabetes_display = {opt: t(opt) for opt in diabetes_options}
-        saved_diabetes = st.session_state.get("profile_diabetes")
-        diabetes_index = diabetes_options.index(saved_diabetes) if saved_diabetes in diabetes_options else None
-        
-        diabetes = st.selectbox(
-            t("diabetes_label"),
-            options=diabetes_options,
-            format_func=lambda x: diabetes_display[x],
-            key="form_profile_diabetes",
-            index=diabetes_index
-        )
+        # Use authenticated user's email as username
+        username = get_current_user_email() or "default_user"
 
-        # Physical Activity options
-        activity_options = ["activity_active", "activity_sedentary"]
-        activity_display = {opt: t(opt) for opt in activity_options}
-        saved_activity = st.session_state.get("profile_activity")
-        activity_index = activity_options.index(saved_activity) if saved_activity in activity_options else None
-
-        activity = st.selectbox(
-            t("physical_activity_label"),
-            options=activity_options,
-            format_func=lambda x: activity_display[x],
-            key="form_profile_activity",
-            index=activity_index
-        )
-        
-        # Drinking options
-        drinking_options = ["never", "occasional", "regular", "former"]
-        drinking_display = {opt: t(opt) for opt in drinking_options}
-        saved_drinking = st.session_state.get("profile_drinking")
-        drinking_index = drinking_options.index(saved_drinking) if saved_drinking in drinking_options else None
-        
-        drinking = st.selectbox(
-            t("drinking_label"),
-            options=drinking_options,
-            format_func=lambda x: drinking_display[x],
-            key="form_profile_drinking",
-            index=drinking_index,
-            placeholder="Select Drinking Status"
-        )
-        
-        submitted = st.form_submit_button(t("save_profile_button"))
-        if submitted:
-            # Validation: Check if any field is None
-            required_fields = [age, gender, height, weight, diet, exercise, sleep, smoking, drinking, diabetes, activity]
-            if any(x is None for x in required_fields):
-                st.error("Please fill in all fields to save your profile.")
-            else:
-                # Map form values to main session state keys expected by the app
-                st.session_state["profile_age"] = age
-                st.session_state["profile_gender"] = gender
-                st.session_state["profile_height"] = height
-                st.session_state["profile_weight"] = weight
-                st.session_state["profile_diet"] = diet
-                st.session_state["profile_exercise"] = exercise
-                st.session_state["profile_sleep"] = sleep
-                st.session_state["profile_smoking"] = smoking
-                st.session_state["profile_drinking"] = drinking
-                st.session_state["profile_diabetes"] = diabetes
-                st.session_state["profile_activity"] = activity
-                
-                st.session_state["profile_completed"] = True
-                
-                # Removed DB Save per user request to revert changes
-                # st.sidebar.success(f"✅ {t('profile_saved')}")
-                st.sidebar.success(f"✅ {t('profile_saved')}")
-                    
-                st.rerun() # Rerun to update the summary view immediately
+        # Get session count and recent sessions (cached)
+        session_count, sessions, timestamp_labels = _load_history(username, get_history_version(username))
+        st.caption(f"{t('total_sessions')}: {session_count}")
 
-# ============================================================================
-# USAGE HISTORY (SIDEBAR)
-# ============================================================================
+        # List recent sessions
+        if session_count > 0:
+            # Always fetch recent sessions, display only top 3
+            sessions_to_display = sessions[:3]  # Show only top 3
 
-if HAVE_HISTORY:
-    st.sidebar.divider()
-    st.sidebar.subheader(f"📜 {t('history_sidebar_title')}")
-    
-    # Use authenticated user's email as username
-    username = get_current_user_email() or "default_user"
-    
-    # Get session count
-    session_count = get_session_count(username)
-    st.sidebar.caption(f"{t('total_sessions')}: {session_count}")
-    
-    # List recent sessions
-    if session_count > 0:
-        # Always fetch recent sessions, display only top 3
-        sessions = list_sessions(username, limit=10)
-        sessions_to_display = sessions[:3]  # Show only top 3
-        
-        st.sidebar.caption(f"{t('recent_analyses')}")
-        for session in sessions_to_display:
-            dt_ist = to_ist_display(session.timestamp)
-            if dt_ist:
-                timestamp_str = dt_ist.strftime("%d %b %Y · %I:%M %p")
-            else:
-                timestamp_str = "Unknown date"
-            
-            # Create button for each session
-            button_label = f"🩺 {timestamp_str}"
-            if st.sidebar.button(button_label, key=f"hist_{session.session_id}"):
-                st.session_state["selected_session_id"] = session.session_id
-                if HAVE_SESSION_MANAGER:
-                    get_session_manager().set_page("History")
-                else:
-                    st.session_state["viewing_history"] = True
-                st.rerun()
-        
-        # Show "View Past Records" button if there are more than 3 sessions
-        if session_count > 3:
-            if st.sidebar.button("📋 View Past Records", use_container_width=True, type="secondary"):
+            st.caption(f"{t('recent_analyses')}")
+            for session, timestamp_str in zip(sessions_to_display, timestamp_labels):
+                # Create button for each session
+                button_label = f"🩺 {timestamp_str}"
+                if st.button(button_label, key=f"hist_{session.session_id}"):
+                    st.session_state["selected_session_id"] = session.session_id
+                    if HAVE_SESSION_MANAGER:
+                        get_session_manager().set_page("History")
+                    else:
+                        st.session_state["viewing_history"] = True
+                    st.rerun()
+
+            # Show "View Past Records" button if there are more than 3 sessions
+            if session_count > 3:
+                if st.button("📋 View Past Records", use_container_width=True, type="secondary"):
+                    if HAVE_SESSION_MANAGER:
+                        get_session_manager().set_page("AllHistory")
+                    else:
+                        st.session_state["viewing_all_history"] = True
+                        st.session_state["viewing_history"] = False
+                        st.session_state["viewing_trends"] = False
+                    st.rerun()
+        else:
+            st.info(t("no_history"))
+
+        # Trends button (only show if user has at least 2 sessions)
+        if session_count >= 2:
+            st.divider()
+            if st.button(f"📊 {t('view_trends_button')}", use_container_width=True, type="secondary"):
                 if HAVE_SESSION_MANAGER:
-                    get_session_manager().set_page("AllHistory")
+                    get_session_manager().set_page("Trends")
                 else:
-                    st.session_state["viewing_all_history"] = True
+                    st.session_state["viewing_trends"] = True
                     st.session_state["viewing_history"] = False
-                    st.session_state["viewing_trends"] = False
                 st.rerun()
-    else:
-        st.sidebar.info(t("no_history"))
-    
-    # Trends button (only show if user has at least 2 sessions)
-    if session_count >= 2:
-        st.sidebar.divider()
-        if st.sidebar.button(f"📊 {t('view_trends_button')}", use_container_width=True, type="secondary"):
-            if HAVE_SESSION_MANAGER:
-                get_session_manager().set_page("Trends")
-            else:
-                st.session_state["viewing_trends"] = True
-                st.session_state["viewing_history"] = False
-            st.rerun()
+
+with st.sidebar:
+    if HAVE_AUTH and check_authentication():
+        st.title("🩺 Wellio")
+        st.caption("rPPG Vitals Estimation")
+
+        # Language selector at the top. Kept outside the fragment so a change
+        # reruns the whole app (already in the new language) in a single pass
+        st.divider()
+        st.selectbox(
+            t("language_label"),
+            options=_LANG_CODES,
+            format_func=_LANG_LABELS.__getitem__,
+            index=_LANG_INDEX[get_current_language()],
+            key="sidebar_lang_selector",
+            on_change=_on_language_change,
+            args=("sidebar_lang_selector",)
+        )
+
+    _render_sidebar()
 
 # ============================================================================
 # ADVANCED SETTINGS (SIDEBAR)
@@ -1079,7 +1898,7 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
     username = get_current_user_email() or "default_user"
     
     if session_id:
-        session = load_session(username, session_id)
+        session = _cached_load_session(username, session_id)
         
         if session:
             # Header for historical view
@@ -1087,7 +1906,7 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
             
             col1, col2 = st.columns([3, 1])
             with col1:
-                dt_ist = to_ist_display(session.timestamp)
+                dt_ist = to_ist_display(session.timestamp_dt)
                 if dt_ist:
                     st.caption(f"{t('analysis_date')}: {dt_ist.strftime('%d %B %Y at %I:%M %p')}")
                 else:
@@ -1135,15 +1954,8 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
             # Risk Assessment
             st.subheader(f"⚠️ {t('risk_assessment')}")
             
-            if session.risk_score <= 3:
-                display_label = t("low_risk")
-                color = "#6B8F71" # Muted Sage Green
-            elif session.risk_score <= 6:
-                display_label = t("moderate_risk")
-                color = "#D4A373" # Muted Earthy Orange
-            else:
-                display_label = t("high_risk")
-                color = "#B85C5C" # Muted Terra Cotta Red
+            label_key, color = _risk_style(session.risk_score)
+            display_label = t(label_key)
             
             st.markdown(
                 f"<div style='display:flex;align-items:center;gap:16px;margin-bottom:20px'>"
@@ -1188,16 +2000,19 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
                 
                 st.divider()
             
-            # Visualizations
-            if session.signal_plot or session.hrv_plot:
+            # Visualizations (older sessions carry their plots inline)
+            plots = _cached_session_plots(username, session_id)
+            signal_plot = session.signal_plot or plots["signal_plot"]
+            hrv_plot = session.hrv_plot or plots["hrv_plot"]
+            if signal_plot or hrv_plot:
                 st.subheader(f"📈 {t('signal_processing_title')}")
                 
-                if session.signal_plot:
-                    st.image(base64_to_image(session.signal_plot), caption=t("filtered_ppg"))
+                if signal_plot:
+                    st.image(signal_plot, caption=t("filtered_ppg"))
                 
-                if session.hrv_plot:
+                if hrv_plot:
                     st.subheader(f"💓 {t('hrv_title')}")
-                    st.image(base64_to_image(session.hrv_plot), caption=t("rr_interval_analysis"))
+                    st.image(hrv_plot, caption=t("rr_interval_analysis"))
                     sdnn_disp = f"{session.hrv_sdnn:.1f}" if session.hrv_sdnn is not None else "N/A"
                     pnn50_disp = f"{session.hrv_pnn50:.1f}" if session.hrv_pnn50 is not None else "N/A"
                     st.info(f"**{t('hrv_summary')}:** SDNN: {sdnn_disp} ms | pNN50: {pnn50_disp}% | {t('beats_detected')}: {session.rr_intervals_count}")
@@ -1207,9 +2022,12 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
             st.subheader(f"📄 {t('download_report')}")
             
             if st.button(t("generate_pdf"), type="secondary", key="hist_pdf"):
+                st.session_state["hist_pdf_session_id"] = session_id
+            
+            if st.session_state.get("hist_pdf_session_id") == session_id:
                 with st.spinner(f"{t('generating_pdf')}..."):
                     try:
-                        pdf_bytes = generate_health_report(session)
+                        pdf_bytes = _pdf_job(username, session_id).result()
                         st.download_button(
                             label=f"💾 {t('download_pdf')}",
                             data=pdf_bytes,
@@ -1219,6 +2037,8 @@ if HAVE_HISTORY and st.session_state.get("viewing_history", False):
                         )
                         st.success(f"✅ {t('pdf_generated')}")
                     except Exception as e:
+                        _drop_pdf_job(username, session_id)  # Don't keep a failed job around
+                        st.session_state.pop("hist_pdf_session_id", None)
                         st.error(f"{t('pdf_error')}: {str(e)}")
             
             st.stop()  # Don't show the upload section when viewing history
@@ -1254,259 +2074,91 @@ if HAVE_HISTORY and st.session_state.get("viewing_trends", False):
     
     st.divider()
     
-    # Time period selector
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        if st.button("📅 7 Days", use_container_width=True, 
-                    type="primary" if st.session_state.get("trend_period", 30) == 7 else "secondary"):
-            st.session_state["trend_period"] = 7
-            st.rerun()
-    with col2:
-        if st.button("📅 14 Days", use_container_width=True,
-                    type="primary" if st.session_state.get("trend_period", 30) == 14 else "secondary"):
-            st.session_state["trend_period"] = 14
-            st.rerun()
-    with col3:
-        if st.button("📅 30 Days", use_container_width=True,
-                    type="primary" if st.session_state.get("trend_period", 30) == 30 else "secondary"):
-            st.session_state["trend_period"] = 30
-            st.rerun()
-    with col4:
-        if st.button("📅 90 Days", use_container_width=True,
-                    type="primary" if st.session_state.get("trend_period", 30) == 90 else "secondary"):
-            st.session_state["trend_period"] = 90
-            st.rerun()
-    
-    period = st.session_state.get("trend_period", 30)
-    user_age = st.session_state.get("profile_age", 30)
-    
-    # Get trend analysis
-    with st.spinner(f"Analyzing trends over the last {period} days..."):
-        trend_analysis = get_trend_analysis(username, days=period, user_age=user_age)
-    
-    if trend_analysis is None:
-        st.warning(f"⚠️ Not enough data for trend analysis in the last {period} days. Complete at least 2 analyses to unlock trends.")
-        st.stop()
-    
-    # Summary
-    st.divider()
-    st.subheader(f"📋 {t('summary')}")
-    st.info(trend_analysis.summary)
+    @_fragment
+    def _render_trends_view(username: str, user_age: int):
+        """Period selector, summary and charts; period clicks rerun only this part"""
+        # Time period selector (keyed, so a change is stored before the rerun)
+        st.session_state.setdefault("trend_period", 30)
+        period = st.radio(
+            "Period",
+            options=(7, 14, 30, 90),
+            format_func=lambda days: f"📅 {days} Days",
+            horizontal=True,
+            label_visibility="collapsed",
+            key="trend_period"
+        )
+        
+        # Get trend analysis
+        with st.spinner(f"Analyzing trends over the last {period} days..."):
+            trend_analysis = _cached_trend_analysis(username, period, user_age)
     
-    # Key findings
-    if trend_analysis.key_findings:
-        with st.expander(f"🔍 {t('key_findings')}", expanded=True):
-            for finding in trend_analysis.key_findings:
-                st.write(f"• {finding}")
+        if trend_analysis is None:
+            st.warning(f"⚠️ Not enough data for trend analysis in the last {period} days. Complete at least 2 analyses to unlock trends.")
+            return
     
-    # Recommendations
-    if trend_analysis.recommendations:
-        with st.expander(f"💡 {t('recommendations')}", expanded=True):
-            for rec in trend_analysis.recommendations:
-                st.write(f"• {rec}")
+        # Summary
+        st.divider()
+        st.subheader(f"📋 {t('summary')}")
+        st.info(trend_analysis.summary)
     
-    st.divider()
+        # Key findings
+        if trend_analysis.key_findings:
+            with st.expander(f"🔍 {t('key_findings')}", expanded=True):
+                for finding in trend_analysis.key_findings:
+                    st.write(f"• {finding}")
     
-    # Trend charts
-    st.subheader(f"📈 {t('metric_trends')}")
+        # Recommendations
+        if trend_analysis.recommendations:
+            with st.expander(f"💡 {t('recommendations')}", expanded=True):
+                for rec in trend_analysis.recommendations:
+                    st.write(f"• {rec}")
     
-    # Heart Rate
-    if trend_analysis.heart_rate:
-        hr = trend_analysis.heart_rate
-        st.markdown(f"### ❤️ {hr.metric_name}")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric(t("average"), f"{hr.average:.1f} BPM")
-        with col2:
-            st.metric(t("min"), f"{hr.min_value:.1f} BPM")
-        with col3:
-            st.metric(t("max"), f"{hr.max_value:.1f} BPM")
-        with col4:
-            # Trend indicator
-            if hr.trend_direction == "up":
-                st.metric(t("trend"), t("increasing_arrow"), delta=f"{hr.percent_change:.1f}%", delta_color="inverse")
-            elif hr.trend_direction == "down":
-                st.metric(t("trend"), t("decreasing_arrow"), delta=f"{hr.percent_change:.1f}%", delta_color="normal")
-            else:
-                st.metric(t("trend"), t("stable_arrow"), delta="0%")
-        
-        # Status badge
-        status_colors = {
-            "Improving": "#16a34a",
-            "Stable": "#3b82f6",
-            "Worsening": "#f59e0b",
-            "Concerning": "#dc2626"
-        }
-        color = status_colors.get(hr.trend_classification, "#6b7280")
-        st.markdown(
-            f"<div style='padding:8px 16px;border-radius:8px;background:{color};color:white;font-weight:600;display:inline-block;margin-bottom:16px'>"
-            f"{t('status')}: {hr.trend_classification}</div>",
-            unsafe_allow_html=True
-        )
-        
-        # Chart
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(hr.timestamps, hr.values, marker='o', linewidth=2, markersize=8, color='#ef4444', label='Heart Rate')
-        
-        # Trend line
-        if len(hr.values) >= 2:
-            z = np.polyfit(range(len(hr.values)), hr.values, 1)
-            p = np.poly1d(z)
-            ax.plot(hr.timestamps, p(range(len(hr.values))), "--", alpha=0.5, color='#991b1b', label='Trend')
-        
-        ax.set_xlabel(t("date"))
-        ax.set_ylabel(t("heart_rate_bpm"))
-        ax.set_title(t("heart_rate_trend").format(period=period))
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
-        
         st.divider()
     
-    # Stress Level
-    if trend_analysis.stress_level:
-        stress = trend_analysis.stress_level
-        st.markdown(f"### 😰 {stress.metric_name}")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric(t("average"), f"{stress.average:.1f}/10")
-        with col2:
-            st.metric(t("min"), f"{stress.min_value:.1f}/10")
-        with col3:
-            st.metric(t("max"), f"{stress.max_value:.1f}/10")
-        with col4:
-            if stress.trend_direction == "up":
-                st.metric(t("trend"), t("increasing_arrow"), delta=f"{stress.percent_change:.1f}%", delta_color="inverse")
-            elif stress.trend_direction == "down":
-                st.metric(t("trend"), t("decreasing_arrow"), delta=f"{stress.percent_change:.1f}%", delta_color="normal")
-            else:
-                st.metric(t("trend"), t("stable_arrow"), delta="0%")
-        
-        color = status_colors.get(stress.trend_classification, "#6b7280")
-        st.markdown(
-            f"<div style='padding:8px 16px;border-radius:8px;background:{color};color:white;font-weight:600;display:inline-block;margin-bottom:16px'>"
-            f"{t('status')}: {stress.trend_classification}</div>",
-            unsafe_allow_html=True
-        )
-        
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(stress.timestamps, stress.values, marker='o', linewidth=2, markersize=8, color='#f59e0b', label='Stress Level')
-        
-        if len(stress.values) >= 2:
-            z = np.polyfit(range(len(stress.values)), stress.values, 1)
-            p = np.poly1d(z)
-            ax.plot(stress.timestamps, p(range(len(stress.values))), "--", alpha=0.5, color='#92400e', label='Trend')
-        
-        ax.set_xlabel(t("date"))
-        ax.set_ylabel(t("stress_level_scale"))
-        ax.set_title(t("stress_level_trend").format(period=period))
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
-        
-        st.divider()
+        # Trend charts
+        st.subheader(f"📈 {t('metric_trends')}")
     
-    # Blood Pressure
-    if trend_analysis.bp_systolic:
-        bp = trend_analysis.bp_systolic
-        st.markdown(f"### 🩺 Blood Pressure (Systolic)")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric(t("average"), f"{bp.average:.0f} mmHg")
-        with col2:
-            st.metric(t("min"), f"{bp.min_value:.0f} mmHg")
-        with col3:
-            st.metric(t("max"), f"{bp.max_value:.0f} mmHg")
-        with col4:
-            if bp.trend_direction == "up":
-                st.metric(t("trend"), t("increasing_arrow"), delta=f"{bp.percent_change:.1f}%", delta_color="inverse")
-            elif bp.trend_direction == "down":
-                st.metric(t("trend"), t("decreasing_arrow"), delta=f"{bp.percent_change:.1f}%", delta_color="normal")
-            else:
-                st.metric(t("trend"), t("stable_arrow"), delta="0%")
-        
-        color = status_colors.get(bp.trend_classification, "#6b7280")
-        st.markdown(
-            f"<div style='padding:8px 16px;border-radius:8px;background:{color};color:white;font-weight:600;display:inline-block;margin-bottom:16px'>"
-            f"{t('status')}: {bp.trend_classification}</div>",
-            unsafe_allow_html=True
-        )
-        
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(bp.timestamps, bp.values, marker='o', linewidth=2, markersize=8, color='#3b82f6', label='Systolic BP')
-        ax.axhline(y=120, color='green', linestyle='--', alpha=0.5, label='Target (120)')
-        
-        if len(bp.values) >= 2:
-            z = np.polyfit(range(len(bp.values)), bp.values, 1)
-            p = np.poly1d(z)
-            ax.plot(bp.timestamps, p(range(len(bp.values))), "--", alpha=0.5, color='#1e40af', label='Trend')
-        
-        ax.set_xlabel(t("date"))
-        ax.set_ylabel(t("systolic_bp_mmhg"))
-        ax.set_title(t("bp_trend").format(period=period))
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
-        
-        st.divider()
+        for cfg in _TREND_CHARTS:
+            metric = getattr(trend_analysis, cfg["attr"])
+            if not metric:
+                continue
+            st.markdown(f"### {cfg['icon']} {cfg['heading'] or metric.metric_name}")
+            
+            fmt = cfg["fmt"]
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric(t("average"), fmt.format(metric.average))
+            with col2:
+                st.metric(t("min"), fmt.format(metric.min_value))
+            with col3:
+                st.metric(t("max"), fmt.format(metric.max_value))
+            with col4:
+                # Trend indicator
+                if metric.trend_direction == "up":
+                    st.metric(t("trend"), t("increasing_arrow"), delta=f"{metric.percent_change:.1f}%", delta_color=cfg["rise_color"])
+                elif metric.trend_direction == "down":
+                    st.metric(t("trend"), t("decreasing_arrow"), delta=f"{metric.percent_change:.1f}%", delta_color=cfg["fall_color"])
+                else:
+                    st.metric(t("trend"), t("stable_arrow"), delta="0%")
+            
+            # Status badge
+            color = _STATUS_COLORS.get(metric.trend_classification, "#6b7280")
+            st.markdown(
+                _BADGE_TMPL.format(color=color, label=t('status'), value=metric.trend_classification),
+                unsafe_allow_html=True
+            )
+            
+            # Chart
+            st.image(_render_trend_png(
+                tuple(metric.timestamps), tuple(metric.values), cfg["label"], cfg["color"], cfg["trend_color"],
+                t("date"), t(cfg["ylabel"]), t(cfg["title"]).format(period=period),
+                target=cfg["target"], target_label=cfg["target_label"]
+            ), use_container_width=True)
+            
+            if cfg is not _TREND_CHARTS[-1]:
+                st.divider()
     
-    # SpO2
-    if trend_analysis.spo2:
-        spo2 = trend_analysis.spo2
-        st.markdown(f"### 🫁 {spo2.metric_name}")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric(t("average"), f"{spo2.average:.1f}%")
-        with col2:
-            st.metric(t("min"), f"{spo2.min_value:.1f}%")
-        with col3:
-            st.metric(t("max"), f"{spo2.max_value:.1f}%")
-        with col4:
-            if spo2.trend_direction == "up":
-                st.metric(t("trend"), t("increasing_arrow"), delta=f"{spo2.percent_change:.1f}%", delta_color="normal")
-            elif spo2.trend_direction == "down":
-                st.metric(t("trend"), t("decreasing_arrow"), delta=f"{spo2.percent_change:.1f}%", delta_color="inverse")
-            else:
-                st.metric(t("trend"), t("stable_arrow"), delta="0%")
-        
-        color = status_colors.get(spo2.trend_classification, "#6b7280")
-        st.markdown(
-            f"<div style='padding:8px 16px;border-radius:8px;background:{color};color:white;font-weight:600;display:inline-block;margin-bottom:16px'>"
-            f"{t('status')}: {spo2.trend_classification}</div>",
-            unsafe_allow_html=True
-        )
-        
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(spo2.timestamps, spo2.values, marker='o', linewidth=2, markersize=8, color='#10b981', label='SpO₂')
-        ax.axhline(y=95, color='green', linestyle='--', alpha=0.5, label='Normal Threshold (95%)')
-        
-        if len(spo2.values) >= 2:
-            z = np.polyfit(range(len(spo2.values)), spo2.values, 1)
-            p = np.poly1d(z)
-            ax.plot(spo2.timestamps, p(range(len(spo2.values))), "--", alpha=0.5, color='#047857', label='Trend')
-        
-        ax.set_xlabel(t("date"))
-        ax.set_ylabel(t("spo2_percent"))
-        ax.set_title(t("spo2_trend").format(period=period))
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
+    _render_trends_view(username, st.session_state.get("profile_age", 30))
     
     st.stop()  # Don't show upload section when viewing trends
 
@@ -1530,84 +2182,85 @@ if HAVE_HISTORY and st.session_state.get("viewing_all_history", False):
                 get_session_manager().set_page("Home")
             else:
                 st.session_state["viewing_all_history"] = False
+            st.session_state.pop("history_page", None)
             st.rerun()
     
     st.divider()
     
-    # Get all sessions
-    session_count = get_session_count(username)
+    # Get all sessions (cached until a session is saved or deleted)
+    history_version = get_history_version(username)
+    session_count = _cached_session_count(username, history_version)
     
     if session_count == 0:
         st.info(t("no_history"))
         st.stop()
     
-    # Fetch all sessions (limit to 50 for performance)
-    sessions = list_sessions(username, limit=50)
+    # Fetch the pages loaded so far (each page is cached on its own)
+    pages_loaded = st.session_state.get("history_page", 0) + 1
+    sessions = [
+        session
+        for page in range(pages_loaded)
+        for session in _cached_list_sessions(username, history_version, limit=_HISTORY_PAGE_SIZE, offset=page * _HISTORY_PAGE_SIZE)
+    ]
     
     st.subheader(f"📊 Total Sessions: {session_count}")
     st.caption(f"Showing {len(sessions)} most recent analyses")
     
     st.divider()
     
-    # Display sessions in a grid layout
-    for idx, session in enumerate(sessions):
-        dt_ist = to_ist_display(session.timestamp)
+    # Translations are loop-invariant, look them up once per render
+    risk_labels = {key: t(key) for key, _ in set(_RISK_TABLE)}
+    
+    # Render every row as one HTML block (one element instead of ~10 per row)
+    rows = []
+    row_labels = {}
+    for session in sessions:
+        dt_ist = to_ist_display(session.timestamp_dt)
         if dt_ist:
-            timestamp_str = dt_ist.strftime("%d %B %Y · %I:%M %p")
             date_badge = dt_ist.strftime("%d %b %Y")
             time_badge = dt_ist.strftime("%I:%M %p")
         else:
-            timestamp_str = "Unknown date"
             date_badge = "N/A"
             time_badge = "N/A"
+        row_labels[session.session_id] = f"📅 {date_badge} · {time_badge}"
+        
+        # Vital signs preview
+        hr_val = f"{session.heart_rate:.1f} BPM" if session.heart_rate is not None else "N/A"
+        stress_val = f"{session.stress_level:.1f}/10" if session.stress_level is not None else "N/A"
+        bp_html = (
+            f"<div style='color:#6b7280;font-size:13px'>🩺 BP: {session.bp_systolic:.0f}/{session.bp_diastolic:.0f} mmHg</div>"
+            if session.bp_systolic and session.bp_diastolic else ""
+        )
         
-        # Create card for each session
-        with st.container():
-            col1, col2, col3 = st.columns([2, 3, 1])
-            
-            with col1:
-                st.markdown(f"### 📅 {date_badge}")
-                st.caption(f"🕐 {time_badge}")
-            
-            with col2:
-                # Display vital signs preview
-                hr_val = f"{session.heart_rate:.1f} BPM" if session.heart_rate is not None else "N/A"
-                stress_val = f"{session.stress_level:.1f}/10" if session.stress_level is not None else "N/A"
-                
-                st.markdown(f"**❤️ HR:** {hr_val} | **😰 Stress:** {stress_val}")
-                
-                if session.bp_systolic and session.bp_diastolic:
-                    st.caption(f"🩺 BP: {session.bp_systolic:.0f}/{session.bp_diastolic:.0f} mmHg")
-                
-                # Risk badge
-                if session.risk_score <= 3:
-                    risk_label = t("low_risk")
-                    risk_color = "#6B8F71"
-                elif session.risk_score <= 6:
-                    risk_label = t("moderate_risk")
-                    risk_color = "#D4A373"
-                else:
-                    risk_label = t("high_risk")
-                    risk_color = "#B85C5C"
-                
-                st.markdown(
-                    f"<span style='padding:4px 12px;border-radius:8px;background:{risk_color};color:white;font-weight:600;font-size:12px'>"
-                    f"Risk: {session.risk_score}/10 - {risk_label}</span>",
-                    unsafe_allow_html=True
-                )
-            
-            with col3:
-                if st.button("📋 View Details", key=f"view_sess_{session.session_id}", type="primary", use_container_width=True):
-                    st.session_state["selected_session_id"] = session.session_id
-                    st.session_state["viewing_history"] = True
-                    st.session_state["viewing_all_history"] = False
-                    st.rerun()
-            
-            st.divider()
+        label_key, risk_color = _risk_style(session.risk_score)
+        rows.append(_HISTORY_ROW_HTML.format(
+            date=date_badge, time=time_badge, hr=hr_val, stress=stress_val, bp=bp_html,
+            badge=_RISK_BADGE_HTML.format(color=risk_color, score=session.risk_score, label=risk_labels[label_key])
+        ))
+    st.markdown("".join(rows), unsafe_allow_html=True)
+    
+    def _open_history_session():
+        st.session_state["selected_session_id"] = st.session_state["all_history_pick"]
+        st.session_state["viewing_history"] = True
+        st.session_state["viewing_all_history"] = False
+        st.session_state["all_history_pick"] = None  # Start blank when coming back
     
-    # Show message if there are more records
-    if session_count > 50:
-        st.info(f"ℹ️ Showing 50 most recent sessions. You have {session_count - 50} more older records.")
+    st.selectbox(
+        "📋 View Details",
+        options=list(row_labels),
+        format_func=row_labels.__getitem__,
+        index=None,
+        placeholder="Choose a session to open",
+        key="all_history_pick",
+        on_change=_open_history_session
+    )
+    
+    # Load the next page of older records on demand
+    if session_count > len(sessions):
+        st.caption(f"ℹ️ {session_count - len(sessions)} older records not shown yet.")
+        if st.button("⬇️ Load more", use_container_width=True):
+            st.session_state["history_page"] = pages_loaded
+            st.rerun()
     
     st.stop()  # Don't show upload section when viewing all history
 
@@ -1617,111 +2270,178 @@ if HAVE_HISTORY and st.session_state.get("viewing_all_history", False):
 # HEALTH ASSISTANT CHATBOT (HOMEPAGE)
 # ============================================================================
 
+# (session key, default) pairs that make up the chatbot's view of the profile
+_CHATBOT_PROFILE_FIELDS = (
+    ("profile_age", 30),
+    ("profile_gender", "Prefer not to say"),
+    ("profile_diet", "Unknown"),
+    ("profile_exercise", "Unknown"),
+    ("profile_sleep", 7.0),
+    ("profile_smoking", "Never"),
+    ("profile_drinking", "Never"),
+)
+
+def _chatbot_profile_signature() -> tuple:
+    """Current profile values, in _CHATBOT_PROFILE_FIELDS order"""
+    return tuple(st.session_state.get(k, d) for k, d in _CHATBOT_PROFILE_FIELDS)
+
+@st.cache_resource(max_entries=32)
+def _chatbot_profile(signature: tuple) -> dict:
+    """User profile dict for build_chatbot_context, built once per signature"""
+    age, gender, diet, exercise, sleep, smoking, drinking = signature
+    return {
+        "age": age,
+        "gender": gender,
+        "lifestyle": {
+            "diet": diet,
+            "exercise": exercise,
+            "sleep": sleep,
+            "smoking": smoking,
+            "drinking": drinking
+        }
+    }
+
+# Session keys holding the rolling chat summary and its background job
+_CHAT_SUMMARY_KEYS = ("chat_summary", "chat_summary_upto", "chat_summary_job")
+
+@st.cache_resource
+def _chat_summary_executor():
+    """Single worker so summaries of one conversation apply in order"""
+    return ThreadPoolExecutor(max_workers=1)
+
+def _prune_chat_history(messages: list):
+    """
+    (summary, recent) for the prompt: the last RECENT_TURNS messages verbatim
+    and a summary of everything older. Summaries are produced off the request
+    path; a finished job is picked up here and the next one started if at
+    least RECENT_TURNS more messages have scrolled out of the window.
+    """
+    job = st.session_state.get("chat_summary_job")
+    if job is not None and job[0].done():
+        future, upto = st.session_state.pop("chat_summary_job")
+        st.session_state["chat_summary"] = future.result()
+        st.session_state["chat_summary_upto"] = upto
+        job = None
+
+    summary = st.session_state.get("chat_summary", "")
+    upto = st.session_state.get("chat_summary_upto", 0)
+    older_end = len(messages) - RECENT_TURNS
+    if job is None and older_end - upto >= RECENT_TURNS:
+        future = _chat_summary_executor().submit(
+            summarize_chat_history, messages[upto:older_end], summary
+        )
+        st.session_state["chat_summary_job"] = (future, older_end)
+
+    return summary, messages[-RECENT_TURNS:]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_load_chat_history(username: str):
+    """load_chat_history memoized per user; cleared by the chatbot's Clear button"""
+    return load_chat_history(username)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _render_chat_history_html(messages: tuple) -> str:
+    """(role, content) pairs -> one block of .chat-msg divs, escaped"""
+    return "".join(
+        f'<div class="chat-msg {role}">{escape(content).replace(chr(10), "<br>")}</div>'
+        for role, content in messages
+    )
+
+# Empty-chat suggestions: (widget key, icon, label key, question sent), laid out two per column
+_SUGGESTED_QUESTIONS = (
+    ("chatbot_sq_trends", "📊", "question_trends", "How are my health trends looking?"),
+    ("chatbot_sq_hr", "❤️", "question_heart_rate", "What is considered a normal heart rate?"),
+    ("chatbot_sq_stress", "😰", "question_stress", "What are some ways to reduce stress?"),
+    ("chatbot_sq_ex", "🏃", "question_exercise", "What are the health benefits of regular exercise?"),
+)
+
+@lru_cache(maxsize=16)
+def _suggestion_labels(lang: str) -> tuple:
+    """Button labels for _SUGGESTED_QUESTIONS in one language"""
+    return tuple(f"{icon} {_t_cached(lang, label_key)}" for _, icon, label_key, _ in _SUGGESTED_QUESTIONS)
+
+# Positions the mic recorder inside the chat input row (static, built once)
+_MIC_CSS = """
+<style>
+/* Target the specific column layout for the mic button */
+div[data-testid="stHorizontalBlock"]:has(div.stElementContainer iframe[title="streamlit_mic_recorder.speech_to_text"]) {
+    align-items: flex-end; /* Align bottom */
+    margin-bottom: -60px; /* Pull the layout down */
+    position: relative;
+    z-index: 99999;
+    pointer-events: none; /* Let clicks pass through empty space */
+}
+div[data-testid="stHorizontalBlock"]:has(div.stElementContainer iframe[title="streamlit_mic_recorder.speech_to_text"]) button {
+    pointer-events: auto; /* Re-enable clicks on the button */
+}
+/* Target the column containing the mic */
+div[data-testid="stHorizontalBlock"] > div[data-testid="column"]:last-child {
+    transform: translate(-45px, 15px); /* Move left of send button and down */
+}
+</style>
+"""
+
 if HAVE_CHATBOT and HAVE_AI_INSIGHTS:
     st.divider()
 
-    @st.dialog(f"🤖 {t('chatbot_title')}")
-    def open_chatbot_dialog():
-        st.caption(t("chatbot_subtitle"))
-        
-        # Add a Back to Home button (Visual Only as Programmatic Close is limited)
-        # Or maybe check if we can skip it, but User asked for it. 
-        # Since st.dialog can't be closed programmatically easily, we just rely on X.
-        # But to satisfy user request visually:
-        if st.button(f"🏠 {t('back_to_home')}", type="secondary", use_container_width=True, key="chatbot_back_to_home"):
-             st.session_state["show_chatbot"] = False
-             st.rerun()
-        
+    def _mark_chatbot_active():
+        """Widget callback: the rerun came from inside the dialog, keep it open"""
+        st.session_state["chatbot_interaction_pending"] = True
+
+    def _set_and_rerun(**state):
+        """
+        Apply state and request one app-wide rerun, keeping the dialog open
+        unless state closes it. Plain in-dialog updates should use an
+        on_click callback instead; the widget's own rerun then suffices.
+        """
+        st.session_state.update(state)
+        st.session_state["chatbot_just_rerun"] = True
+        st.rerun()
 
-        
-        # Initialize chat history in session state
-        if "chat_messages" not in st.session_state:
-            st.session_state["chat_messages"] = []
-        
-        # Load previous chat history
-        username = get_current_user_email() or "default_user"
-        if not st.session_state["chat_messages"]:
-            st.session_state["chat_messages"] = load_chat_history(username)
-        
-        # Display chat history
-        # Create container for messages
-        chat_container = st.container()
-        with chat_container:
-            for i, msg in enumerate(st.session_state["chat_messages"]):
-                with st.chat_message(msg.role):
-                    st.write(msg.content)
+    def _clear_chat(username: str):
+        """Clear button callback; runs before the rerun, so no second rerun"""
+        clear_chat_history(username)
+        _cached_load_chat_history.clear()
+        st.session_state["chat_messages"] = []
+        for key in _CHAT_SUMMARY_KEYS:
+            st.session_state.pop(key, None)
+        _mark_chatbot_active()
 
-                    
-                    # TTS for assistant messages
-                    if msg.role == "assistant":
-                        # Safely get audio_bytes for legacy messages
-                        audio = getattr(msg, "audio_bytes", None)
-                        if audio:
-                            # Check if this message triggered the TTS generation
-                            should_autoplay = (st.session_state.get("tts_autoplay_idx") == i)
-                            st.audio(audio, format="audio/mp3", autoplay=should_autoplay)
-                            
-                            # Clear the flag if it matched so it doesn't replay on next interaction
-                            if should_autoplay:
-                                st.session_state["tts_autoplay_idx"] = None
-                        else:
-                            # Simple Listen button
-                            if st.button("🔊", key=f"chatbot_tts_{i}", help="Listen to this response"):
-                                with st.spinner("..."):
-                                    try:
-                                        from gtts import gTTS
-                                        # Use current language for TTS
-                                        tts = gTTS(text=msg.content, lang=get_current_language())
-                                        mp3_fp = BytesIO()
-                                        tts.write_to_fp(mp3_fp)
-                                        mp3_fp.seek(0)
-                                        msg.audio_bytes = mp3_fp.getvalue()
-                                        
-                                        # Set flag to autoplay this index
-                                        st.session_state["tts_autoplay_idx"] = i
-                                        st.session_state["chatbot_just_rerun"] = True
-                                        st.rerun()
-                                    except Exception as e:
-                                        st.error(f"TTS Error: {e}")
+    def _ask_suggested(question: str):
+        """Suggested-question callback; the input fragment picks it up this same rerun"""
+        st.session_state["suggested_question"] = question
+        _mark_chatbot_active()
+
+    @_fragment
+    def _chat_input_area(username: str, lang: str):
+        """Mic, chat input and reply streaming for the chatbot dialog"""
+        # A fragment-only rerun never reaches the keep-open check, so drop the
+        # flag here rather than let it hold the dialog open on a later rerun
+        st.session_state.pop("chatbot_interaction_pending", None)
         
-        # Chat input handling
+        # New exchanges render here; a fragment can't write to the dialog's containers
+        pending = st.container()
         
         # Audio input (Speech to Text) - Right aligned with CSS hack for positioning
         # We use a column layout and shift the second column down-left to sit inside/near the chat input
-        st.markdown("""
-            <style>
-            /* Target the specific column layout for the mic button */
-            div[data-testid="stHorizontalBlock"]:has(div.stElementContainer iframe[title="streamlit_mic_recorder.speech_to_text"]) {
-                align-items: flex-end; /* Align bottom */
-                margin-bottom: -60px; /* Pull the layout down */
-                position: relative;
-                z-index: 99999;
-                pointer-events: none; /* Let clicks pass through empty space */
-            }
-            div[data-testid="stHorizontalBlock"]:has(div.stElementContainer iframe[title="streamlit_mic_recorder.speech_to_text"]) button {
-                pointer-events: auto; /* Re-enable clicks on the button */
-            }
-            /* Target the column containing the mic */
-            div[data-testid="stHorizontalBlock"] > div[data-testid="column"]:last-child {
-                transform: translate(-45px, 15px); /* Move left of send button and down */
-            }
-            </style>
-            """, unsafe_allow_html=True)
+        st.markdown(_MIC_CSS, unsafe_allow_html=True)
             
         c1, c2 = st.columns([0.85, 0.15])
         
         with c2: 
             audio_text = speech_to_text(
-                language=get_current_language(),
+                language=lang,
                 start_prompt="🎙️",
                 stop_prompt="⏹️",
                 just_once=True,
+                callback=_mark_chatbot_active,
                 key="chatbot_stt"
             )
         
-        user_input = st.chat_input(t("chatbot_input_placeholder"), key="chatbot_input")
+        user_input = st.chat_input(t("chatbot_input_placeholder"), key="chatbot_input", on_submit=_mark_chatbot_active)
         
         # Handle audio text if present
+        from_voice = bool(audio_text)
         if audio_text:
             user_input = audio_text
         
@@ -1740,7 +2460,7 @@ if HAVE_CHATBOT and HAVE_AI_INSIGHTS:
             st.session_state["chat_messages"].append(user_msg)
             
             # Display user message
-            with chat_container:
+            with pending:
                 with st.chat_message("user"):
                     st.write(user_input)
             
@@ -1748,77 +2468,143 @@ if HAVE_CHATBOT and HAVE_AI_INSIGHTS:
                 with st.chat_message("assistant"):
                     with st.spinner(f"{t('loading')}..."):
                         # Build user profile
-                        user_profile = {
-                            "age": st.session_state.get("profile_age", 30),
-                            "gender": st.session_state.get("profile_gender", "Prefer not to say"),
-                            "lifestyle": {
-                                "diet": st.session_state.get("profile_diet", "Unknown"),
-                                "exercise": st.session_state.get("profile_exercise", "Unknown"),
-                                "sleep": st.session_state.get("profile_sleep", 7.0),
-                                "smoking": st.session_state.get("profile_smoking", "Never"),
-                                "drinking": st.session_state.get("profile_drinking", "Never")
-                            }
-                        }
+                        user_profile = _chatbot_profile(_chatbot_profile_signature())
                         
-                        # Build context
+                        # Build context from the last few turns plus a rolling summary
+                        summary, recent = _prune_chat_history(st.session_state["chat_messages"][:-1])
                         context = build_chatbot_context(
                             username=username,
                             user_profile=user_profile,
                             latest_session=None,
-                            chat_history=st.session_state["chat_messages"][:-1]
+                            chat_history=recent,
+                            chat_summary=summary
                         )
                         
-                        # Generate response
-                        # Pass None for api_key to use dynamic environment retrieval
-                        response = generate_chatbot_response(user_input, context, None, lang=get_current_language())
-                        
-                        # Display response
-                        st.write(response.content)
-                        
-                        # Show escalation warning
+                    # Stream the response; spoken questions get their answer
+                    # synthesized sentence by sentence while the text renders
+                    # Pass None for api_key to use dynamic environment retrieval
+                    tokens = generate_chatbot_response_stream(user_input, context, None, lang=lang)
+                    tts_futures = []
+                    if from_voice:
+                        tokens = _tee_sentences_to_tts(tokens, lang, tts_futures)
+                    full_text = (st.write_stream(tokens) or "").strip()
+                    
+                    # The stream showed the raw reply; add the safety note the
+                    # filter appends now, since a spoken reply skips the rerun
+                    content = filter_unsafe_response(full_text)
+                    if len(content) > len(full_text):
+                        st.markdown(content[len(full_text):].strip())
+                    
+                    response = ChatMessage(
+                        role="assistant",
+                        content=content,
+                        timestamp=datetime.now().isoformat(),
+                        risk_level=analyze_risk_level(user_input, context)
+                    )
+                    audio = None
+                    if tts_futures:
+                        try:
+                            audio = b"".join(f.result() for f in tts_futures)
+                            response.audio_path, _ = _tts_file(response.content, lang, audio)
+                            if response.audio_path is None:
+                                response.audio_bytes = audio
+                        except Exception as e:
+                            print(f"TTS error: {e}")
+                    
+                    # Save response
+                    st.session_state["chat_messages"].append(response)
+                    
+                    # A spoken reply plays right here; the next rerun redraws
+                    # it with a normal player, so skip the rerun now
+                    if audio:
+                        st.audio(audio, format="audio/mp3", autoplay=True)
+                        return
+                    _set_and_rerun()
 
-                        
-                        # Save response
-                        st.session_state["chat_messages"].append(response)
-                        st.session_state["chatbot_just_rerun"] = True
-                        st.rerun()
+    @st.dialog(f"🤖 {t('chatbot_title')}")
+    def open_chatbot_dialog():
+        st.caption(t("chatbot_subtitle"))
+        
+        # Add a Back to Home button (Visual Only as Programmatic Close is limited)
+        # Or maybe check if we can skip it, but User asked for it. 
+        # Since st.dialog can't be closed programmatically easily, we just rely on X.
+        # But to satisfy user request visually:
+        if st.button(f"🏠 {t('back_to_home')}", type="secondary", use_container_width=True, key="chatbot_back_to_home"):
+            _set_and_rerun(show_chatbot=False)
+        
+
+        
+        # Initialize chat history in session state
+        if "chat_messages" not in st.session_state:
+            st.session_state["chat_messages"] = []
+        
+        # Load previous chat history
+        # Bound once per run; reused for history, STT, TTS and the reply
+        username = get_current_user_email() or "default_user"
+        lang = get_current_language()
+        if not st.session_state["chat_messages"]:
+            st.session_state["chat_messages"] = _cached_load_chat_history(username)
+        
+        # Display chat history: everything but the latest message goes out as
+        # a single HTML block; only the latest gets a chat_message with TTS controls
+        # Create container for messages
+        chat_container = st.container()
+        with chat_container:
+            messages = st.session_state["chat_messages"]
+            if len(messages) > 1:
+                st.markdown(
+                    _render_chat_history_html(tuple((m.role, m.content) for m in messages[:-1])),
+                    unsafe_allow_html=True
+                )
+            for i, msg in enumerate(messages[-1:], start=len(messages) - 1):
+                with st.chat_message(msg.role):
+                    st.write(msg.content)
+
+                    
+                    # TTS for assistant messages
+                    if msg.role == "assistant":
+                        # Audio lives in the TTS cache; legacy messages may still carry bytes
+                        audio = getattr(msg, "audio_path", None) or getattr(msg, "audio_bytes", None)
+                        if isinstance(audio, str) and not os.path.exists(audio):
+                            audio = None  # Evicted from the cache; offer Listen again
+                        if audio:
+                            st.audio(audio, format=_audio_mime(audio))
+                        else:
+                            # Simple Listen button; plays in place, no rerun needed
+                            if st.button("🔊", key=f"chatbot_tts_{i}", help="Listen to this response", on_click=_mark_chatbot_active):
+                                with st.spinner("..."):
+                                    try:
+                                        # Use current language for TTS
+                                        msg.audio_path, audio = _tts_file(msg.content, lang)
+                                        if msg.audio_path is None:
+                                            msg.audio_bytes = audio
+                                        audio = msg.audio_path or msg.audio_bytes
+                                        st.audio(audio, format=_audio_mime(audio), autoplay=True)
+                                    except Exception as e:
+                                        st.error(f"TTS Error: {e}")
+        
+        # Chat input handling (own fragment, so mic/input reruns skip the history above)
+        _chat_input_area(username, lang)
             
         # Action buttons (Inside Dialog)
         st.divider()
         col1, col2 = st.columns([1, 1])
         with col1:
-            if st.button(f"🗑️ {t('chatbot_clear')}", type="secondary", use_container_width=True, key="chatbot_clear"):
-                clear_chat_history(username)
-                st.session_state["chat_messages"] = []
-                st.session_state["chatbot_just_rerun"] = True
-                st.rerun()
+            st.button(f"🗑️ {t('chatbot_clear')}", type="secondary", use_container_width=True, key="chatbot_clear",
+                      on_click=_clear_chat, args=(username,))
         with col2:
             if st.button(f"📹 {t('go_to_upload')}", type="primary", use_container_width=True, key="chatbot_upload"):
-                st.session_state["show_chatbot"] = False # Explicitly close to show upload
-                st.rerun() 
+                _set_and_rerun(show_chatbot=False)  # Explicitly close to show upload
 
         # Suggested questions (only if no chat history)
         if not st.session_state["chat_messages"]:
             st.markdown(f"**💡 {t('suggested_questions')}:**")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button(f"📊 {t('question_trends')}", use_container_width=True, key="chatbot_sq_trends"):
-                    st.session_state["suggested_question"] = "How are my health trends looking?"
-                    st.session_state["chatbot_just_rerun"] = True
-                    st.rerun()
-                if st.button(f"❤️ {t('question_heart_rate')}", use_container_width=True, key="chatbot_sq_hr"):
-                    st.session_state["suggested_question"] = "What is considered a normal heart rate?"
-                    st.session_state["chatbot_just_rerun"] = True
-                    st.rerun()
-            with col2:
-                if st.button(f"😰 {t('question_stress')}", use_container_width=True, key="chatbot_sq_stress"):
-                    st.session_state["suggested_question"] = "What are some ways to reduce stress?"
-                    st.session_state["chatbot_just_rerun"] = True
-                    st.rerun()
-                if st.button(f"🏃 {t('question_exercise')}", use_container_width=True, key="chatbot_sq_ex"):
-                    st.session_state["suggested_question"] = "What are the health benefits of regular exercise?"
-                    st.session_state["chatbot_just_rerun"] = True
-                    st.rerun()
+            cols = st.columns(2)
+            labels = _suggestion_labels(lang)
+            for idx, (key, _, _, question) in enumerate(_SUGGESTED_QUESTIONS):
+                with cols[idx // 2]:
+                    st.button(labels[idx], use_container_width=True, key=key,
+                              on_click=_ask_suggested, args=(question,))
 
     # Trigger Button
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -1838,15 +2624,8 @@ if HAVE_CHATBOT and HAVE_AI_INSIGHTS:
     if st.session_state.get("show_chatbot"):
         is_opening = st.session_state.get("chatbot_main_trigger")
         
-        # Check for any interaction with widgets inside the chatbot (must use keys starting with 'chatbot_')
-        is_inner_interaction = False
-        for k in st.session_state:
-            # Check if key starts with chatbot_ AND is not the main trigger AND has a true/truthy value/change
-            if k.startswith("chatbot_") and k != "chatbot_main_trigger":
-                 # For buttons, bool is True if clicked. For inputs, value is present.
-                 if st.session_state[k]: 
-                     is_inner_interaction = True
-                     break
+        # Set by the on_click/on_change callbacks of the widgets inside the chatbot
+        is_inner_interaction = st.session_state.pop("chatbot_interaction_pending", False)
         
         # Check for explicit keep-alive flag (e.g. for TTS autoplay reruns)
         was_rerun = st.session_state.pop("chatbot_just_rerun", False)
@@ -1926,12 +2705,7 @@ else:
 
 # Upload Instructions as dropdown
 with st.expander(f"📋 {t('upload_instructions_title')}"):
-    st.markdown(f"""
-
-    - {t('requirement_lighting')}
-    - {t('requirement_position')}
-    - {t('requirement_duration')}
-    """)
+    st.markdown(_upload_instructions_md(get_current_language()))
 
 
 # ============================================================================
@@ -1942,17 +2716,14 @@ video_source_ready = False
 start_analysis = False
 
 if uploaded_file is not None or recorded_file_path is not None:
-    # Create temp path
-    tmp_dir = tempfile.mkdtemp()
-    
-    # Use proper extension based on source
-    ext = ".webm" if recorded_file_path else ".mp4"
-    tmp_path = os.path.join(tmp_dir, f"video_input{ext}")
+    # Uploads are written to a private temp dir, only on the run that
+    # processes them; live recordings are already on disk and are read in
+    # place (the pipeline never writes to its input)
+    tmp_dir = None
     
     if uploaded_file is not None:
         # Handle Upload
-        with open(tmp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        tmp_path = None
         
         # Manual trigger for uploads
         if st.button(f"🔍 {t('analyze_button')}", type="primary"):
@@ -1960,14 +2731,13 @@ if uploaded_file is not None or recorded_file_path is not None:
             
     elif recorded_file_path is not None:
         # Handle Live Recording
-        try:
-            shutil.copy(recorded_file_path, tmp_path)
-            # Automatic trigger for live recordings if not already analyzed
-            if "analysis_results" not in st.session_state:
-                start_analysis = True
-                st.info("Starting analysis automatically...")
-        except Exception as e:
-            st.error(f"Error processing recorded file: {e}")
+        tmp_path = recorded_file_path
+        if not os.path.exists(tmp_path):
+            st.error(f"Error processing recorded file: {tmp_path} not found")
+        # Automatic trigger for live recordings if not already analyzed
+        elif "analysis_results" not in st.session_state:
+            start_analysis = True
+            st.info("Starting analysis automatically...")
 
     # Check if profile is completed
     profile_completed = st.session_state.get("profile_completed", False)
@@ -1982,29 +2752,53 @@ if uploaded_file is not None or recorded_file_path is not None:
         restore_from_cache = True
     
     if start_analysis:
+        # One pass over the SessionState proxy; the gate above guarantees a
+        # saved profile, so the defaults are only a fallback
+        profile = {k: st.session_state.get(k, d) for k, d in _PROFILE_DEFAULTS.items()}
         try:
             if not restore_from_cache:
+                if uploaded_file is not None:
+                    # Fingerprint the upload in memory; it is written out only
+                    # if the analysis cache misses
+                    tmp_dir = tempfile.mkdtemp()
+                    tmp_path = os.path.join(tmp_dir, "video_input.mp4")
+                    video_hash = _buffer_fingerprint(uploaded_file.getbuffer())
+                    get_video_path = lambda: _write_upload(uploaded_file, tmp_path)
+                else:
+                    video_hash = _video_fingerprint(tmp_path)
+                    get_video_path = lambda: tmp_path
+                
                 progress_bar = st.progress(0, t("loading_video"))
                 
+                # Called once per decoded frame; redraw the bar at most every
+                # 0.1 s so UI deltas don't compete with decoding
+                frame_label = t("processing_frame")
+                last_update = [0.0]
+                
                 def progress_callback(current, total):
-                    progress_bar.progress(min(1.0, current / total), f"{t('processing_frame')} {current}/{total}...")
+                    now = time.monotonic()
+                    if now - last_update[0] < 0.1 and current < total:
+                        return
+                    last_update[0] = now
+                    progress_bar.progress(min(1.0, current / total), f"{frame_label} {current}/{total}...")
                 
                 # Main pipeline
-                vitals, filtered_signal, risk = estimate_vitals_from_video(
-                    tmp_path,
-                    use_mediapipe=use_mediapipe,
-                    progress_callback=progress_callback
+                vitals, risk = _cached_estimate(
+                    video_hash,
+                    get_video_path,
+                    use_mediapipe,
+                    progress_callback
                 )
                 
-                # Cache the results
-                st.session_state["analysis_results"] = (vitals, filtered_signal, risk)
+                # Cache the results (the raw PPG trace is not kept per session)
+                st.session_state["analysis_results"] = (vitals, risk)
                 
                 progress_bar.progress(1.0, f"{t('complete')}!")
                 st.success(f"✅ {t('video_processed_success')}")
                 
             else:
                 # Restore results
-                vitals, filtered_signal, risk = st.session_state["analysis_results"]
+                vitals, risk = st.session_state["analysis_results"]
                 risk_score = risk.risk_score
                 risk_level = risk.risk_level
             
@@ -2022,6 +2816,31 @@ if uploaded_file is not None or recorded_file_path is not None:
                     st.session_state.pop("session_saved", None) # Clear saved flag
                     st.rerun()
             
+            # Start the AI insights request now so the network round trip
+            # overlaps rendering the metrics and risk sections below
+            insights_future = None
+            if HAVE_AI_INSIGHTS and "ai_insights" not in st.session_state:
+                # API key is retrieved from .env or st.secrets
+                insights_future = _insights_executor().submit(
+                    get_health_insights,
+                    pulse_bpm=_or_default(vitals.heart_rate_bpm, 70.0),
+                    stress_index=_or_default(vitals.stress_level, 5.0),
+                    estimated_sbp=_or_default(vitals.bp_systolic, 120.0),
+                    estimated_dbp=_or_default(vitals.bp_diastolic, 80.0),
+                    estimated_spo2=_or_default(vitals.spo2, 98.0),
+                    age=profile["profile_age"],
+                    gender=profile["profile_gender"],
+                    height=profile["profile_height"],
+                    weight=profile["profile_weight"],
+                    diet=profile["profile_diet"],
+                    exercise_frequency=profile["profile_exercise"],
+                    sleep_hours=profile["profile_sleep"],
+                    smoking_habits=profile["profile_smoking"],
+                    diabetes=profile["profile_diabetes"],
+                    physical_activity=profile["profile_activity"],
+                    lang=get_current_language()  # Pass current language
+                )
+            
             # ================================================================
             # RESULTS DISPLAY
             # ================================================================
@@ -2039,39 +2858,6 @@ if uploaded_file is not None or recorded_file_path is not None:
                     f"{vitals.heart_rate_bpm:.1f} BPM",
                     help=f"{t('confidence')}: {vitals.heart_rate_confidence}. {t('typical_error')}: ±5–10 BPM"
                 )
-                # Add label below pulse based on BPM ranges
-                try:
-                    bpm_val = float(vitals.heart_rate_bpm)
-                except Exception:
-                    bpm_val = None
-
-                if bpm_val is None:
-                    pulse_label = t("na")
-                else:
-                    if bpm_val < 50:
-                        pulse_label = t("pulse_low")
-                    elif bpm_val < 60:
-                        pulse_label = t("pulse_slightly_low")
-                    elif bpm_val <= 100:
-                        pulse_label = t("pulse_normal")
-                    elif bpm_val <= 120:
-                        pulse_label = t("pulse_high")
-                    else:
-                        pulse_label = t("pulse_very_high")
-
-                color_map = {
-                    "Low": "#60a5fa",
-                    "Slightly Low": "#f59e0b",
-                    "Normal": "#16a34a",
-                    "High": "#f97316",
-                    "Very High": "#dc2626",
-                    "N/A": "#6b7280"
-                }
-                color = color_map.get(pulse_label, "#6b7280")
-                st.markdown(
-                    f"<div style='display:inline-block;padding:6px 12px;border-radius:8px;background:{color};color:white;font-weight:600;font-size:14px'>{pulse_label}</div>",
-                    unsafe_allow_html=True
-                )
             
             # Stress Index (0–10) — Experimental
             with col2:
@@ -2083,45 +2869,6 @@ if uploaded_file is not None or recorded_file_path is not None:
                     )
                 else:
                     st.metric(t("stress_index"), t("na"))
-
-                # Label below stress index according to ranges:
-                # 0–2 → Very Low Stress
-                # 3–4 → Low Stress
-                # 5–6 → Moderate Stress
-                # 7–8 → High Stress
-                # 9–10 → Very High Stress
-                try:
-                    stress_val = float(vitals.stress_level)
-                except Exception:
-                    stress_val = None
-
-                if stress_val is None or np.isnan(stress_val):
-                    stress_label = t("na")
-                else:
-                    if stress_val <= 2:
-                        stress_label = t("stress_very_low")
-                    elif stress_val <= 4:
-                        stress_label = t("stress_low")
-                    elif stress_val <= 6:
-                        stress_label = t("stress_moderate")
-                    elif stress_val <= 8:
-                        stress_label = t("stress_high")
-                    else:
-                        stress_label = t("stress_very_high")
-
-                stress_color_map = {
-                    "Very Low Stress": "#16a34a",
-                    "Low Stress": "#34d399",
-                    "Moderate Stress": "#f59e0b",
-                    "High Stress": "#f97316",
-                    "Very High Stress": "#dc2626",
-                    "N/A": "#6b7280"
-                }
-                s_color = stress_color_map.get(stress_label, "#6b7280")
-                st.markdown(
-                    f"<div style='display:inline-block;padding:6px 12px;border-radius:8px;background:{s_color};color:white;font-weight:600;font-size:14px;margin-top:6px'>{stress_label}</div>",
-                    unsafe_allow_html=True
-                )
             
             # (HRV hidden from top summary per user request)
             
@@ -2136,45 +2883,6 @@ if uploaded_file is not None or recorded_file_path is not None:
                 else:
                     st.metric(t("estimated_bp_experimental"), t("na"))
 
-                # Label below BP according to systolic ranges:
-                # Low: < 90
-                # Normal: 90–119
-                # Elevated: 120–129
-                # Stage 1 (High): 130–139
-                # Stage 2 (High): >= 140
-                try:
-                    sbp = float(vitals.bp_systolic) if vitals.bp_systolic is not None else None
-                except Exception:
-                    sbp = None
-
-                if sbp is None or np.isnan(sbp):
-                    bp_label = t("na")
-                else:
-                    if sbp < 90:
-                        bp_label = t("bp_low")
-                    elif sbp <= 119:
-                        bp_label = t("bp_normal")
-                    elif sbp <= 129:
-                        bp_label = t("bp_elevated")
-                    elif sbp <= 139:
-                        bp_label = t("bp_stage1")
-                    else:
-                        bp_label = t("bp_stage2")
-
-                bp_color_map = {
-                    "Low": "#60a5fa",
-                    "Normal": "#16a34a",
-                    "Elevated": "#f59e0b",
-                    "Stage 1 (High)": "#f97316",
-                    "Stage 2 (High)": "#dc2626",
-                    "N/A": "#6b7280"
-                }
-                bp_color = bp_color_map.get(bp_label, "#6b7280")
-                st.markdown(
-                    f"<div style='display:inline-block;padding:6px 12px;border-radius:8px;background:{bp_color};color:white;font-weight:600;font-size:14px;margin-top:6px'>{bp_label}</div>",
-                    unsafe_allow_html=True
-                )
-
             # Estimated SpO2
             with col4:
                 if vitals.spo2 is not None:
@@ -2185,40 +2893,15 @@ if uploaded_file is not None or recorded_file_path is not None:
                     )
                 else:
                     st.metric(t("estimated_spo2_experimental"), t("na"))
-                # Label below SpO2 according to benchmarks:
-                # ≥95% → Normal
-                # 92–94% → Slightly Low
-                # 88–91% → Low
-                # <88% → Very Low
-                try:
-                    spo2_val = float(vitals.spo2) if vitals.spo2 is not None else None
-                except Exception:
-                    spo2_val = None
-
-                if spo2_val is None or np.isnan(spo2_val):
-                    spo2_label = t("na")
-                else:
-                    if spo2_val >= 95:
-                        spo2_label = t("spo2_normal")
-                    elif spo2_val >= 92:
-                        spo2_label = t("spo2_slightly_low")
-                    elif spo2_val >= 88:
-                        spo2_label = t("spo2_low")
-                    else:
-                        spo2_label = t("spo2_very_low")
-
-                spo2_color_map = {
-                    "Normal": "#16a34a",
-                    "Slightly Low": "#f59e0b",
-                    "Low": "#f97316",
-                    "Very Low": "#dc2626",
-                    "N/A": "#6b7280"
-                }
-                spo2_color = spo2_color_map.get(spo2_label, "#6b7280")
-                st.markdown(
-                    f"<div style='display:inline-block;padding:6px 12px;border-radius:8px;background:{spo2_color};color:white;font-weight:600;font-size:14px;margin-top:6px'>{spo2_label}</div>",
-                    unsafe_allow_html=True
-                )
+            
+            # Range labels for the four tiles (pulse, stress, systolic BP, SpO2),
+            # sent as one HTML row laid out on the same 4-column grid
+            st.markdown(_vital_badge_row((
+                ("pulse", vitals.heart_rate_bpm),
+                ("stress", vitals.stress_level),
+                ("bp", vitals.bp_systolic),
+                ("spo2", vitals.spo2),
+            )), unsafe_allow_html=True)
             
             # ================================================================
             # RISK ASSESSMENT
@@ -2229,178 +2912,19 @@ if uploaded_file is not None or recorded_file_path is not None:
             # (Vitals-only risk details hidden — combined profile+vitals score shown below)
             
             # --- Dynamic profile-based risk calculation with new benchmarks
-            def compute_profile_risk():
-                # Read profile values from session state (defaults should exist)
-                age = st.session_state.get("profile_age", 30)
-                height = st.session_state.get("profile_height", 170)
-                weight = st.session_state.get("profile_weight", 70)
-                smoking = st.session_state.get("profile_smoking", "never")
-                diabetes = st.session_state.get("profile_diabetes", "habit_no")
-                activity = st.session_state.get("profile_activity", "activity_active")
-                
-                # Vital signs from analysis result
-                # vitals is available in the outer scope
-                hr = getattr(vitals, 'heart_rate_bpm', None)
-                hrv_rmssd = getattr(vitals, 'hrv_rmssd', None)
-                bp_sys = getattr(vitals, 'bp_systolic', None)
-                spo2 = getattr(vitals, 'spo2', None)
-
-                risk_factors = []
-                protective_factors = []
-
-                # 1) Demographic & Profile Risk (Max = 3)
-                demo_score = 0.0
-                
-                # AGE
-                if age < 30:
-                    protective_factors.append(f"✅ {t('risk_factor_age')}: {age} (<30)")
-                elif 30 <= age <= 40:
-                    demo_score += 0.5
-                    risk_factors.append(f"⚠️ {t('risk_factor_age')}: {age} (30-40)")
-                elif 41 <= age <= 50:
-                    demo_score += 1.0
-                    risk_factors.append(f"⚠️ {t('risk_factor_age')}: {age} (41-50)")
-                elif 51 <= age <= 60:
-                    demo_score += 1.5
-                    risk_factors.append(f"⚠️ {t('risk_factor_age')}: {age} (51-60)")
-                else:
-                    demo_score += 2.0
-                    risk_factors.append(f"⚠️ {t('risk_factor_age')}: {age} (>60)")
-                
-                # BMI
-                try:
-                    bmi_val = weight / ((height/100.0)**2)
-                except Exception:
-                    bmi_val = 22.0
-                
-                if 18.5 <= bmi_val <= 24.9:
-                    protective_factors.append(f"✅ {t('risk_factor_bmi')}: {bmi_val:.1f} (Normal)")
-                elif 25 <= bmi_val <= 29.9:
-                    demo_score += 0.5
-                    risk_factors.append(f"⚠️ {t('risk_factor_bmi')}: {bmi_val:.1f} (Overweight)")
-                elif bmi_val >= 30:
-                    demo_score += 1.0
-                    risk_factors.append(f"⚠️ {t('risk_factor_bmi')}: {bmi_val:.1f} (Obese)")
-                
-                demo_score = min(demo_score, 3.0)
-
-                # 2) Vital Sign Risk (Max = 5)
-                vital_score = 0.0
-                
-                # HEART RATE: 60-80=0, 81-90=0.5, 91-100=1, >100=1.5, <50=1
-                if hr is not None:
-                    if 60 <= hr <= 80:
-                        protective_factors.append(f"✅ {t('risk_factor_hr')}: {hr:.0f} BPM")
-                    elif 81 <= hr <= 90:
-                        vital_score += 0.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_hr')}: {hr:.0f} BPM (Elevated)")
-                    elif 91 <= hr <= 100:
-                        vital_score += 1.0
-                        risk_factors.append(f"⚠️ {t('risk_factor_hr')}: {hr:.0f} BPM (High)")
-                    elif hr > 100:
-                        vital_score += 1.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_hr')}: {hr:.0f} BPM (Tachycardia)")
-                    elif hr < 50:
-                        vital_score += 1.0
-                        risk_factors.append(f"⚠️ {t('risk_factor_hr')}: {hr:.0f} BPM (Bradycardia)")
-                
-                # HRV (RMSSD): >50=0, 30-50=0.5, 20-30=1, <20=1.5
-                if hrv_rmssd is not None:
-                    if hrv_rmssd > 50:
-                        protective_factors.append(f"✅ HRV (RMSSD): {hrv_rmssd:.1f}ms (Good)")
-                    elif 30 <= hrv_rmssd <= 50:
-                        vital_score += 0.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_hrv')}: {hrv_rmssd:.1f}ms (Moderate)")
-                    elif 20 <= hrv_rmssd < 30:
-                        vital_score += 1.0
-                        risk_factors.append(f"⚠️ {t('risk_factor_hrv')}: {hrv_rmssd:.1f}ms (Low)")
-                    elif hrv_rmssd < 20:
-                        vital_score += 1.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_hrv')}: {hrv_rmssd:.1f}ms (Very Low)")
-                
-                # BLOOD PRESSURE (Systolic): <120=0, 120-129=0.5, 130-139=1, >=140=1.5
-                if bp_sys is not None:
-                    if bp_sys < 120:
-                        protective_factors.append(f"✅ {t('risk_factor_bp')}: {bp_sys:.0f} mmHg (Optimal)")
-                    elif 120 <= bp_sys <= 129:
-                        vital_score += 0.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_bp')}: {bp_sys:.0f} mmHg (Elevated)")
-                    elif 130 <= bp_sys <= 139:
-                        vital_score += 1.0
-                        risk_factors.append(f"⚠️ {t('risk_factor_bp')}: {bp_sys:.0f} mmHg (Stage 1)")
-                    elif bp_sys >= 140:
-                        vital_score += 1.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_bp')}: {bp_sys:.0f} mmHg (Stage 2)")
-                
-                # SpO2: >=97%=0, 94-96%=0.5, <94%=1
-                if spo2 is not None:
-                    if spo2 >= 97:
-                        protective_factors.append(f"✅ {t('risk_factor_spo2')}: {spo2:.0f}% (Normal)")
-                    elif 94 <= spo2 <= 96:
-                        vital_score += 0.5
-                        risk_factors.append(f"⚠️ {t('risk_factor_spo2')}: {spo2:.0f}% (Mildly Low)")
-                    elif spo2 < 94:
-                        vital_score += 1.0
-                        risk_factors.append(f"⚠️ {t('risk_factor_spo2')}: {spo2:.0f}% (Low)")
-                
-                vital_score = min(vital_score, 5.0)
-
-                # 3) Lifestyle & Medical History Risk (Max = 2)
-                lifestyle_score = 0.0
-                
-                # SMOKING: No=0, Occasional=0.5, Regular=1
-                sm = str(smoking).lower()
-                if "never" in sm:
-                    protective_factors.append(f"✅ {t('risk_factor_smoking')}: Never")
-                elif "occasional" in sm or "occ" in sm or "former" in sm:
-                    lifestyle_score += 0.5
-                    risk_factors.append(f"⚠️ {t('risk_factor_smoking')}: Occasional/Former")
-                elif "regular" in sm:
-                    lifestyle_score += 1.0
-                    risk_factors.append(f"⚠️ {t('risk_factor_smoking')}: Regular")
-                    
-                # DIABETES: No=0, Yes=1
-                diab = str(diabetes).lower()
-                if "yes" in diab:
-                    lifestyle_score += 1.0
-                    risk_factors.append(f"⚠️ {t('risk_factor_diabetes')}: Yes")
-                else:
-                    protective_factors.append(f"✅ {t('risk_factor_diabetes')}: No")
-                    
-                # PHYSICAL ACTIVITY: Active=0, Sedentary=0.5
-                act = str(activity).lower()
-                if "active" in act:
-                    protective_factors.append(f"✅ {t('risk_factor_activity')}: Active")
-                else:
-                    lifestyle_score += 0.5
-                    risk_factors.append(f"⚠️ {t('risk_factor_activity')}: Sedentary")
-                    
-                lifestyle_score = min(lifestyle_score, 2.0)
-
-                # FINAL SCORE
-                total_score = demo_score + vital_score + lifestyle_score
-                total_score = float(round(min(10.0, total_score), 1))
-                
-                if total_score <= 3.0:
-                    level = "Low"
-                elif total_score <= 6.0:
-                    level = "Moderate"
-                else:
-                    level = "High"
-
-                return {
-                    "score": total_score, 
-                    "level": level, 
-                    "risk_factors": risk_factors,
-                    "protective_factors": protective_factors,
-                    "breakdown": {
-                        "demographic": demo_score,
-                        "vitals": vital_score,
-                        "lifestyle": lifestyle_score
-                    }
-                }
-
-            profile_risk = compute_profile_risk()
+            profile_risk = compute_profile_risk(
+                profile["profile_age"],
+                profile["profile_height"],
+                profile["profile_weight"],
+                profile["profile_smoking"],
+                profile["profile_diabetes"],
+                profile["profile_activity"],
+                getattr(vitals, 'heart_rate_bpm', None),
+                getattr(vitals, 'hrv_rmssd', None),
+                getattr(vitals, 'bp_systolic', None),
+                getattr(vitals, 'spo2', None),
+                get_current_language()
+            )
 
             # Use only profile-based risk (no vitals weighting)
             risk_score = profile_risk["score"]
@@ -2465,52 +2989,11 @@ if uploaded_file is not None or recorded_file_path is not None:
             if HAVE_AI_INSIGHTS:
                 with st.spinner(f"{t('generating_insights')}..."):
                     try:
-                        # Collect profile data
-                        age = st.session_state.get("profile_age", 30)
-                        gender = st.session_state.get("profile_gender", "Prefer not to say")
-                        height = st.session_state.get("profile_height", 170)
-                        weight = st.session_state.get("profile_weight", 70)
-                        diet = st.session_state.get("profile_diet", "Non-Vegetarian")
-                        exercise = st.session_state.get("profile_exercise", "3–4x/week")
-                        sleep = st.session_state.get("profile_sleep", 7.0)
-                        smoking = st.session_state.get("profile_smoking", "Never")
-                        
                         # Check cache first
                         if "ai_insights" in st.session_state:
                             insights = st.session_state["ai_insights"]
                         else:
-                            # Call OpenAI API (API key is retrieved from .env or session state)
-                            # Ensure all inputs are valid floats, handling None and NaN
-                            
-                            # Helper to safely get float value
-                            def safe_float(val, default):
-                                try:
-                                    if val is None:
-                                        return default
-                                    if np.isnan(val):
-                                        return default
-                                    return float(val)
-                                except Exception:
-                                    return default
-    
-                            insights = get_health_insights(
-                                pulse_bpm=safe_float(vitals.heart_rate_bpm, 70.0),
-                                stress_index=safe_float(vitals.stress_level, 5.0),
-                                estimated_sbp=safe_float(vitals.bp_systolic, 120.0),
-                                estimated_dbp=safe_float(vitals.bp_diastolic, 80.0),
-                                estimated_spo2=safe_float(vitals.spo2, 98.0),
-                                age=age,
-                                gender=gender,
-                                height=height,
-                                weight=weight,
-                                diet=diet,
-                                exercise_frequency=exercise,
-                                sleep_hours=sleep,
-                                smoking_habits=smoking,
-                                diabetes=st.session_state.get("profile_diabetes", "No"),
-                                physical_activity=st.session_state.get("profile_activity", "Active"),
-                                lang=get_current_language()  # Pass current language
-                            )
+                            insights = insights_future.result()
                             # Cache the results
                             st.session_state["ai_insights"] = insights
                         
@@ -2549,8 +3032,8 @@ if uploaded_file is not None or recorded_file_path is not None:
             if HAVE_HISTORY:
                 try:
                     # Calculate BMI
-                    height_m = st.session_state.get("profile_height", 170) / 100.0
-                    weight_kg = st.session_state.get("profile_weight", 70)
+                    height_m = profile["profile_height"] / 100.0
+                    weight_kg = profile["profile_weight"]
                     bmi = weight_kg / (height_m ** 2)
                     
                     # Ensure vitals object is up to date with needed attributes
@@ -2584,23 +3067,23 @@ if uploaded_file is not None or recorded_file_path is not None:
                             analysis_type="Health Scan",
                             
                             # Profile
-                            age=st.session_state.get("profile_age", 30),
-                            gender=st.session_state.get("profile_gender", "Prefer not to say"),
-                            height=st.session_state.get("profile_height", 170),
-                            weight=st.session_state.get("profile_weight", 70),
+                            age=profile["profile_age"],
+                            gender=profile["profile_gender"],
+                            height=profile["profile_height"],
+                            weight=profile["profile_weight"],
                             bmi=bmi,
-                            diet=st.session_state.get("profile_diet", "Non-Vegetarian"),
-                            exercise=st.session_state.get("profile_exercise", "3–4x/week"),
-                            sleep=st.session_state.get("profile_sleep", 7.0),
-                            smoking=st.session_state.get("profile_smoking", "Never"),
-                            drinking=st.session_state.get("profile_drinking", "Never"),
-                            diabetes=st.session_state.get("profile_diabetes", "No"),
-                            physical_activity=st.session_state.get("profile_activity", "Active"),
+                            diet=profile["profile_diet"],
+                            exercise=profile["profile_exercise"],
+                            sleep=profile["profile_sleep"],
+                            smoking=profile["profile_smoking"],
+                            drinking=profile["profile_drinking"],
+                            diabetes=profile["profile_diabetes"],
+                            physical_activity=profile["profile_activity"],
                             
                             # Vitals
                             heart_rate=float(vitals.heart_rate_bpm),
                             heart_rate_confidence=vitals.heart_rate_confidence,
-                            stress_level=float(vitals.stress_level) if vitals.stress_level is not None and not np.isnan(vitals.stress_level) else 5.0,
+                            stress_level=_or_default(vitals.stress_level, 5.0),
                             bp_systolic=float(vitals.bp_systolic) if vitals.bp_systolic is not None else None,
                             bp_diastolic=float(vitals.bp_diastolic) if vitals.bp_diastolic is not None else None,
                             spo2=float(vitals.spo2) if vitals.spo2 is not None else None,
@@ -2631,6 +3114,7 @@ if uploaded_file is not None or recorded_file_path is not None:
                              f.write(f"DEBUG {datetime.now()}: Saving NEW session for {username}\n")
                         
                         if save_session(username, session_data):
+                            _clear_history_caches()
                             with open("debug_log.txt", "a") as f:
                                 f.write(f"DEBUG {datetime.now()}: Session saved successfully. ID: {session_data.session_id}\n")
                             st.toast(f"✅ Session saved to history!") 
@@ -2653,88 +3137,10 @@ if uploaded_file is not None or recorded_file_path is not None:
             # ================================================================
             # AUDIO SUMMARY (TTS)
             # ================================================================
-            st.divider()
-            st.subheader(f"🔊 {t('audio_summary_title') if 'audio_summary_title' in locals() else 'Audio Summary'}")
-            
-            # Layout: Button on left, Player on right
-            audio_col1, audio_col2 = st.columns([1, 2])
-            
-            with audio_col1:
-                # Check for language change to trigger auto-regeneration
-                current_lang = get_current_language()
-                stored_lang = st.session_state.get("audio_generated_lang")
-                auto_regenerate = False
-                
-                # If audio exists but language doesn't match, regenerate
-                if stored_lang and stored_lang != current_lang and "audio_summary_bytes" in st.session_state:
-                    auto_regenerate = True
-                
-                if st.button(t("generate_audio_summary") if 'generate_audio_summary' in locals() else "Generate Audio Summary", use_container_width=True) or auto_regenerate:
-                    with st.spinner(t("generating_audio") if 'generating_audio' in locals() else "Generating audio..."):
-                        try:
-                            # Construct text using translations
-                            summary_text = t("audio_intro") + " "
-                            summary_text += t("audio_hr").format(value=f"{vitals.heart_rate_bpm:.0f}") + " "
-                            
-                            # Check if stress is valid
-                            if vitals.stress_level is not None:
-                                summary_text += t("audio_stress").format(value=f"{vitals.stress_level:.1f}") + " "
-                            
-                            if vitals.bp_systolic is not None and vitals.bp_diastolic is not None:
-                                summary_text += t("audio_bp").format(systolic=f"{vitals.bp_systolic:.0f}", diastolic=f"{vitals.bp_diastolic:.0f}") + " "
-                            
-                            if vitals.spo2 is not None:
-                                summary_text += t("audio_spo2").format(value=f"{vitals.spo2:.1f}") + " "
-                            
-                            # Risk Assessment
-                            # Map risk_level to translated string
-                            level_key = f"{risk_level.lower()}_risk"
-                            translated_level = t(level_key)
-                            summary_text += t("audio_risk").format(score=risk_score, level=translated_level) + " "
-                            
-                            if HAVE_AI_INSIGHTS and 'insights' in locals() and not insights.error:
-                                summary_text += t("audio_insights_intro") + " "
-                                if insights.recommendations:
-                                    # Clean up markdown bullets if present
-                                    clean_recs = [r.replace("*", "").strip() for r in insights.recommendations]
-                                    summary_text += t("audio_recs") + ". ".join(clean_recs[:3]) + ". "
-                                if insights.symptoms_to_watch:
-                                    clean_sym = [s.replace("*", "").strip() for s in insights.symptoms_to_watch]
-                                    summary_text += t("audio_symptoms") + ". ".join(clean_sym[:3]) + ". "
-                            
-                            # Generate Audio
-                            from gtts import gTTS
-                            
-                            tts = gTTS(text=summary_text, lang=current_lang)
-                            mp3_fp = BytesIO()
-                            tts.write_to_fp(mp3_fp)
-                            mp3_fp.seek(0)
-                            
-                            # Store bytes and language in session state
-                            st.session_state["audio_summary_bytes"] = mp3_fp.getvalue()
-                            st.session_state["audio_generated_lang"] = current_lang
-                            
-                            # If we auto-regenerated, rerun to update the player immediately
-                            if auto_regenerate:
-                                st.rerun()
-                            
-                        except Exception as e:
-                            st.error(f"Error generating audio: {e}")
-            
-            with audio_col2:
-                # Display audio if available in session state
-                if "audio_summary_bytes" in st.session_state and st.session_state["audio_summary_bytes"] is not None:
-                    # Create a fresh BytesIO object from stored bytes for playback
-                    audio_data = st.session_state["audio_summary_bytes"]
-                    st.audio(audio_data, format='audio/mp3')
-                    
-                    st.download_button(
-                        label="💾 " + (t("download_audio") if 'download_audio' in locals() else "Download Audio"),
-                        data=audio_data,
-                        file_name=f"Health_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
-                        mime="audio/mp3",
-                        use_container_width=True
-                    )
+            _audio_summary_section(
+                vitals, risk_score, risk_level,
+                insights if HAVE_AI_INSIGHTS and 'insights' in locals() else None,
+            )
             
             st.divider()
             
@@ -2834,64 +3240,15 @@ if uploaded_file is not None or recorded_file_path is not None:
                 
                 # Check if session data is available
                 if "current_session" in st.session_state:
-                    session_data = st.session_state["current_session"]
-                    
-                    # PDF Download button
-                    col1, col2 = st.columns([1, 3])
-                    with col1:
-                        if st.button("📄 Generate PDF Report", type="secondary"):
-                            st.session_state["generate_pdf"] = True
-                            st.rerun()
-                    
-                    # Show download button if PDF generation was requested
-                    if st.session_state.get("generate_pdf", False):
-                        with col2:
-                            with st.spinner("Generating PDF..."):
-                                try:
-                                    pdf_bytes = generate_health_report(session_data)
-                                    st.download_button(
-                                        label="💾 Download PDF",
-                                        data=pdf_bytes,
-                                        file_name=f"Health_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                        mime="application/pdf",
-                                        type="primary"
-                                    )
-                                    st.session_state["generate_pdf"] = False
-                                    
-                                    # AUTO UPLOAD TO S3
-                                    if HAVE_S3 and HAVE_AUTH and check_authentication():
-                                        try:
-                                            s3 = get_s3_client()
-                                            if s3:
-                                                user_email = get_current_user_email()
-                                                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                                                s3_key = f"reports/{user_email}/{timestamp}_health_report.pdf"
-                                                bucket_name = os.environ.get("AWS_S3_BUCKET", "wellio-uploads")
-                                                
-                                                s3.put_object(
-                                                    Bucket=bucket_name,
-                                                    Key=s3_key,
-                                                    Body=pdf_bytes,
-                                                    ContentType='application/pdf'
-                                                )
-                                                # Save metadata to Supabase (Silent)
-                                                supabase = get_supabase_client()
-                                                if supabase:
-                                                    user_resp = supabase.table('users').select('id').eq('email', user_email).execute()
-                                        except Exception as e:
-                                            # Silent fail for S3
-                                            pass
-                                except Exception as e:
-                                    st.error(f"Error generating PDF: {str(e)}")
-                                    st.session_state["generate_pdf"] = False
+                    _pdf_report_section(st.session_state["current_session"])
                 else:
                     st.warning("⚠️ No session data available to generate report.")
 
             
             # Cleanup
             try:
-                os.remove(tmp_path)
-                os.rmdir(tmp_dir)
+                if tmp_dir:  # Never delete the live recording itself
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
             except:
                 pass
         
@@ -2908,8 +3265,8 @@ if uploaded_file is not None or recorded_file_path is not None:
             - {t('ensure_video_format')}
             """)
             try:
-                os.remove(tmp_path)
-                os.rmdir(tmp_dir)
+                if tmp_dir:  # Never delete the live recording itself
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
             except:
                 pass
 
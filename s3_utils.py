@@ -1,6 +1,10 @@
 import os
+from io import BytesIO
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from functools import lru_cache
 from typing import Optional, Dict
 import logging
 
@@ -8,14 +12,31 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Uploads above 5 MB go up as parallel multipart chunks
+UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=5 * 1024 * 1024,
+    multipart_chunksize=5 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+@lru_cache(maxsize=4)
+def _s3_client(access_key: Optional[str], secret_key: Optional[str], region: str):
+    """One boto3 S3 client per credential set; boto3 clients are thread-safe."""
+    return boto3.client(
+        's3',
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region
+    )
+
 def get_s3_client():
-    """Create a boto3 S3 client using environment variables."""
+    """Get the shared boto3 S3 client for the credentials in the environment."""
     try:
-        return boto3.client(
-            's3',
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.environ.get("AWS_REGION", "ap-south-1")
+        return _s3_client(
+            os.environ.get("AWS_ACCESS_KEY_ID"),
+            os.environ.get("AWS_SECRET_ACCESS_KEY"),
+            os.environ.get("AWS_REGION", "ap-south-1")
         )
     except Exception as e:
         logger.error(f"Error creating S3 client: {e}")
@@ -86,3 +107,31 @@ def generate_presigned_post(
     except ClientError as e:
         logger.error(f"Error generating presigned POST: {e}")
         return None
+
+def upload_bytes(
+    data: bytes,
+    bucket_name: str,
+    object_name: str,
+    content_type: str = "application/octet-stream"
+) -> bool:
+    """
+    Upload an in-memory file to S3 (multipart above the UPLOAD_CONFIG threshold).
+
+    :return: True if the upload succeeded
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        return False
+
+    try:
+        s3_client.upload_fileobj(
+            BytesIO(data),
+            bucket_name,
+            object_name,
+            ExtraArgs={"ContentType": content_type},
+            Config=UPLOAD_CONFIG
+        )
+        return True
+    except (ClientError, S3UploadFailedError) as e:
+        logger.error(f"Error uploading {object_name}: {e}")
+        return False
@@ -84,6 +84,7 @@ class SessionManager:
                 st.session_state["user_email"] = user.email
                 st.session_state["user_name"] = user.name
                 st.session_state["user_language"] = user.language
+                st.session_state["_last_persisted_lang"] = user.language
                 
                 # Try to restore page from URL
                 saved_page = st.query_params.get("page", None)
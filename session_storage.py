@@ -3,17 +3,47 @@ Session Storage Module
 ======================
 
 Handles persistence of health analysis sessions for usage history.
-Stores session data in JSON format with user-specific directories.
+Stores session data in JSON format with user-specific directories
+(zstd-compressed when the zstandard package is installed, gzip otherwise), plus a
+per-user index.jsonl of (id, timestamp) used for sorting and paging.
 """
 
+import base64
+import gzip
 import json
+import math
 import os
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 from typing import Optional, List
 import uuid
 
+import numpy as np
+
+# orjson reads/writes the same JSON files several times faster (optional)
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:
+    HAVE_ORJSON = False
+
+# zstandard compresses session files on disk (optional)
+try:
+    import zstandard
+    HAVE_ZSTD = True
+except ImportError:
+    HAVE_ZSTD = False
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Session files read concurrently by list_sessions (each read is one
+# round trip when the storage dir is on a network mount)
+MAX_LOAD_WORKERS = 16
+
 
 @dataclass
 class SessionData:
@@ -61,9 +91,92 @@ class SessionData:
     recommendations: List[str]
     symptoms_to_watch: List[str]
     
-    # Visualizations (base64 encoded PNG)
-    signal_plot: Optional[str] = None
-    hrv_plot: Optional[str] = None
+    # Visualizations (raw PNG bytes; base64 only inside the JSON file)
+    signal_plot: Optional[bytes] = None
+    hrv_plot: Optional[bytes] = None
+
+    @cached_property
+    def timestamp_dt(self) -> Optional[datetime]:
+        """Parsed `timestamp` (None if malformed), computed once per instance"""
+        try:
+            return datetime.fromisoformat(self.timestamp)
+        except (TypeError, ValueError):
+            return None
+
+
+PLOT_FIELDS = ("signal_plot", "hrv_plot")
+
+SESSION_FIELDS = tuple(f.name for f in fields(SessionData))
+
+
+def session_to_dict(session: SessionData) -> dict:
+    """
+    JSON-safe dict for a session (plot bytes are base64-encoded). Shallow:
+    list fields are shared with the session, so the dict is for encoding only.
+    """
+    session_dict = {name: getattr(session, name) for name in SESSION_FIELDS}
+    for field in PLOT_FIELDS:
+        if isinstance(session_dict[field], bytes):
+            session_dict[field] = base64.b64encode(session_dict[field]).decode('ascii')
+    return session_dict
+
+
+def session_from_dict(session_dict: dict) -> SessionData:
+    """Rebuild a session from its stored dict, decoding base64 plots to bytes"""
+    for field in PLOT_FIELDS:
+        if isinstance(session_dict.get(field), str):
+            session_dict[field] = base64.b64decode(session_dict[field])
+    return SessionData(**session_dict)
+
+
+def read_json(filepath: Path) -> dict:
+    """Parse a session file, plain, zstd- or gzip-compressed (orjson when available)"""
+    raw = filepath.read_bytes()
+    if raw[:4] == ZSTD_MAGIC:
+        if not HAVE_ZSTD:
+            raise RuntimeError("session file is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    elif raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    if HAVE_ORJSON:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity literals, written by the json fallback before it matched orjson
+    return json.loads(raw.decode('utf-8'))
+
+
+def _json_safe(obj):
+    """NumPy values as Python ones and NaN/inf as None, as orjson writes them"""
+    if isinstance(obj, dict):
+        return {k: _json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(v) for v in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return _json_safe(obj.tolist())
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+
+def write_json(filepath: Path, data: dict) -> None:
+    """
+    Write a session file: compact JSON, zstd-compressed when available, else gzip.
+    
+    Both encoders write the same document: NumPy values are serialized and
+    NaN/inf readings are stored as null.
+    """
+    if HAVE_ORJSON:
+        raw = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        raw = json.dumps(_json_safe(data), ensure_ascii=False, separators=(',', ':'),
+                         allow_nan=False).encode('utf-8')
+    if HAVE_ZSTD:
+        raw = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        # Level 1: most of the gain on text-heavy sessions for little CPU
+        raw = gzip.compress(raw, compresslevel=1, mtime=0)
+    filepath.write_bytes(raw)
 
 
 def get_storage_base_path() -> Path:
@@ -89,6 +202,77 @@ def get_user_storage_path(username: str) -> Path:
     return user_path
 
 
+def get_plot_path(username: str, session_id: str, field: str) -> Path:
+    """PNG file holding one of a session's plots, stored next to its JSON"""
+    return get_user_storage_path(username) / f"{session_id}.{field}.png"
+
+
+INDEX_FILE = "index.jsonl"
+
+
+def index_line(session_id: str, timestamp: str) -> str:
+    """One index.jsonl record (orjson when available)"""
+    entry = {"id": session_id, "ts": timestamp}
+    if HAVE_ORJSON:
+        return orjson.dumps(entry).decode('utf-8') + "\n"
+    return json.dumps(entry) + "\n"
+
+
+def append_index(user_path: Path, entries) -> None:
+    """Record (session_id, timestamp) pairs in the user's session index"""
+    with open(user_path / INDEX_FILE, "a", encoding="utf-8") as f:
+        for session_id, timestamp in entries:
+            f.write(index_line(session_id, timestamp))
+
+
+def read_index(user_path: Path) -> List[tuple]:
+    """
+    (timestamp, session_id) for every stored session, newest first.
+    
+    Lists the directory instead of parsing every session file: only files
+    missing from the index (saved before it existed) are read and added,
+    and entries for deleted files are dropped.
+    """
+    index = {}
+    index_path = user_path / INDEX_FILE
+    if index_path.exists():
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = orjson.loads(line) if HAVE_ORJSON else json.loads(line)
+                    index[entry["id"]] = entry["ts"]
+                except (ValueError, KeyError):
+                    continue  # torn line from an interrupted append
+    
+    on_disk = {filepath.stem for filepath in user_path.glob("*.json")}
+    
+    missing = []
+    for session_id in on_disk - index.keys():
+        try:
+            index[session_id] = read_json(user_path / f"{session_id}.json")["timestamp"]
+            missing.append((session_id, index[session_id]))
+        except Exception as e:
+            print(f"Error indexing session {session_id}: {e}")
+    
+    stale = index.keys() - on_disk
+    try:
+        if stale:
+            for session_id in stale:
+                del index[session_id]
+            # Rewrite compacted; the rename keeps readers from seeing half a file
+            tmp_path = index_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for session_id, timestamp in index.items():
+                    f.write(index_line(session_id, timestamp))
+            os.replace(tmp_path, index_path)
+        elif missing:
+            append_index(user_path, missing)
+    except OSError as e:
+        print(f"Error updating session index: {e}")
+    
+    return sorted(((ts or "", session_id) for session_id, ts in index.items()), reverse=True)
+
+
 def save_session(username: str, session: SessionData) -> bool:
     """
     Save a session to JSON file.
@@ -105,11 +289,21 @@ def save_session(username: str, session: SessionData) -> bool:
         filename = f"{session.session_id}.json"
         filepath = user_path / filename
         
-        # Convert to dict and save
-        session_dict = asdict(session)
+        # Plots go to their own PNG files so the JSON stays small
+        session_dict = session_to_dict(session)
+        for field in PLOT_FIELDS:
+            plot = getattr(session, field)
+            if plot:
+                get_plot_path(username, session.session_id, field).write_bytes(plot)
+            session_dict[field] = None
+        
+        write_json(filepath, session_dict)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(session_dict, f, indent=2, ensure_ascii=False)
+        # Best effort: read_index re-adds sessions missing from the index
+        try:
+            append_index(user_path, [(session.session_id, session.timestamp)])
+        except OSError as e:
+            print(f"Error updating session index: {e}")
         
         return True
     
@@ -118,9 +312,9 @@ def save_session(username: str, session: SessionData) -> bool:
         return False
 
 
-def load_session(username: str, session_id: str) -> Optional[SessionData]:
+def load_session_meta(username: str, session_id: str) -> Optional[SessionData]:
     """
-    Load a specific session by ID.
+    Load a specific session by ID, without its plots (see load_session_plots).
     
     Args:
         username: User identifier
@@ -136,49 +330,93 @@ def load_session(username: str, session_id: str) -> Optional[SessionData]:
         if not filepath.exists():
             return None
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            session_dict = json.load(f)
-        
-        return SessionData(**session_dict)
+        return session_from_dict(read_json(filepath))
     
     except Exception as e:
         print(f"Error loading session {session_id}: {e}")
         return None
 
 
-def list_sessions(username: str, limit: Optional[int] = None) -> List[SessionData]:
+def load_session_plots(username: str, session_id: str) -> dict:
+    """
+    Load a session's plots on demand.
+    
+    Returns:
+        Dict of plot field -> PNG bytes (None for plots that were not saved)
+    """
+    plots = {}
+    for field in PLOT_FIELDS:
+        try:
+            path = get_plot_path(username, session_id, field)
+            plots[field] = path.read_bytes() if path.exists() else None
+        except Exception as e:
+            print(f"Error loading {field} for session {session_id}: {e}")
+            plots[field] = None
+    return plots
+
+
+def load_session(username: str, session_id: str) -> Optional[SessionData]:
+    """
+    Load a specific session by ID, including its plots.
+    
+    Args:
+        username: User identifier
+        session_id: Session UUID
+        
+    Returns:
+        SessionData object or None if not found
+    """
+    session = load_session_meta(username, session_id)
+    if session is None:
+        return None
+    
+    # Sessions saved before plots moved out of the JSON already carry them
+    for field, plot in load_session_plots(username, session_id).items():
+        if plot is not None:
+            setattr(session, field, plot)
+    return session
+
+
+def _load_session_file(filepath: Path) -> Optional[SessionData]:
+    """Parse one session file for list_sessions; None (and a log line) on error"""
+    try:
+        return session_from_dict(read_json(filepath))
+    except Exception as e:
+        print(f"Error loading {filepath}: {e}")
+        return None
+
+
+def list_sessions(username: str, limit: Optional[int] = None, offset: int = 0) -> List[SessionData]:
     """
     List all sessions for a user, sorted by timestamp (newest first).
+    Plots are not loaded (see load_session_plots).
     
     Args:
         username: User identifier
         limit: Optional maximum number of sessions to return
+        offset: Number of newest sessions to skip (for paging)
         
     Returns:
         List of SessionData objects
     """
     try:
         user_path = get_user_storage_path(username)
-        sessions = []
-        
-        # Find all JSON files
-        for filepath in user_path.glob("*.json"):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    session_dict = json.load(f)
-                sessions.append(SessionData(**session_dict))
-            except Exception as e:
-                print(f"Error loading {filepath}: {e}")
-                continue
-        
-        # Sort by timestamp (newest first)
-        sessions.sort(key=lambda s: s.timestamp, reverse=True)
-        
-        # Apply limit if specified
+        
+        # Sort and page on the index; only the requested sessions are parsed
+        entries = read_index(user_path)
         if limit:
-            sessions = sessions[:limit]
+            entries = entries[offset:offset + limit]
+        elif offset:
+            entries = entries[offset:]
+        
+        paths = [user_path / f"{session_id}.json" for _, session_id in entries]
+        if len(paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(paths))) as pool:
+                loaded = list(pool.map(_load_session_file, paths))
+        else:
+            loaded = [_load_session_file(filepath) for filepath in paths]
         
-        return sessions
+        return [session for session in loaded if session is not None]
     
     except Exception as e:
         print(f"Error listing sessions: {e}")
@@ -202,6 +440,8 @@ def delete_session(username: str, session_id: str) -> bool:
         
         if filepath.exists():
             filepath.unlink()
+            for field in PLOT_FIELDS:
+                get_plot_path(username, session_id, field).unlink(missing_ok=True)
             return True
         return False
     
@@ -210,6 +450,17 @@ def delete_session(username: str, session_id: str) -> bool:
         return False
 
 
+def get_history_version(username: str) -> int:
+    """
+    Token that changes whenever a session is saved or deleted: the user
+    directory's mtime, so checking it is a single stat. Used as a cache key.
+    """
+    try:
+        return get_user_storage_path(username).stat().st_mtime_ns
+    except Exception:
+        return 0
+
+
 def get_session_count(username: str) -> int:
     """Get total number of sessions for a user"""
     try:
@@ -0,0 +1,56 @@
+"""
+Test PDF Report
+===============
+
+Checks that reports for stored sessions keep their charts now that
+plots are saved in separate files next to the session JSON.
+"""
+
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("reportlab")
+pdf_report = pytest.importorskip("pdf_report")
+
+from session_storage import load_session_meta, save_session
+from test_session_storage import USER, make_session, storage_dir  # noqa: F401
+
+
+def png_plot() -> bytes:
+    """A small real PNG chart, as the results page saves"""
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(2, 1))
+    fig.subplots().plot([0, 1, 0, 1])
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def test_history_report_passes_plots_to_the_generator(monkeypatch):
+    plot = png_plot()
+    save_session(USER, make_session("spy", 1, signal_plot=plot, hrv_plot=plot))
+    # The history view's metadata load carries no plots
+    assert load_session_meta(USER, "spy").signal_plot is None
+    seen = []
+    monkeypatch.setattr(pdf_report, "generate_health_report",
+                        lambda session, lang="en": seen.append(session) or b"%PDF")
+
+    pdf_report.generate_session_report(USER, "spy")
+
+    assert seen[0].signal_plot == plot
+    assert seen[0].hrv_plot == plot
+
+
+def test_history_report_is_a_pdf():
+    plot = png_plot()
+    save_session(USER, make_session("with-plots", 1, signal_plot=plot, hrv_plot=plot))
+
+    assert pdf_report.generate_session_report(USER, "with-plots").startswith(b"%PDF")
+
+
+def test_missing_session_has_no_report():
+    assert pdf_report.generate_session_report(USER, "missing") is None
@@ -0,0 +1,257 @@
+"""
+Test Session Storage
+====================
+
+Covers the on-disk format handled by session_storage: the index.jsonl
+sync, paging, reading plain, gzip and zstd session files, and encoding
+NumPy and NaN values the same way with or without orjson.
+"""
+
+import base64
+import gzip
+import json
+import math
+
+import numpy as np
+import pytest
+
+import session_storage
+from session_storage import (
+    SessionData, save_session, load_session, list_sessions,
+    delete_session, get_session_count, get_user_storage_path,
+    session_to_dict, read_json, write_json, INDEX_FILE,
+)
+
+USER = "test@wellio.com"
+
+
+@pytest.fixture(autouse=True)
+def storage_dir(tmp_path, monkeypatch):
+    """Point session storage at a fresh directory for every test"""
+    monkeypatch.setenv("WELLIO_STORAGE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_session(session_id: str, day: int, **overrides) -> SessionData:
+    """Minimal session stamped on 2026-01-<day>"""
+    fields = dict(
+        session_id=session_id,
+        timestamp=f"2026-01-{day:02d}T09:00:00+00:00",
+        analysis_type="Health Scan",
+        age=30, gender="prefer_not_say", height=170.0, weight=70.0, bmi=24.2,
+        diet="non_vegetarian", exercise="exercise_3_4", sleep=7.0,
+        smoking="never", drinking="never", diabetes="habit_no",
+        physical_activity="activity_active",
+        heart_rate=72.0, heart_rate_confidence="High", stress_level=3.0,
+        bp_systolic=118.0, bp_diastolic=76.0, spo2=98.0,
+        hrv_sdnn=45.0, hrv_rmssd=40.0, hrv_pnn50=12.0, rr_intervals_count=20,
+        risk_score=1.5, risk_level="Low",
+        risk_factors=[], protective_factors=["✅ Age: 30 (<30)"],
+        detailed_analysis="All readings in range.",
+        recommendations=["Keep it up"], symptoms_to_watch=[],
+    )
+    fields.update(overrides)
+    return SessionData(**fields)
+
+
+def user_dir():
+    return get_user_storage_path(USER)
+
+
+def index_ids():
+    """Session ids currently recorded in index.jsonl"""
+    lines = (user_dir() / INDEX_FILE).read_text(encoding="utf-8").splitlines()
+    return {json.loads(line)["id"] for line in lines}
+
+
+def test_legacy_session_without_index_is_listed_and_indexed():
+    # Written by an older version: plain JSON, plots inline, no index.jsonl
+    legacy = make_session("legacy", 5, signal_plot=b"\x89PNG-signal")
+    data = session_to_dict(legacy)
+    assert data["signal_plot"] == base64.b64encode(b"\x89PNG-signal").decode("ascii")
+    (user_dir() / "legacy.json").write_text(json.dumps(data), encoding="utf-8")
+    assert not (user_dir() / INDEX_FILE).exists()
+
+    sessions = list_sessions(USER)
+
+    assert [s.session_id for s in sessions] == ["legacy"]
+    assert index_ids() == {"legacy"}
+    assert load_session(USER, "legacy").signal_plot == b"\x89PNG-signal"
+
+
+def test_legacy_session_is_merged_with_indexed_ones():
+    save_session(USER, make_session("new", 10))
+    (user_dir() / "old.json").write_text(json.dumps(session_to_dict(make_session("old", 2))))
+
+    assert [s.session_id for s in list_sessions(USER)] == ["new", "old"]
+    assert index_ids() == {"new", "old"}
+
+
+def test_deleted_session_is_dropped_from_index():
+    for day, session_id in enumerate(("a", "b", "c"), start=1):
+        save_session(USER, make_session(session_id, day))
+    assert index_ids() == {"a", "b", "c"}
+
+    assert delete_session(USER, "b")
+    # The index still names "b" until the next read reconciles it
+    assert "b" in index_ids()
+
+    assert [s.session_id for s in list_sessions(USER)] == ["c", "a"]
+    assert index_ids() == {"a", "c"}
+    assert get_session_count(USER) == 2
+
+
+def test_session_file_removed_outside_delete_session_is_skipped():
+    save_session(USER, make_session("a", 1))
+    save_session(USER, make_session("b", 2))
+    (user_dir() / "a.json").unlink()
+
+    assert [s.session_id for s in list_sessions(USER)] == ["b"]
+
+
+def test_truncated_index_line_is_ignored():
+    save_session(USER, make_session("a", 1))
+    with open(user_dir() / INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write('{"id": "b", "ts": "2026-01-0')  # interrupted append
+
+    assert [s.session_id for s in list_sessions(USER)] == ["a"]
+
+
+def test_session_appended_after_truncated_line_is_recovered():
+    save_session(USER, make_session("a", 1))
+    with open(user_dir() / INDEX_FILE, "a", encoding="utf-8") as f:
+        f.write('{"id": "tor')
+    # This record is glued onto the torn line and unreadable in the index;
+    # read_index re-adds it from the directory listing
+    save_session(USER, make_session("b", 2))
+
+    assert [s.session_id for s in list_sessions(USER)] == ["b", "a"]
+    # The recovered entry was appended, so later reads agree
+    assert [s.session_id for s in list_sessions(USER)] == ["b", "a"]
+
+
+@pytest.fixture
+def five_sessions():
+    """Sessions s1..s5 saved out of order; newest first is s5..s1"""
+    for day in (3, 1, 5, 2, 4):
+        save_session(USER, make_session(f"s{day}", day))
+
+
+@pytest.mark.parametrize("limit, offset, expected", [
+    (None, 0, ["s5", "s4", "s3", "s2", "s1"]),
+    (2, 0, ["s5", "s4"]),
+    (2, 2, ["s3", "s2"]),
+    (2, 4, ["s1"]),            # last, partial page
+    (2, 5, []),                # exactly past the end
+    (2, 50, []),
+    (5, 0, ["s5", "s4", "s3", "s2", "s1"]),
+    (10, 0, ["s5", "s4", "s3", "s2", "s1"]),
+    (None, 3, ["s2", "s1"]),   # offset without limit
+])
+def test_paging_boundaries(five_sessions, limit, offset, expected):
+    sessions = list_sessions(USER, limit=limit, offset=offset)
+    assert [s.session_id for s in sessions] == expected
+
+
+def test_pages_cover_every_session_once(five_sessions):
+    pages = [list_sessions(USER, limit=2, offset=offset) for offset in (0, 2, 4)]
+    ids = [s.session_id for page in pages for s in page]
+    assert ids == ["s5", "s4", "s3", "s2", "s1"]
+
+
+def test_reads_gzip_session_file(tmp_path):
+    data = session_to_dict(make_session("gz", 1))
+    path = tmp_path / "gz.json"
+    path.write_bytes(gzip.compress(json.dumps(data).encode("utf-8")))
+
+    assert read_json(path) == data
+
+
+def test_writes_gzip_without_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_storage, "HAVE_ZSTD", False)
+    data = session_to_dict(make_session("gz", 1))
+    path = tmp_path / "gz.json"
+
+    write_json(path, data)
+
+    assert path.read_bytes()[:2] == session_storage.GZIP_MAGIC
+    assert read_json(path) == data
+
+
+def test_reads_zstd_session_file(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = session_to_dict(make_session("zst", 1))
+    path = tmp_path / "zst.json"
+    path.write_bytes(zstandard.ZstdCompressor().compress(json.dumps(data).encode("utf-8")))
+
+    assert path.read_bytes()[:4] == session_storage.ZSTD_MAGIC
+    assert read_json(path) == data
+
+
+def test_reads_plain_json_session_file(tmp_path):
+    data = session_to_dict(make_session("plain", 1))
+    path = tmp_path / "plain.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    assert read_json(path) == data
+
+
+def test_compressed_sessions_round_trip_through_listing(monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(session_storage, "HAVE_ZSTD", False)
+    save_session(USER, make_session("gz", 1))
+    monkeypatch.setattr(session_storage, "HAVE_ZSTD", True)
+    save_session(USER, make_session("zst", 2))
+
+    sessions = list_sessions(USER)
+
+    assert [s.session_id for s in sessions] == ["zst", "gz"]
+    assert sessions[1].recommendations == ["Keep it up"]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run a test with orjson and with the stdlib json fallback"""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setattr(session_storage, "HAVE_ORJSON", request.param == "orjson")
+    return request.param
+
+
+def test_numpy_and_nan_fields_round_trip(encoder):
+    nan = float("nan")
+    session = make_session("np", 1, heart_rate=np.float64(71.5), stress_level=np.float32(2.5),
+                           rr_intervals_count=np.int64(18), spo2=nan, hrv_sdnn=np.float64(nan))
+
+    save_session(USER, session)
+    loaded = load_session(USER, "np")
+
+    assert loaded.heart_rate == 71.5 and type(loaded.heart_rate) is float
+    assert loaded.stress_level == 2.5
+    assert loaded.rr_intervals_count == 18 and type(loaded.rr_intervals_count) is int
+    # NaN/inf readings are stored as missing, whichever encoder wrote them
+    assert loaded.spo2 is None
+    assert loaded.hrv_sdnn is None
+
+
+def test_encoders_write_the_same_document(tmp_path, monkeypatch):
+    pytest.importorskip("orjson")
+    data = {"a": np.float64(1.25), "b": [float("nan"), float("inf"), np.int64(2)],
+            "c": "✅ ok", "d": None}
+    documents = []
+    for have_orjson in (True, False):
+        monkeypatch.setattr(session_storage, "HAVE_ORJSON", have_orjson)
+        path = tmp_path / f"{have_orjson}.json"
+        write_json(path, data)
+        documents.append(read_json(path))
+
+    assert documents[0] == documents[1] == {"a": 1.25, "b": [None, None, 2], "c": "✅ ok", "d": None}
+
+
+def test_reads_nan_literals_from_older_files(tmp_path, encoder):
+    path = tmp_path / "old.json"
+    path.write_text('{"spo2": NaN, "heart_rate": 70.0}', encoding="utf-8")
+
+    data = read_json(path)
+
+    assert math.isnan(data["spo2"]) and data["heart_rate"] == 70.0
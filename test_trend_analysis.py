@@ -0,0 +1,50 @@
+"""
+Test Trend Analysis
+===================
+
+Checks the closed-form trend line used by the trends charts against
+numpy's general least-squares fit.
+"""
+
+import numpy as np
+import pytest
+
+from trend_analysis import linfit_uniform
+
+
+@pytest.mark.parametrize("n", [2, 3, 4, 7, 10, 50])
+def test_linfit_uniform_matches_polyfit(n):
+    rng = np.random.default_rng(n)
+    y = rng.normal(80.0, 12.0, size=n)
+
+    slope, intercept = linfit_uniform(y)
+
+    expected_slope, expected_intercept = np.polyfit(np.arange(n), y, 1)
+    assert slope == pytest.approx(expected_slope, rel=1e-9, abs=1e-9)
+    assert intercept == pytest.approx(expected_intercept, rel=1e-9, abs=1e-9)
+
+
+def test_linfit_uniform_two_points_is_the_line_through_them():
+    assert linfit_uniform(np.array([72.0, 78.0])) == pytest.approx((6.0, 72.0))
+
+
+def test_linfit_uniform_single_point_is_flat():
+    y = np.array([97.5])
+
+    slope, intercept = linfit_uniform(y)
+
+    # np.polyfit rejects one point at x=0; lstsq gives the minimum-norm fit
+    expected = np.linalg.lstsq(np.array([[0.0, 1.0]]), y, rcond=None)[0]
+    assert (slope, intercept) == pytest.approx(tuple(expected))
+    assert (slope, intercept) == (0.0, 97.5)
+
+
+def test_linfit_uniform_exact_on_a_line():
+    y = 3.0 - 0.25 * np.arange(12)
+    assert linfit_uniform(y) == pytest.approx((-0.25, 3.0))
+
+
+def test_linfit_uniform_constant_values_have_zero_slope():
+    slope, intercept = linfit_uniform(np.full(6, 120.0))
+    assert slope == 0.0
+    assert intercept == pytest.approx(120.0)
@@ -0,0 +1,132 @@
+"""
+Test Vital Ranges
+=================
+
+Checks the bisect band tables behind the vital-sign badges at every
+boundary, against the inclusive/exclusive ranges they replaced.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from vital_ranges import VITAL_BANDS, NA_BAND, vital_band
+
+
+def reference_key(metric, v):
+    """The original if/elif range checks"""
+    if metric == "pulse":
+        if v < 50:
+            return "pulse_low"
+        elif v < 60:
+            return "pulse_slightly_low"
+        elif v <= 100:
+            return "pulse_normal"
+        elif v <= 120:
+            return "pulse_high"
+        return "pulse_very_high"
+    if metric == "stress":
+        if v <= 2:
+            return "stress_very_low"
+        elif v <= 4:
+            return "stress_low"
+        elif v <= 6:
+            return "stress_moderate"
+        elif v <= 8:
+            return "stress_high"
+        return "stress_very_high"
+    if metric == "bp":
+        if v < 90:
+            return "bp_low"
+        elif v <= 119:
+            return "bp_normal"
+        elif v <= 129:
+            return "bp_elevated"
+        elif v <= 139:
+            return "bp_stage1"
+        return "bp_stage2"
+    if v >= 95:
+        return "spo2_normal"
+    elif v >= 92:
+        return "spo2_slightly_low"
+    elif v >= 88:
+        return "spo2_low"
+    return "spo2_very_low"
+
+
+def key(metric, value):
+    return vital_band(metric, value)[0]
+
+
+@pytest.mark.parametrize("metric, value, expected", [
+    ("pulse", 49.99, "pulse_low"),
+    ("pulse", 50, "pulse_slightly_low"),
+    ("pulse", 59.99, "pulse_slightly_low"),
+    ("pulse", 60, "pulse_normal"),
+    ("pulse", 100, "pulse_normal"),
+    ("pulse", 100.01, "pulse_high"),
+    ("pulse", 120, "pulse_high"),
+    ("pulse", 120.01, "pulse_very_high"),
+    ("stress", 0, "stress_very_low"),
+    ("stress", 2, "stress_very_low"),
+    ("stress", 2.01, "stress_low"),
+    ("stress", 4, "stress_low"),
+    ("stress", 6, "stress_moderate"),
+    ("stress", 8, "stress_high"),
+    ("stress", 8.01, "stress_very_high"),
+    ("stress", 10, "stress_very_high"),
+    ("bp", 89.9, "bp_low"),
+    ("bp", 90, "bp_normal"),
+    ("bp", 119, "bp_normal"),
+    ("bp", 119.5, "bp_elevated"),
+    ("bp", 129, "bp_elevated"),
+    ("bp", 139, "bp_stage1"),
+    ("bp", 139.01, "bp_stage2"),
+    ("bp", 140, "bp_stage2"),
+    ("spo2", 87.9, "spo2_very_low"),
+    ("spo2", 88, "spo2_low"),
+    ("spo2", 91.9, "spo2_low"),
+    ("spo2", 92, "spo2_slightly_low"),
+    ("spo2", 94.9, "spo2_slightly_low"),
+    ("spo2", 95, "spo2_normal"),
+    ("spo2", 100, "spo2_normal"),
+])
+def test_band_boundaries(metric, value, expected):
+    assert key(metric, value) == expected
+
+
+@pytest.mark.parametrize("metric", sorted(VITAL_BANDS))
+def test_edges_match_original_ranges(metric):
+    edges, bins = VITAL_BANDS[metric]
+    assert list(edges) == sorted(edges)
+    assert len(bins) == len(edges) + 1
+    for edge in edges:
+        for v in (math.nextafter(edge, -math.inf), edge, math.nextafter(edge, math.inf)):
+            assert key(metric, v) == reference_key(metric, v), v
+        # Integer readings on both sides of the edge
+        for v in (math.floor(edge) - 1, math.floor(edge), math.ceil(edge), math.ceil(edge) + 1):
+            assert key(metric, v) == reference_key(metric, v), v
+
+
+@pytest.mark.parametrize("metric", sorted(VITAL_BANDS))
+def test_sweep_matches_original_ranges(metric):
+    for v in np.arange(0.0, 200.0, 0.25):
+        assert key(metric, v) == reference_key(metric, v), v
+
+
+@pytest.mark.parametrize("value", [None, "", "n/a", float("nan"), np.nan])
+def test_missing_reading_is_na(value):
+    assert vital_band("pulse", value) == NA_BAND
+
+
+def test_numeric_strings_and_numpy_values_are_accepted():
+    assert key("spo2", "96") == "spo2_normal"
+    assert key("bp", np.float32(125.0)) == "bp_elevated"
+
+
+def test_every_label_key_has_english_text():
+    # get_text falls back to English for keys a language lacks
+    translations = pytest.importorskip("translations")
+    keys = {label for _, bins in VITAL_BANDS.values() for label, _ in bins} | {NA_BAND[0]}
+    assert keys <= translations.TRANSLATIONS["en"].keys()
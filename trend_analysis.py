@@ -75,7 +75,9 @@ def get_sessions_in_period(username: str, days: int) -> List[SessionData]:
     filtered_sessions = []
     for session in all_sessions:
         try:
-            session_date = datetime.fromisoformat(session.timestamp)
+            session_date = session.timestamp_dt
+            if session_date is None:
+                continue
             
             # Handle timezone awareness to avoid TypeError during comparison
             if session_date.tzinfo is not None:
@@ -97,47 +99,75 @@ def get_sessions_in_period(username: str, days: int) -> List[SessionData]:
     return filtered_sessions
 
 
-def extract_metric_data(sessions: List[SessionData], metric_name: str) -> Tuple[List[float], List[datetime]]:
+# Session fields that can be trended
+METRIC_FIELDS = ("heart_rate", "stress_level", "bp_systolic", "bp_diastolic", "spo2")
+
+
+def build_metric_table(sessions: List[SessionData]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect every metric from the sessions in a single pass.
+    
+    Args:
+        sessions: List of SessionData objects
+        
+    Returns:
+        Tuple of (structured array with one float column per metric, NaN where
+        missing; object array of the matching timestamps). Sessions without a
+        parseable timestamp are skipped.
+    """
+    dated = [s for s in sessions if s.timestamp_dt is not None]
+    rows = [
+        tuple(np.nan if getattr(s, field) is None else getattr(s, field) for field in METRIC_FIELDS)
+        for s in dated
+    ]
+    table = np.array(rows, dtype=[(field, "f8") for field in METRIC_FIELDS])
+    timestamps = np.empty(len(dated), dtype=object)
+    timestamps[:] = [s.timestamp_dt for s in dated]
+    return table, timestamps
+
+
+def extract_metric_data(
+    sessions: List[SessionData],
+    metric_name: str,
+    metric_table: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Tuple[List[float], List[datetime]]:
     """
     Extract time-series data for a specific metric from sessions.
     
     Args:
         sessions: List of SessionData objects
         metric_name: Name of metric to extract
+        metric_table: Optional output of build_metric_table(sessions), so several
+            metrics can share one pass over the sessions
         
     Returns:
         Tuple of (values, timestamps)
     """
-    values = []
-    timestamps = []
+    if metric_name not in METRIC_FIELDS:
+        return [], []
     
-    for session in sessions:
-        try:
-            timestamp = datetime.fromisoformat(session.timestamp)
-            
-            # Extract value based on metric name
-            if metric_name == "heart_rate":
-                value = session.heart_rate
-            elif metric_name == "stress_level":
-                value = session.stress_level
-            elif metric_name == "bp_systolic":
-                value = session.bp_systolic
-            elif metric_name == "bp_diastolic":
-                value = session.bp_diastolic
-            elif metric_name == "spo2":
-                value = session.spo2
-            else:
-                continue
-            
-            # Only include non-None values
-            if value is not None and not np.isnan(value):
-                values.append(float(value))
-                timestamps.append(timestamp)
-        
-        except Exception:
-            continue
+    table, timestamps = metric_table if metric_table is not None else build_metric_table(sessions)
+    column = table[metric_name]
     
-    return values, timestamps
+    # Only include non-missing values
+    present = ~np.isnan(column)
+    return column[present].tolist(), timestamps[present].tolist()
+
+
+def linfit_uniform(y: np.ndarray) -> Tuple[float, float]:
+    """
+    Least-squares (slope, intercept) of y against 0..n-1, in closed form.
+    
+    Same fit as np.polyfit(np.arange(n), y, 1) without the Vandermonde solve.
+    A single point gives a flat line through it.
+    """
+    n = y.size
+    if n < 2:
+        return 0.0, float(y[0])
+    x_mean = (n - 1) / 2
+    y_mean = y.mean()
+    slope = ((np.arange(n) - x_mean) * (y - y_mean)).sum() / (n * (n * n - 1) / 12.0)
+    return float(slope), float(y_mean - slope * x_mean)
 
 
 def calculate_trend(values: List[float], timestamps: List[datetime]) -> Tuple[float, str]:
@@ -281,7 +311,8 @@ def analyze_metric(
     sessions: List[SessionData],
     metric_name: str,
     display_name: str,
-    user_age: int = 30
+    user_age: int = 30,
+    metric_table: Optional[Tuple[np.ndarray, np.ndarray]] = None
 ) -> Optional[TrendMetrics]:
     """
     Perform complete trend analysis for a single metric.
@@ -291,11 +322,12 @@ def analyze_metric(
         metric_name: Internal metric name
         display_name: Display name for the metric
         user_age: User's age
+        metric_table: Optional output of build_metric_table(sessions)
         
     Returns:
         TrendMetrics object or None if insufficient data
     """
-    values, timestamps = extract_metric_data(sessions, metric_name)
+    values, timestamps = extract_metric_data(sessions, metric_name, metric_table)
     
     if len(values) < 2:
         return None
@@ -412,19 +444,20 @@ def get_trend_analysis(username: str, days: int = 30, user_age: int = 30) -> Opt
     if len(sessions) < 2:
         return None
     
-    # Analyze each metric
-    hr_trend = analyze_metric(sessions, "heart_rate", "Heart Rate", user_age)
-    stress_trend = analyze_metric(sessions, "stress_level", "Stress Level", user_age)
-    bp_sys_trend = analyze_metric(sessions, "bp_systolic", "Systolic BP", user_age)
-    bp_dia_trend = analyze_metric(sessions, "bp_diastolic", "Diastolic BP", user_age)
-    spo2_trend = analyze_metric(sessions, "spo2", "SpO₂", user_age)
+    # Analyze each metric (one pass over the sessions shared by all of them)
+    table = build_metric_table(sessions)
+    hr_trend = analyze_metric(sessions, "heart_rate", "Heart Rate", user_age, table)
+    stress_trend = analyze_metric(sessions, "stress_level", "Stress Level", user_age, table)
+    bp_sys_trend = analyze_metric(sessions, "bp_systolic", "Systolic BP", user_age, table)
+    bp_dia_trend = analyze_metric(sessions, "bp_diastolic", "Diastolic BP", user_age, table)
+    spo2_trend = analyze_metric(sessions, "spo2", "SpO₂", user_age, table)
     
     # Create trend analysis object
     trend_analysis = TrendAnalysis(
         username=username,
         time_period_days=days,
-        start_date=datetime.fromisoformat(sessions[0].timestamp),
-        end_date=datetime.fromisoformat(sessions[-1].timestamp),
+        start_date=sessions[0].timestamp_dt,
+        end_date=sessions[-1].timestamp_dt,
         session_count=len(sessions),
         heart_rate=hr_trend,
         stress_level=stress_trend,
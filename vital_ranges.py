@@ -0,0 +1,59 @@
+"""
+Vital Ranges Module
+===================
+
+Reference bands for the range badges shown under each vital sign.
+Returns translation keys, so it has no UI dependencies.
+"""
+
+import math
+from bisect import bisect_right
+from typing import Dict, Tuple
+
+
+def _above(x: float) -> float:
+    """Smallest float greater than x; turns an inclusive "<= x" bound into a bisect edge"""
+    return math.nextafter(x, math.inf)
+
+
+# metric -> (ascending edges, (label key, color) per bin).
+# bisect_right(edges, value) picks the bin; edges equal a "< edge" bound.
+VITAL_BANDS: Dict[str, Tuple[tuple, tuple]] = {
+    # <50 low, 50-59 slightly low, 60-100 normal, 101-120 high, >120 very high
+    "pulse": (
+        (50, 60, _above(100), _above(120)),
+        (("pulse_low", "#60a5fa"), ("pulse_slightly_low", "#f59e0b"), ("pulse_normal", "#16a34a"),
+         ("pulse_high", "#f97316"), ("pulse_very_high", "#dc2626")),
+    ),
+    # 0-2 very low, 3-4 low, 5-6 moderate, 7-8 high, 9-10 very high
+    "stress": (
+        (_above(2), _above(4), _above(6), _above(8)),
+        (("stress_very_low", "#16a34a"), ("stress_low", "#34d399"), ("stress_moderate", "#f59e0b"),
+         ("stress_high", "#f97316"), ("stress_very_high", "#dc2626")),
+    ),
+    # Systolic: <90 low, 90-119 normal, 120-129 elevated, 130-139 stage 1, >=140 stage 2
+    "bp": (
+        (90, _above(119), _above(129), _above(139)),
+        (("bp_low", "#60a5fa"), ("bp_normal", "#16a34a"), ("bp_elevated", "#f59e0b"),
+         ("bp_stage1", "#f97316"), ("bp_stage2", "#dc2626")),
+    ),
+    # <88 very low, 88-91 low, 92-94 slightly low, >=95 normal
+    "spo2": (
+        (88, 92, 95),
+        (("spo2_very_low", "#dc2626"), ("spo2_low", "#f97316"), ("spo2_slightly_low", "#f59e0b"),
+         ("spo2_normal", "#16a34a")),
+    ),
+}
+NA_BAND = ("na", "#6b7280")
+
+
+def vital_band(metric: str, value) -> Tuple[str, str]:
+    """(label key, color) for a vital reading; N/A when missing or NaN"""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return NA_BAND
+    if math.isnan(v):
+        return NA_BAND
+    edges, bins = VITAL_BANDS[metric]
+    return bins[bisect_right(edges, v)]